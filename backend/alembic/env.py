@@ -12,6 +12,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 from app.database.connection import Base
 from app.models.user import User
 from app.models.sweet import Sweet
+from app.models.stock_shard import SweetStockShard
+from app.models.purchase import Purchase
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.job import Job
+from app.models.revoked_token import RevokedToken
+from app.models.inventory_audit import InventoryAudit
+from app.models.outbox import OutboxEvent
+from app.models.price_history import PriceChange, PriceRollup
 
 load_dotenv()
 
@@ -0,0 +1,38 @@
+"""Add inventory audit trail
+
+Revision ID: 30a855f9748a
+Revises: da246bcf1130
+Create Date: 2026-10-19 00:24:51.380217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '30a855f9748a'
+down_revision: Union[str, None] = 'da246bcf1130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_audit',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('sweet_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('previous_quantity', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.Column('changes', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_audit_sweet_created', 'inventory_audit', ['sweet_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_audit_sweet_created', table_name='inventory_audit')
+    op.drop_table('inventory_audit')
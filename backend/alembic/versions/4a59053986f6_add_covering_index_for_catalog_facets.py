@@ -0,0 +1,26 @@
+"""Add covering index for catalog facets
+
+Revision ID: 4a59053986f6
+Revises: f681991acf57
+Create Date: 2026-10-18 21:41:09.552371
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a59053986f6'
+down_revision: Union[str, None] = 'f681991acf57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_sweets_category_price_quantity', 'sweets', ['category', 'price', 'quantity'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sweets_category_price_quantity', table_name='sweets')
@@ -0,0 +1,34 @@
+"""Add sharded stock counters for hot sweets
+
+Revision ID: 51ba96fe9e7c
+Revises: 29947a2eb1cb
+Create Date: 2026-10-18 21:02:11.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '51ba96fe9e7c'
+down_revision: Union[str, None] = '29947a2eb1cb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sweets', sa.Column('stock_slots', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('sweet_stock_shards',
+    sa.Column('sweet_id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['sweet_id'], ['sweets.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sweet_id', 'slot')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sweet_stock_shards')
+    op.drop_column('sweets', 'stock_slots')
@@ -0,0 +1,46 @@
+"""Add price history and hourly/daily price rollups
+
+Revision ID: 8d41f2c6e7b0
+Revises: 5c0e7b3f9a12
+Create Date: 2026-10-19 04:26:03.771590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41f2c6e7b0'
+down_revision: Union[str, None] = '5c0e7b3f9a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('price_changes',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('sweet_id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_price_changes_sweet_changed', 'price_changes', ['sweet_id', 'changed_at'], unique=False)
+    op.create_table('price_rollups',
+    sa.Column('resolution', sa.String(), nullable=False),
+    sa.Column('sweet_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=False),
+    sa.Column('max_price', sa.Float(), nullable=False),
+    sa.Column('last_price', sa.Float(), nullable=False),
+    sa.Column('last_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('changes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('resolution', 'sweet_id', 'bucket')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('price_rollups')
+    op.drop_index('ix_price_changes_sweet_changed', table_name='price_changes')
+    op.drop_table('price_changes')
@@ -0,0 +1,30 @@
+"""Add composite indexes for sorted catalog search
+
+Revision ID: 9600f9995a76
+Revises: 4a59053986f6
+Create Date: 2026-10-18 21:58:37.120496
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9600f9995a76'
+down_revision: Union[str, None] = '4a59053986f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_sweets_lower_category_price_id', 'sweets', [sa.text('lower(category)'), 'price', 'id'], unique=False)
+    op.create_index('ix_sweets_lower_category_name_id', 'sweets', [sa.text('lower(category)'), 'name', 'id'], unique=False)
+    op.create_index('ix_sweets_price_id', 'sweets', ['price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sweets_price_id', table_name='sweets')
+    op.drop_index('ix_sweets_lower_category_name_id', table_name='sweets')
+    op.drop_index('ix_sweets_lower_category_price_id', table_name='sweets')
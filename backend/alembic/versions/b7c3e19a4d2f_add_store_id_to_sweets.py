@@ -0,0 +1,28 @@
+"""Add store id to sweets
+
+Revision ID: b7c3e19a4d2f
+Revises: 30a855f9748a
+Create Date: 2026-10-19 01:12:36.905114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c3e19a4d2f'
+down_revision: Union[str, None] = '30a855f9748a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sweets', sa.Column('store_id', sa.Integer(), server_default='1', nullable=False))
+    op.create_index(op.f('ix_sweets_store_id'), 'sweets', ['store_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sweets_store_id'), table_name='sweets')
+    op.drop_column('sweets', 'store_id')
@@ -0,0 +1,32 @@
+"""Add reorder threshold and low-stock partial index
+
+Revision ID: d51f8f7f56bd
+Revises: 9600f9995a76
+Create Date: 2026-10-18 22:14:52.664018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd51f8f7f56bd'
+down_revision: Union[str, None] = '9600f9995a76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sweets', sa.Column('reorder_threshold', sa.Integer(), server_default='10', nullable=False))
+    op.create_index(
+        'ix_sweets_low_stock', 'sweets', ['quantity', 'id'], unique=False,
+        postgresql_where=sa.text('quantity <= reorder_threshold'),
+        sqlite_where=sa.text('quantity <= reorder_threshold'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sweets_low_stock', table_name='sweets')
+    op.drop_column('sweets', 'reorder_threshold')
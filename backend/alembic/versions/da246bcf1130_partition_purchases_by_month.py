@@ -0,0 +1,107 @@
+"""Partition purchases by month and add user history index
+
+Revision ID: da246bcf1130
+Revises: ce9e49d21c99
+Create Date: 2026-10-18 23:58:06.931542
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'da246bcf1130'
+down_revision: Union[str, None] = 'ce9e49d21c99'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of partitions created beyond the current one
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, sweet_id, user_id, sweet_name, category, quantity, unit_price, total_cost, purchased_at"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _create_columns_sql(primary_key: str) -> str:
+    return (
+        "id INTEGER NOT NULL DEFAULT nextval('purchases_id_seq'), "
+        "sweet_id INTEGER NOT NULL, "
+        "user_id INTEGER NOT NULL REFERENCES users (id), "
+        "sweet_name VARCHAR NOT NULL, "
+        "category VARCHAR NOT NULL, "
+        "quantity INTEGER NOT NULL, "
+        "unit_price FLOAT NOT NULL, "
+        "total_cost FLOAT NOT NULL, "
+        "purchased_at TIMESTAMP WITH TIME ZONE NOT NULL, "
+        f"PRIMARY KEY ({primary_key})"
+    )
+
+
+def _create_indexes() -> None:
+    op.create_index(op.f('ix_purchases_id'), 'purchases', ['id'], unique=False)
+    op.create_index(op.f('ix_purchases_purchased_at'), 'purchases', ['purchased_at'], unique=False)
+    op.create_index(op.f('ix_purchases_sweet_id'), 'purchases', ['sweet_id'], unique=False)
+
+
+def _swap_table(create_sql: str, after_create=None) -> None:
+    """Rebuild purchases from a renamed copy, keeping the id sequence"""
+    op.execute("ALTER SEQUENCE purchases_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE purchases RENAME TO purchases_old")
+    for index in ('ix_purchases_id', 'ix_purchases_purchased_at', 'ix_purchases_sweet_id',
+                  'ix_purchases_user_id', 'ix_purchases_user_history'):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    op.execute("ALTER TABLE purchases_old RENAME CONSTRAINT purchases_pkey TO purchases_old_pkey")
+    op.execute(create_sql)
+    if after_create:
+        after_create()
+    op.execute(f"INSERT INTO purchases ({COLUMNS}) SELECT {COLUMNS} FROM purchases_old")
+    op.execute("ALTER SEQUENCE purchases_id_seq OWNED BY purchases.id")
+    op.execute("DROP TABLE purchases_old")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_purchases_user_id', table_name='purchases')
+        op.create_index('ix_purchases_user_history', 'purchases', ['user_id', 'purchased_at', 'id'], unique=False)
+        return
+
+    def create_partitions():
+        # One partition per month from the oldest purchase to a few months ahead
+        now = datetime.now(timezone.utc)
+        oldest = op.get_bind().execute(sa.text("SELECT min(purchased_at) FROM purchases_old")).scalar() or now
+        month = date(oldest.year, oldest.month, 1)
+        last = date(now.year, now.month, 1)
+        for _ in range(MONTHS_AHEAD):
+            last = _next_month(last)
+        while month <= last:
+            following = _next_month(month)
+            op.execute(
+                f"CREATE TABLE purchases_p{month.year:04d}_{month.month:02d} PARTITION OF purchases "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+            )
+            month = following
+
+    _swap_table(
+        f"CREATE TABLE purchases ({_create_columns_sql('id, purchased_at')}) PARTITION BY RANGE (purchased_at)",
+        create_partitions,
+    )
+    _create_indexes()
+    op.create_index('ix_purchases_user_history', 'purchases', ['user_id', 'purchased_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_purchases_user_history', table_name='purchases')
+        op.create_index(op.f('ix_purchases_user_id'), 'purchases', ['user_id'], unique=False)
+        return
+
+    # Detached partitions are not part of purchases and are not folded back
+    _swap_table(f"CREATE TABLE purchases ({_create_columns_sql('id')})")
+    _create_indexes()
+    op.create_index(op.f('ix_purchases_user_id'), 'purchases', ['user_id'], unique=False)
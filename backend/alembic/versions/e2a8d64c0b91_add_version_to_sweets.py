@@ -0,0 +1,26 @@
+"""Add version counter to sweets
+
+Revision ID: e2a8d64c0b91
+Revises: b7c3e19a4d2f
+Create Date: 2026-10-19 01:48:20.517463
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8d64c0b91'
+down_revision: Union[str, None] = 'b7c3e19a4d2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sweets', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('sweets', 'version')
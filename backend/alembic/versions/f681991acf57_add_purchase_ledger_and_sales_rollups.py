@@ -0,0 +1,59 @@
+"""Add purchase ledger and daily sales rollups
+
+Revision ID: f681991acf57
+Revises: 51ba96fe9e7c
+Create Date: 2026-10-18 21:20:43.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f681991acf57'
+down_revision: Union[str, None] = '51ba96fe9e7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('purchases',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('sweet_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('sweet_name', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('unit_price', sa.Float(), nullable=False),
+    sa.Column('total_cost', sa.Float(), nullable=False),
+    sa.Column('purchased_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_purchases_id'), 'purchases', ['id'], unique=False)
+    op.create_index(op.f('ix_purchases_purchased_at'), 'purchases', ['purchased_at'], unique=False)
+    op.create_index(op.f('ix_purchases_sweet_id'), 'purchases', ['sweet_id'], unique=False)
+    op.create_index(op.f('ix_purchases_user_id'), 'purchases', ['user_id'], unique=False)
+    op.create_table('sales_daily_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sweet_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('sweet_name', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'sweet_id', 'bucket')
+    )
+    op.create_index('ix_sales_daily_rollups_category_day', 'sales_daily_rollups', ['category', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sales_daily_rollups_category_day', table_name='sales_daily_rollups')
+    op.drop_table('sales_daily_rollups')
+    op.drop_index(op.f('ix_purchases_user_id'), table_name='purchases')
+    op.drop_index(op.f('ix_purchases_sweet_id'), table_name='purchases')
+    op.drop_index(op.f('ix_purchases_purchased_at'), table_name='purchases')
+    op.drop_index(op.f('ix_purchases_id'), table_name='purchases')
+    op.drop_table('purchases')
@@ -2,8 +2,13 @@
 Database connection and session management.
 Handles PostgreSQL connection using SQLAlchemy.
 """
+import asyncio
+import functools
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from fastapi.routing import APIRoute
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
 
@@ -25,13 +30,92 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for models
 Base = declarative_base()
 
-def get_db():
+# Session shared by every sub-request of a batch request; set by the batch router
+shared_session: ContextVar[Optional[Session]] = ContextVar("shared_session", default=None)
+# Sessions opened for the current request; set by ReleasingRoute
+request_sessions: ContextVar[Optional[List[Session]]] = ContextVar("request_sessions", default=None)
+
+def track_session(db: Session) -> Session:
+    """Register a request's session so its route can close it as soon as the endpoint returns"""
+    sessions = request_sessions.get()
+    if sessions is not None:
+        sessions.append(db)
+    return db
+
+async def get_db():
     """
     Dependency function to get database session.
     Yields database session and ensures proper cleanup.
+    Inside a batch request the batch's shared session is yielded instead,
+    and closed by the batch itself. A session serves one thread at a time,
+    so each sub-request holds the shared session until it has finished.
     """
-    db = SessionLocal()
+    shared = shared_session.get()
+    if shared is not None:
+        async with shared.info.setdefault("session_lock", asyncio.Lock()):
+            yield shared
+        return
+    db = track_session(SessionLocal())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _release_sessions(values: dict) -> None:
+    """
+    Return the connections of the request's sessions to the pool: those
+    passed to the endpoint and those only its sub-dependencies received,
+    e.g. the lookup behind get_current_user.
+    """
+    shared = shared_session.get()
+    sessions = [value for value in values.values() if isinstance(value, Session)]
+    sessions += request_sessions.get() or []
+    for session in sessions:
+        if session is not shared:
+            session.close()
+
+def release_sessions_after(call: Callable) -> Callable:
+    """Wrap an endpoint so its sessions are closed as soon as it returns"""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(**values):
+            try:
+                return await call(**values)
+            finally:
+                _release_sessions(values)
+    else:
+        @functools.wraps(call)
+        def endpoint(**values):
+            try:
+                return call(**values)
+            finally:
+                _release_sessions(values)
+    endpoint.releases_sessions = True
+    return endpoint
+
+class ReleasingRoute(APIRoute):
+    """
+    Route that gives its database connection back before the response is sent.
+
+    Sessions from `get_db` only check out a connection on their first
+    query and are shared by every dependency of a request, but `get_db`'s
+    own cleanup runs after the response has been serialized and sent.
+    This route collects every session opened while solving the request's
+    dependencies and closes them right after the endpoint returns
+    instead. Loaded objects stay readable for serialization; endpoints
+    must refresh anything they committed before returning it, as they
+    already do.
+    """
+
+    def get_route_handler(self):
+        if not getattr(self.dependant.call, "releases_sessions", False):
+            self.dependant.call = release_sessions_after(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def handle_tracking_sessions(request):
+            token = request_sessions.set([])
+            try:
+                return await handler(request)
+            finally:
+                request_sessions.reset(token)
+        return handle_tracking_sessions
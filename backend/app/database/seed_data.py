@@ -2,12 +2,15 @@
 Database seeding script for initial data.
 Creates sample sweets and admin user for development.
 """
+import logging
 from sqlalchemy.orm import Session
 from app.database.connection import SessionLocal, engine
 from app.models.user import User
 from app.models.sweet import Sweet
 from app.services.auth_service import AuthService
 
+logger = logging.getLogger(__name__)
+
 def create_sample_data():
     """
     Create sample data for development and testing.
@@ -25,7 +28,7 @@ def create_sample_data():
                 is_admin=True
             )
             db.add(admin_user)
-            print("Created admin user (username: admin, password: admin123)")
+            logger.info("Created admin user (username: admin, password: admin123)")
 
         # Create regular test user
         test_user = db.query(User).filter(User.username == "testuser").first()
@@ -37,7 +40,7 @@ def create_sample_data():
                 is_admin=False
             )
             db.add(test_user)
-            print("Created test user (username: testuser, password: test123)")
+            logger.info("Created test user (username: testuser, password: test123)")
 
         # Sample sweets data
         sample_sweets = [
@@ -63,18 +66,19 @@ def create_sample_data():
                 created_count += 1
         
         if created_count > 0:
-            print(f"Created {created_count} sample sweets")
+            logger.info("Created %d sample sweets", created_count)
         else:
-            print("Sample sweets already exist")
+            logger.info("Sample sweets already exist")
 
         db.commit()
-        print("Database seeded successfully!")
+        logger.info("Database seeded successfully!")
 
     except Exception as e:
-        print(f"Error seeding database: {e}")
+        logger.exception("Error seeding database: %s", e)
         db.rollback()
     finally:
         db.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     create_sample_data()
\ No newline at end of file
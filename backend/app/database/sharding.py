@@ -0,0 +1,198 @@
+"""
+Horizontal sharding of the sweets catalog by store.
+Maps store ids to database URLs, each with its own engine and connection
+pool, so single-store work runs on one shard and cross-store catalog
+reads fan out to every shard in parallel. Each shard allocates sweet ids
+from its own range, so an id names one sweet across the whole catalog.
+"""
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from fastapi import Depends, Query
+from sqlalchemy import create_engine, func
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from app.database.connection import Base, engine, get_db, track_session
+from app.models.sweet import Sweet
+
+# Store every unmapped store id belongs to
+DEFAULT_STORE_ID = 1
+# Sweet ids owned by each shard; a shard's range starts at its lowest store id times this
+SHARD_ID_SPAN = 10_000_000
+# Sweet ids are 32-bit integers on Postgres
+MAX_SWEET_ID = 2 ** 31 - 1
+
+class IdRangeExhaustedError(Exception):
+    """Raised when a shard has used every sweet id in its range"""
+
+def parse_shard_map(spec: Optional[str]) -> Dict[int, str]:
+    """
+    Parse STORE_DATABASE_URLS, e.g. "2=postgresql://db2/shop;3=postgresql://db3/shop".
+    Stores not listed stay on DATABASE_URL.
+    """
+    shards = {}
+    for entry in (spec or "").split(";"):
+        if not entry.strip():
+            continue
+        store_id, separator, url = entry.partition("=")
+        if not separator or not store_id.strip().isdigit() or not url.strip():
+            raise ValueError(f"Invalid store shard entry '{entry.strip()}', expected <store_id>=<database_url>")
+        shards[int(store_id)] = url.strip()
+    return shards
+
+def _url_key(url) -> str:
+    """Comparable form of a database URL, password included"""
+    return make_url(url).render_as_string(hide_password=False)
+
+class ShardRouter:
+    """
+    Routes stores to database shards.
+
+    Engines are keyed by URL, so stores mapped to the same database share
+    one engine and pool; stores without a mapping live on the default engine.
+
+    The default shard numbers sweets from 1 with its own autoincrement.
+    Every other shard owns the SHARD_ID_SPAN ids starting at its lowest
+    store id times SHARD_ID_SPAN, and sweets created there get ids
+    assigned from that range, so ids never collide across shards.
+    """
+
+    def __init__(
+        self,
+        default_engine: Engine,
+        store_urls: Optional[Dict[int, str]] = None,
+        engine_factory: Callable[[str], Engine] = create_engine,
+    ):
+        self.default_engine = default_engine
+        self._engines: Dict[str, Engine] = {_url_key(default_engine.url): default_engine}
+        self._store_engines: Dict[int, Engine] = {}
+        for store_id, url in sorted((store_urls or {}).items()):
+            key = _url_key(url)
+            if key not in self._engines:
+                self._engines[key] = engine_factory(url)
+            self._store_engines[store_id] = self._engines[key]
+        self._range_owners: Dict[int, Engine] = {}
+        for shard in self.engines()[1:]:
+            first, last = self.id_range(shard)
+            if last > MAX_SWEET_ID:
+                raise ValueError(f"Store {first // SHARD_ID_SPAN} is too high to own a sweet id range")
+            self._range_owners[first // SHARD_ID_SPAN] = shard
+        self._sessionmakers = {
+            shard: sessionmaker(autocommit=False, autoflush=False, bind=shard)
+            for shard in self._engines.values()
+        }
+
+    @property
+    def sharded(self) -> bool:
+        """Whether the catalog spans more than one database"""
+        return len(self._engines) > 1
+
+    def engine_for(self, store_id: int) -> Engine:
+        """Engine of the shard holding a store"""
+        return self._store_engines.get(store_id, self.default_engine)
+
+    def session_for(self, store_id: int) -> Session:
+        """New session on the shard holding a store"""
+        return self._sessionmakers[self.engine_for(store_id)]()
+
+    def session_on(self, shard: Engine) -> Session:
+        """New session on one shard"""
+        return self._sessionmakers[shard]()
+
+    def shard_for_sweet(self, sweet_id: int) -> Engine:
+        """Engine of the shard whose id range holds a sweet id"""
+        return self._range_owners.get(sweet_id // SHARD_ID_SPAN, self.default_engine)
+
+    def by_shard(self, sweet_ids: Iterable[int]) -> Dict[Engine, List[int]]:
+        """Sweet ids grouped by the shard holding them"""
+        groups: Dict[Engine, List[int]] = {}
+        for sweet_id in sweet_ids:
+            groups.setdefault(self.shard_for_sweet(sweet_id), []).append(sweet_id)
+        return groups
+
+    def engines(self) -> List[Engine]:
+        """Every shard's engine once, the default shard first"""
+        return list(self._engines.values())
+
+    def stores_on(self, shard: Engine) -> List[int]:
+        """Store ids explicitly mapped to a shard"""
+        return sorted(store_id for store_id, mapped in self._store_engines.items() if mapped is shard)
+
+    def id_range(self, shard: Engine) -> Optional[Tuple[int, int]]:
+        """First and last sweet id a shard assigns, or None for the default shard's autoincrement"""
+        if shard is self.default_engine:
+            return None
+        first = self.stores_on(shard)[0] * SHARD_ID_SPAN
+        return first, first + SHARD_ID_SPAN - 1
+
+    def dispose(self) -> None:
+        """Close the pools of every shard except the default one"""
+        for shard in self.engines()[1:]:
+            shard.dispose()
+
+def next_sweet_id(db: Session, id_range: Tuple[int, int]) -> int:
+    """
+    Next free sweet id in a shard's range, after the highest one in use.
+    Two concurrent creates can get the same id; the insert that loses
+    fails on the primary key and allocates again.
+    """
+    first, last = id_range
+    highest = db.query(func.max(Sweet.id)).filter(Sweet.id.between(first, last)).scalar()
+    if highest == last:
+        raise IdRangeExhaustedError(f"Sweet ids {first}-{last} are all in use")
+    return first if highest is None else highest + 1
+
+def local_shard_router(directory: str, store_ids: Iterable[int], default_engine: Engine) -> ShardRouter:
+    """
+    Stand-in for a multi-database deployment: one SQLite file per store
+    under `directory`, with the sweets schema created on each.
+    """
+    router = ShardRouter(
+        default_engine,
+        {store_id: f"sqlite:///{os.path.join(directory, f'store_{store_id}.db')}" for store_id in store_ids},
+    )
+    for shard in router.engines()[1:]:
+        Base.metadata.create_all(bind=shard)
+    return router
+
+shard_router = ShardRouter(engine, parse_shard_map(os.getenv("STORE_DATABASE_URLS")))
+
+def configure_shards(router: ShardRouter) -> None:
+    """Replace the process-wide shard router"""
+    global shard_router
+    shard_router = router
+
+@contextmanager
+def shard_sessions(db: Session, shards: Iterable[Engine]) -> Iterator[Dict[Engine, Session]]:
+    """
+    A session per shard for work spanning several: the request session
+    serves the default shard, short-lived ones the others.
+    """
+    sessions = {
+        shard: db if shard is shard_router.default_engine else shard_router.session_on(shard)
+        for shard in shards
+    }
+    try:
+        yield sessions
+    finally:
+        for session in sessions.values():
+            if session is not db:
+                session.close()
+
+def get_store_db(
+    store_id: Optional[int] = Query(None, ge=1, description="Store whose shard serves this request"),
+    db: Session = Depends(get_db),
+):
+    """
+    Dependency yielding a session on the shard holding `store_id`.
+    Without a store, or for stores on the default shard, the regular
+    request session is yielded unchanged.
+    """
+    if store_id is None or shard_router.engine_for(store_id) is shard_router.default_engine:
+        yield db
+        return
+    store_db = track_session(shard_router.session_for(store_id))
+    try:
+        yield store_db
+    finally:
+        store_db.close()
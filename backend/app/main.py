@@ -2,21 +2,142 @@
 Main FastAPI application for Sweet Shop Management System.
 Configures routers, middleware, and application settings.
 """
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, sweets
-from app.database.connection import engine, Base
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.routers import analytics, auth, batch, health, jobs, metrics, profiles, sweets
+from app.database.connection import engine, Base, SessionLocal
+from app.database import sharding
+from app.database.sharding import shard_router
+from app.services import partitions, request_logging, stock_service, stock_stream
+from app.services.audit_service import audit_writer
+from app.services import columnar_catalog
+from app.services.autocomplete import autocomplete_index
+from app.services.fuzzy_index import fuzzy_index
+from app.services.health import loop_lag
+from app.services.job_service import job_runner
+from app.services.low_stock_notifier import low_stock_notifier
+from app.services.outbox import outbox_relay
+from app.services.revocation import revocation_list
 
-# Create database tables
+logger = logging.getLogger(__name__)
+
+# JSON logs through a queue, written by a background thread
+request_logging.configure_logging()
+
+# Create database tables, on every store shard as well
 Base.metadata.create_all(bind=engine)
+for shard_engine in shard_router.engines()[1:]:
+    Base.metadata.create_all(bind=shard_engine)
+
+# Seconds between refreshes of sharded stock snapshots
+STOCK_RECONCILE_INTERVAL = float(os.getenv("STOCK_RECONCILE_INTERVAL", 5))
+# Seconds between batched low-stock alert deliveries
+LOW_STOCK_ALERT_INTERVAL = float(os.getenv("LOW_STOCK_ALERT_INTERVAL", 60))
+# Seconds between purchase ledger partition maintenance passes
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", 3600))
+
+def reconcile_sharded_stock():
+    """Refresh sweets.quantity for sharded sweets from their counter slots"""
+    db = SessionLocal()
+    try:
+        return stock_service.reconcile_totals(db)
+    finally:
+        db.close()
+
+def rebuild_search_indexes():
+    """
+    Load every sweet, from every shard, into the in-memory fuzzy search
+    and autocomplete indexes, and into the columnar catalog when it is enabled.
+    """
+    db = SessionLocal()
+    shards = [sharding.shard_router.session_on(shard) for shard in sharding.shard_router.engines()[1:]]
+    try:
+        fuzzy_index.rebuild(db, *shards)
+        autocomplete_index.rebuild(db, *shards)
+        if columnar_catalog.COLUMNAR_CATALOG:
+            if not columnar_catalog.available():
+                logger.warning("COLUMNAR_CATALOG is set but NumPy isn't installed; catalog reads stay on SQL")
+            elif sharding.shard_router.sharded:
+                logger.warning("COLUMNAR_CATALOG is ignored while the catalog is sharded across databases")
+            else:
+                columnar_catalog.columnar_catalog.rebuild(db)
+    finally:
+        for shard_db in shards:
+            shard_db.close()
+        db.close()
+
+def rebuild_after_missed_deltas(delta: dict) -> None:
+    """Reload the search indexes when the stock stream may have dropped other workers' writes"""
+    if delta["type"] == "reset":
+        rebuild_search_indexes()
+
+stock_stream.subscribe_remote(rebuild_after_missed_deltas)
+
+async def stock_reconcile_loop():
+    """Background loop keeping sharded stock snapshots fresh"""
+    while True:
+        await asyncio.sleep(STOCK_RECONCILE_INTERVAL)
+        try:
+            await asyncio.to_thread(reconcile_sharded_stock)
+        except Exception:
+            # A failed pass is retried on the next tick
+            logger.exception("Failed to reconcile sharded stock")
+
+async def partition_maintenance_loop():
+    """Background loop creating upcoming ledger partitions and detaching expired ones"""
+    while True:
+        try:
+            await asyncio.to_thread(partitions.maintain_partitions, engine)
+        except Exception:
+            # A failed pass is retried on the next tick
+            logger.exception("Failed to maintain purchase ledger partitions")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start periodic maintenance tasks and cancel them on shutdown"""
+    request_logging.start_logging()
+    stock_stream.configure_bridge(engine)
+    stock_stream.bridge.start()
+    await asyncio.to_thread(rebuild_search_indexes)
+    background_tasks = [
+        asyncio.create_task(stock_reconcile_loop()),
+        asyncio.create_task(low_stock_notifier.run(LOW_STOCK_ALERT_INTERVAL)),
+        asyncio.create_task(job_runner.watch()),
+        asyncio.create_task(revocation_list.run()),
+        asyncio.create_task(partition_maintenance_loop()),
+        asyncio.create_task(audit_writer.run()),
+        asyncio.create_task(outbox_relay.run()),
+        asyncio.create_task(loop_lag.run()),
+        asyncio.create_task(health.db_pinger.run()),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    # Let the audit writer and outbox relay flush their last batch
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await job_runner.shutdown()
+    stock_stream.bridge.stop()
+    shard_router.dispose()
+    request_logging.stop_logging()
 
 # Initialize FastAPI application
 app = FastAPI(
     title="Sweet Shop Management System",
     description="A comprehensive API for managing a sweet shop inventory with user authentication",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Opt-in profiling of single requests by admins; a pass-through otherwise
+app.add_middleware(ProfilingMiddleware)
+
 #Configure CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -24,10 +145,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browser clients read versions for If-Match
+    expose_headers=["ETag"],
 )
 
+# Outermost, so access log timings cover every other middleware
+app.add_middleware(AccessLogMiddleware)
+
+app.include_router(health.router)
 app.include_router(auth.router)
+app.include_router(batch.router)
+# Before sweets, whose /{sweet_id} routes would otherwise shadow /jobs
+app.include_router(jobs.router)
 app.include_router(sweets.router)
+app.include_router(analytics.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
 
 @app.get("/")
 async def root():
@@ -41,7 +174,7 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint for monitoring"""
+    """Health check endpoint for monitoring; see /api/health/ready for real readiness"""
     return {"status": "healthy", "message": "Sweet Shop API is running"}
 
 if __name__ == "__main__":
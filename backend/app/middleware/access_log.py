@@ -0,0 +1,101 @@
+"""
+Access log middleware.
+Writes one structured log record per HTTP request with timing, route
+template, query string, status, user id and time spent in the database,
+and counts requests in flight for the readiness probe. Credentials passed
+in the query string are redacted before they reach the log.
+"""
+import logging
+import time
+from urllib.parse import parse_qsl, urlencode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.health import in_flight
+from app.services.request_logging import request_context
+
+access_logger = logging.getLogger("app.access")
+
+# Query parameters whose values never reach the log
+SENSITIVE_PARAMS = frozenset({"access_token", "token", "refresh_token", "password", "api_key", "key", "secret"})
+REDACTED = "[redacted]"
+
+_route_templates = {}
+
+def _loggable_query(query_string: bytes) -> str:
+    """Query string with the values of sensitive parameters replaced"""
+    if not query_string:
+        return ""
+    pairs = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    return urlencode(
+        [(name, REDACTED if name.lower() in SENSITIVE_PARAMS else value) for name, value in pairs],
+        safe="[]"
+    )
+
+def _route_template(scope: Scope) -> str:
+    """Path template of the matched route, e.g. /api/sweets/{sweet_id}"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return scope["path"]
+    if endpoint not in _route_templates:
+        _route_templates[endpoint] = next(
+            (route.path for route in app.routes if getattr(route, "endpoint", None) is endpoint),
+            None
+        )
+    return _route_templates[endpoint] or scope["path"]
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI middleware; the record is handed to the log queue after the
+    response has been sent, so it adds no I/O to the request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = {}
+        token = request_context.set(context)
+        started = time.perf_counter()
+        status = {"code": 500}
+        counted = True
+        in_flight.enter()
+
+        def leave_in_flight() -> None:
+            nonlocal counted
+            if counted:
+                counted = False
+                in_flight.leave()
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                # Streaming responses stay open long after this; only count the wait for it
+                leave_in_flight()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            leave_in_flight()
+            request_context.reset(token)
+            client = scope.get("client")
+            access_logger.info(
+                "%s %s %s", scope["method"], scope["path"], status["code"],
+                extra={"fields": {
+                    "type": "access",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": _loggable_query(scope.get("query_string", b"")) or None,
+                    "route": _route_template(scope),
+                    "status": status["code"],
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "db_ms": round(context.get("db_ms", 0.0), 3),
+                    "db_queries": context.get("db_queries", 0),
+                    "user_id": context.get("user_id"),
+                    "client": client[0] if client else None,
+                }},
+            )
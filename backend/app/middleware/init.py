@@ -0,0 +1 @@
+# Middleware package initialization
\ No newline at end of file
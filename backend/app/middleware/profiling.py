@@ -0,0 +1,80 @@
+"""
+Profiling middleware for on-demand request profiling.
+Profiles a single request when an admin asks for it with the
+X-Profile header or the `profile` query flag.
+"""
+from typing import Optional
+from urllib.parse import parse_qsl
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.database.connection import SessionLocal
+from app.routers.auth import get_current_user
+from app.routers.sweets import require_admin
+from app.services.profiling import Profile, profiling
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_FLAG = "profile"
+
+def _wants_profile(scope: Scope) -> bool:
+    """Cheap check for the opt-in flag; everything else is skipped for normal requests"""
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.strip() not in (b"", b"0", b"false")
+    query = scope.get("query_string", b"")
+    if PROFILE_QUERY_FLAG.encode() in query:
+        return dict(parse_qsl(query.decode())).get(PROFILE_QUERY_FLAG, "0") not in ("", "0", "false")
+    return False
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode().partition(" ")
+            if scheme.lower() == "bearer":
+                return token
+    return None
+
+async def _admin_id(scope: Scope) -> Optional[int]:
+    """Id of the requesting admin, or None if the caller may not profile"""
+    token = _bearer_token(scope)
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        return require_admin(await get_current_user(token, db)).id
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware so unprofiled requests pass straight through.
+    Profiled responses carry an X-Profile-Id header naming the stored
+    profile. A profiling flag from a non-admin is ignored.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = await _admin_id(scope)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], user_id)
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode())
+                ]
+            await send(message)
+
+        with profiling(profile):
+            await self.app(scope, receive, send_with_profile_id)
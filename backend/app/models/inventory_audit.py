@@ -0,0 +1,29 @@
+"""
+Inventory audit model.
+Append-only trail of who changed which sweet, and how.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from app.database.connection import Base
+from app.models.purchase import utc_now
+
+class InventoryAudit(Base):
+    """
+    One inventory change: a purchase, restock, update, create or delete.
+    `user_id` is who made the request; it is empty for background jobs.
+    Sweet and user ids are plain columns so the trail outlives both.
+    """
+
+    __tablename__ = "inventory_audit"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    action = Column(String, nullable=False)
+    sweet_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    previous_quantity = Column(Integer, nullable=True)
+    quantity = Column(Integer, nullable=True)
+    changes = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+    __table_args__ = (
+        Index("ix_inventory_audit_sweet_created", sweet_id, created_at),
+    )
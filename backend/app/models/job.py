@@ -0,0 +1,32 @@
+"""
+Job model for long-running admin operations.
+Persists job state and progress so work survives worker restarts.
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from app.database.connection import Base
+from app.models.purchase import utc_now
+
+class Job(Base):
+    """
+    Job model storing one background job and its progress.
+
+    `cursor` is the last sweet id whose chunk was committed; resuming
+    continues after it. `owner` and `heartbeat_at` form a lease so only
+    one worker runs a job at a time and a dead worker's jobs are picked up.
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pending", index=True)
+    cursor = Column(Integer, nullable=True)
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,24 @@
+"""
+Outbox model for inventory events.
+Events are inserted in the same transaction as the change they describe
+and delivered to downstream consumers by a relay.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.database.connection import Base
+from app.models.purchase import utc_now
+
+class OutboxEvent(Base):
+    """
+    One committed inventory event waiting to be delivered.
+    Rows are deleted by the relay once every sink has accepted them,
+    so the table only ever holds the undelivered backlog; `id` gives the
+    delivery order and lets consumers drop duplicates.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False)
+    sweet_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
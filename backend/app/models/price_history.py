@@ -0,0 +1,45 @@
+"""
+Price history models.
+Every price a sweet takes is appended as one small row, and hourly and
+daily min/max/last rollups are maintained alongside so long ranges are
+charted without reading raw changes.
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from app.database.connection import Base
+from app.models.purchase import utc_now
+
+class PriceChange(Base):
+    """
+    One price a sweet was set to, and when.
+    The sweet id is a plain column so history outlives deleted sweets.
+    """
+
+    __tablename__ = "price_changes"
+    __table_args__ = (
+        Index("ix_price_changes_sweet_changed", "sweet_id", "changed_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sweet_id = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+class PriceRollup(Base):
+    """
+    Price summary of one sweet over one hour or one day.
+
+    `bucket` is the start of the period in UTC. `last_price` is the price
+    set at `last_at`, the latest change in the period, so late writes of
+    earlier changes don't overwrite it.
+    """
+
+    __tablename__ = "price_rollups"
+
+    resolution = Column(String, primary_key=True)
+    sweet_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    last_price = Column(Float, nullable=False)
+    last_at = Column(DateTime(timezone=True), nullable=False)
+    changes = Column(Integer, nullable=False, default=0)
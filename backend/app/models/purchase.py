@@ -0,0 +1,38 @@
+"""
+Purchase model for the sales ledger.
+Records every completed purchase as an append-only row.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from app.database.connection import Base
+
+def utc_now() -> datetime:
+    """Current time as an aware UTC datetime"""
+    return datetime.now(timezone.utc)
+
+class Purchase(Base):
+    """
+    Purchase model storing one ledger entry per purchase.
+    Sweet details are copied in so history survives sweet edits and deletes.
+
+    On Postgres the migrations create this table partitioned by month on
+    `purchased_at`, with primary key (id, purchased_at); ids still come
+    from one sequence, so `id` alone identifies a row.
+    """
+
+    __tablename__ = "purchases"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    sweet_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sweet_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)
+    total_cost = Column(Float, nullable=False)
+    purchased_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, index=True)
+
+    __table_args__ = (
+        # Per-user history, newest first, paged by (purchased_at, id)
+        Index("ix_purchases_user_history", user_id, purchased_at, id),
+    )
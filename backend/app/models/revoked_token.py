@@ -0,0 +1,21 @@
+"""
+Revoked token model for logout and token revocation.
+Records access tokens that must be rejected before they expire.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from app.database.connection import Base
+from app.models.purchase import utc_now
+
+class RevokedToken(Base):
+    """
+    One revoked access token, identified by its `jti` claim.
+    Rows are only needed until `expires_at`; after that the token is
+    rejected as expired anyway and the row is pruned.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, index=True)
@@ -0,0 +1,28 @@
+"""
+Sales rollup model for analytics.
+Holds per sweet, per day unit and revenue totals maintained on every purchase.
+"""
+from sqlalchemy import Column, Integer, String, Float, Date, Index
+from app.database.connection import Base
+
+class SalesDailyRollup(Base):
+    """
+    Daily sales totals for one sweet.
+
+    Hot sweets with stock slots spread their rollup writes over the same
+    number of buckets, so the rollup row doesn't become the new point of
+    contention; readers always sum across buckets.
+    """
+
+    __tablename__ = "sales_daily_rollups"
+    __table_args__ = (
+        Index("ix_sales_daily_rollups_category_day", "category", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    sweet_id = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True, default=0)
+    sweet_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,18 @@
+"""
+Stock shard model for hot sweets.
+Splits a sweet's quantity across several counter rows so purchases
+don't all serialize on the same sweets row.
+"""
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database.connection import Base
+
+class SweetStockShard(Base):
+    """
+    One counter slot holding part of a sharded sweet's stock.
+    """
+
+    __tablename__ = "sweet_stock_shards"
+
+    sweet_id = Column(Integer, ForeignKey("sweets.id", ondelete="CASCADE"), primary_key=True)
+    slot = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
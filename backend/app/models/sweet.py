@@ -3,8 +3,10 @@ Sweet model for managing candy inventory.
 Represents individual sweet products in the shop.
 """
 
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Index, func
+from sqlalchemy.orm import relationship
 from app.database.connection import Base
+from app.models.stock_shard import SweetStockShard
 
 class Sweet(Base):
     """
@@ -12,9 +14,43 @@ class Sweet(Base):
     """
 
     __tablename__ = "sweets"
+    __table_args__ = (
+        # Covers the grouped facet aggregate, so it can be an index-only scan
+        Index("ix_sweets_category_price_quantity", "category", "price", "quantity"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, nullable=False, index=True)
     category = Column(String, nullable=False, index=True)
     price = Column(Float, nullable=False)
-    quantity = Column(Integer, nullable=False, default=0)
\ No newline at end of file
+    quantity = Column(Integer, nullable=False, default=0)
+    # Stock at or below this level counts as low and should be reordered
+    reorder_threshold = Column(Integer, nullable=False, default=10, server_default="10")
+    # Number of stock counter slots; 0 means quantity lives only on this row
+    stock_slots = Column(Integer, nullable=False, default=0, server_default="0")
+    # Physical shop holding this sweet; also decides which database shard it lives on
+    store_id = Column(Integer, nullable=False, default=1, server_default="1", index=True)
+    # Bumped by every write to this row; ORM flushes only succeed against the version they loaded
+    version = Column(Integer, nullable=False, server_default="1")
+
+    shards = relationship(SweetStockShard, cascade="all, delete-orphan", passive_deletes=True)
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Composite indexes for filtered, sorted catalog pages: an equality match on
+# lower(category) followed by the sort column and id, so a category + price
+# range query sorted by price is a single ordered index range scan.
+Index("ix_sweets_lower_category_price_id", func.lower(Sweet.category), Sweet.price, Sweet.id)
+Index("ix_sweets_lower_category_name_id", func.lower(Sweet.category), Sweet.name, Sweet.id)
+Index("ix_sweets_price_id", Sweet.price, Sweet.id)
+
+# Partial index holding only sweets at or below their reorder threshold, so
+# the low-stock listing stays small no matter how large the catalog grows.
+Index(
+    "ix_sweets_low_stock",
+    Sweet.quantity,
+    Sweet.id,
+    postgresql_where=Sweet.quantity <= Sweet.reorder_threshold,
+    sqlite_where=Sweet.quantity <= Sweet.reorder_threshold,
+)
@@ -0,0 +1,75 @@
+"""
+Analytics router for sales reporting.
+Serves admin sales reports from the daily sales rollups.
+"""
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from app.database.connection import ReleasingRoute, get_db
+from app.models.purchase import utc_now
+from app.models.user import User
+from app.routers.sweets import require_admin
+from app.schemas.analytics import TopSeller, CategoryRevenue, DailyRevenue
+from app.services import analytics_service
+
+router = APIRouter(prefix="/api/analytics", tags=["Analytics"], route_class=ReleasingRoute)
+
+# Reports cover the last 30 days unless a range is given
+DEFAULT_RANGE_DAYS = 30
+
+def date_range(
+    start: Optional[date] = Query(None, description="First day of the report (inclusive)"),
+    end: Optional[date] = Query(None, description="Last day of the report (inclusive)")
+) -> Tuple[date, date]:
+    """
+    Dependency resolving the report day range.
+    Defaults to the last 30 days ending today (UTC).
+    """
+    end = end or utc_now().date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must not be after end date"
+        )
+    return start, end
+
+@router.get("/top-sellers", response_model=List[TopSeller])
+async def get_top_sellers(
+    days: Tuple[date, date] = Depends(date_range),
+    limit: int = Query(10, ge=1, le=100, description="Number of sweets to return"),
+    by: str = Query("units", pattern="^(units|revenue)$", description="Rank by units or revenue"),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Get the best selling sweets (Admin only).
+    Ranks sweets by units sold or revenue over the date range.
+    """
+    return analytics_service.top_sellers(db, *days, limit=limit, by=by)
+
+@router.get("/revenue-by-category", response_model=List[CategoryRevenue])
+async def get_revenue_by_category(
+    days: Tuple[date, date] = Depends(date_range),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Get sales totals per category (Admin only).
+    Returns units and revenue for each category over the date range.
+    """
+    return analytics_service.revenue_by_category(db, *days)
+
+@router.get("/daily-revenue", response_model=List[DailyRevenue])
+async def get_daily_revenue(
+    days: Tuple[date, date] = Depends(date_range),
+    category: Optional[str] = Query(None, description="Limit to one category"),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Get sales totals per day (Admin only).
+    Returns units and revenue for each day with sales in the date range.
+    """
+    return analytics_service.daily_revenue(db, *days, category=category)
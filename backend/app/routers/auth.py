@@ -2,49 +2,84 @@
 Authentication router for user registration and login.
 Handles JWT token generation and user authentication.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from contextvars import ContextVar
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from app.database.connection import get_db
+from app.database.connection import ReleasingRoute, get_db
 from app.schemas.user import UserRegister, UserResponse, Token
+from app.schemas.analytics import PurchaseHistoryPage
 from app.models.user import User
+from app.services import analytics_service
 from app.services.auth_service import AuthService
-from typing import Optional
+from app.services.request_logging import set_context
+from app.services.revocation import revoke_token
+from typing import Optional, Tuple
 
-router = APIRouter(prefix="/api/auth", tags=["Authentication"])
+router = APIRouter(prefix="/api/auth", tags=["Authentication"], route_class=ReleasingRoute)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """
-    Dependency to get current authenticated user from JWT token.
-    Used to protect authenticated routes.
-    """
-    credentials_exception = HTTPException(
+# (token, user) resolved once for every sub-request of a batch request
+batch_user: ContextVar[Optional[Tuple[str, User]]] = ContextVar("batch_user", default=None)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    # Verify token
+
+def _verified_claims(token: str) -> dict:
+    """Decode a token's claims, raising 401 unless it is valid and unrevoked"""
     payload = AuthService.verify_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    username: str = payload.get("sub")
-    user_id: int = payload.get("user_id")
+    if payload is None or payload.get("sub") is None or payload.get("user_id") is None:
+        raise _credentials_exception()
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    Dependency to get current authenticated user from JWT token.
+    Used to protect authenticated routes.
+    """
+    resolved = batch_user.get()
+    if resolved is not None and resolved[0] == token:
+        return resolved[1]
     
-    if username is None or user_id is None:
-        raise credentials_exception
+    payload = _verified_claims(token)
     
     # Get user from database
-    user = db.query(User).filter(User.id == user_id, User.username == username).first()
+    user = db.query(User).filter(User.id == payload["user_id"], User.username == payload["sub"]).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
+    set_context(user_id=user.id)
     return user
 
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Dependency authenticating from the JWT alone, without a database lookup.
+    For hot read-only routes such as autocomplete: a revoked token is
+    still rejected, but a deleted user's token works until it expires.
+    """
+    payload = _verified_claims(token)
+    set_context(user_id=payload["user_id"])
+    return payload
+
+async def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None, description="Token for clients that can't send headers"),
+    db: Session = Depends(get_db)
+):
+    """
+    Dependency authenticating streaming clients.
+    Browsers' EventSource can't set headers, so the token may also be
+    passed as the access_token query parameter.
+    """
+    return await get_current_user(token or access_token or "", db)
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     """
@@ -105,7 +140,47 @@ async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Sessi
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/logout")
+async def logout_user(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Revoke the access token used for this request.
+    The token is rejected by every worker from now until it expires.
+    """
+    payload = AuthService.verify_token(token)
+    if payload is None or not payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token can't be revoked"
+        )
+    
+    revoke_token(db, payload["jti"], payload["exp"], current_user.id)
+    return {"message": "Logged out successfully"}
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current authenticated user information"""
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.get("/me/purchases", response_model=PurchaseHistoryPage)
+async def get_purchase_history(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100, description="Purchases per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Get the current user's purchase history, newest first.
+    Follow `next_cursor` to fetch older purchases; it is null on the last page.
+    """
+    try:
+        items, next_cursor = analytics_service.purchase_history(db, current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,69 @@
+"""
+Batch router for collapsing many API calls into one round trip.
+Sub-requests share one authentication and one database session.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+from app.database.connection import ReleasingRoute, get_db, shared_session
+from app.models.user import User
+from app.routers.auth import batch_user, get_current_user, oauth2_scheme
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.services import batch
+
+router = APIRouter(prefix="/api", tags=["Batch"], route_class=ReleasingRoute)
+
+# Most sub-requests accepted by one batch
+MAX_BATCH_REQUESTS = 20
+
+@router.post("/batch", response_model=BatchResponse)
+async def run_batch(
+    batch_request: BatchRequest,
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Run several sweets and auth API calls in one request.
+    The caller is authenticated once and every sub-request uses the same
+    database session. Consecutive GETs run concurrently, taking turns on
+    the shared session; writes run one at a time in the order given. Each
+    result carries its own status code.
+    """
+    items = batch_request.requests
+    if len(items) > MAX_BATCH_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may hold at most {MAX_BATCH_REQUESTS} requests"
+        )
+    
+    results = [None] * len(items)
+    runnable = []
+    for index, item in enumerate(items):
+        try:
+            batch.check_item(item)
+            runnable.append(index)
+        except batch.BatchItemError as exc:
+            results[index] = (status.HTTP_400_BAD_REQUEST, {"detail": str(exc)})
+    
+    session_token = shared_session.set(db)
+    user_token = batch_user.set((token, current_user))
+    try:
+        for step in batch.plan([items[index] for index in runnable]):
+            step = [runnable[position] for position in step]
+            outcomes = await batch.run_step(request, [items[index] for index in step])
+            for index, outcome in zip(step, outcomes):
+                results[index] = outcome
+                # A failed write may leave changes behind; later items start clean
+                if outcome[0] >= 400 and items[index].method != "GET":
+                    db.rollback()
+    finally:
+        batch_user.reset(user_token)
+        shared_session.reset(session_token)
+    
+    return {
+        "results": [
+            {"id": item.id, "status": result[0], "body": result[1]}
+            for item, result in zip(items, results)
+        ]
+    }
@@ -0,0 +1,27 @@
+"""
+Health router for orchestrator probes.
+Liveness says the process is serving; readiness says it should get traffic.
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.database.connection import engine
+from app.services import health
+
+router = APIRouter(prefix="/api/health", tags=["Health"])
+
+db_pinger = health.DbPinger(engine)
+
+@router.get("/live")
+async def liveness():
+    """Liveness probe: answers as long as the event loop is running"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe from cached signals: last DB ping, pool saturation,
+    event-loop lag and in-flight requests. Returns 503 when any check fails.
+    Cheap enough to poll every second; it never queries the database.
+    """
+    report = health.readiness(engine, db_pinger)
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
@@ -0,0 +1,65 @@
+"""
+Job router for long-running admin operations.
+Starts bulk inventory jobs in the background and reports their progress.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List
+from app.database.connection import ReleasingRoute, get_db
+from app.models.job import Job
+from app.models.user import User
+from app.routers.sweets import require_admin
+from app.schemas.job import JobCreate, JobResponse
+from app.services import job_service
+
+router = APIRouter(prefix="/api/sweets/jobs", tags=["Jobs"], route_class=ReleasingRoute)
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_data: JobCreate,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Start a background job (Admin only).
+    Supported kinds: `restock` ({quantity, category?}) and
+    `reprice` ({percent, category?}). Jobs change sweets on the default
+    store only, not on store shards. Returns immediately; poll the job for progress.
+    """
+    try:
+        job = job_service.create_job(db, job_data.kind, job_data.params, admin_user.id)
+    except job_service.JobError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    
+    job_service.job_runner.submit(job.id)
+    return job
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of jobs")
+):
+    """List the most recent jobs (Admin only)"""
+    return db.query(Job).order_by(Job.id.desc()).limit(limit).all()
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Get a job's status and progress (Admin only).
+    `processed` out of `total` sweets have been committed so far.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
@@ -0,0 +1,35 @@
+"""
+Metrics router for operational monitoring.
+Exposes database connection hold times for sizing the connection pool
+and the outbox relay's delivery lag.
+"""
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+from app.database.connection import ReleasingRoute, engine
+from app.models.user import User
+from app.routers.sweets import require_admin
+from app.services.metrics import connection_hold_ms, pool_status
+from app.services.outbox import outbox_relay
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"], route_class=ReleasingRoute)
+
+@router.get("/db-connections")
+async def get_db_connection_metrics(admin_user: User = Depends(require_admin)):
+    """
+    Connection hold times and pool occupancy (Admin only).
+    `hold_time` is a histogram of how long each checkout kept a pooled
+    connection, in milliseconds, with cumulative bucket counts.
+    """
+    return {
+        "hold_time": connection_hold_ms.snapshot(),
+        "pool": pool_status(engine),
+    }
+
+@router.get("/outbox")
+async def get_outbox_metrics(admin_user: User = Depends(require_admin)):
+    """
+    Outbox backlog and delivery lag (Admin only).
+    `backlog.lag_seconds` is the age of the oldest undelivered event;
+    `delivery_lag` is a histogram of commit-to-delivery times in milliseconds.
+    """
+    return dict(outbox_relay.stats(), backlog=await run_in_threadpool(outbox_relay.backlog))
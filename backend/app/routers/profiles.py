@@ -0,0 +1,53 @@
+"""
+Profiles router for downloading request profiles.
+Serves profiles captured by the profiling middleware to admins.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import List
+from app.database.connection import ReleasingRoute
+from app.models.user import User
+from app.routers.sweets import require_admin
+from app.services.profiling import Profile, profile_store
+
+router = APIRouter(prefix="/api/profiles", tags=["Profiles"], route_class=ReleasingRoute)
+
+def get_profile(profile_id: str) -> Profile:
+    """Dependency loading a stored profile or raising 404"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile
+
+@router.get("/", response_model=List[dict])
+async def list_profiles(admin_user: User = Depends(require_admin)):
+    """
+    List stored request profiles, newest first (Admin only).
+    Profile a request by sending it with `X-Profile: 1` or `?profile=1`.
+    """
+    return [profile.summary() for profile in profile_store.list()]
+
+@router.get("/{profile_id}")
+async def get_profile_report(
+    profile: Profile = Depends(get_profile),
+    admin_user: User = Depends(require_admin)
+):
+    """Get a profile's timing, hottest functions and SQL statements (Admin only)"""
+    return profile.report()
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse)
+async def download_folded_stacks(
+    profile: Profile = Depends(get_profile),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Download a profile's samples as folded stacks (Admin only).
+    Feed the file to flamegraph.pl or open it in speedscope.
+    """
+    return PlainTextResponse(
+        profile.folded(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.folded"'}
+    )
@@ -2,16 +2,40 @@
 Sweet management router for CRUD operations and inventory management.
 Handles sweet creation, listing, searching, purchasing, and restocking.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.connection import get_db
-from app.schemas.sweet import SweetCreate, SweetUpdate, SweetResponse, PurchaseRequest, RestockRequest
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from app.database import sharding
+from app.database.connection import ReleasingRoute, get_db
+from app.database.sharding import get_store_db
+from app.schemas.sweet import (
+    SweetCreate, SweetUpdate, SweetResponse, SparseSweetResponse, PurchaseRequest, RestockRequest, BatchRestockRequest,
+    PriceAdjustmentRequest, PriceAdjustmentResult, PriceHistory, StockShardingRequest, CatalogFacets,
+    FuzzyMatch, FuzzyIndexStats, AutocompleteSuggestion, AutocompleteIndexStats
+)
+from app.models.purchase import utc_now
 from app.models.sweet import Sweet
 from app.models.user import User
-from app.routers.auth import get_current_user
+from app.routers.auth import get_current_user, get_stream_user, get_token_claims
+from app.services import (
+    analytics_service, catalog_service, events, outbox, price_history, pricing_service, stock_service, stock_stream
+)
+from app.services.autocomplete import autocomplete_index
+from app.services.fuzzy_index import fuzzy_index
 
-router = APIRouter(prefix="/api/sweets", tags=["Sweets"])
+router = APIRouter(prefix="/api/sweets", tags=["Sweets"], route_class=ReleasingRoute)
+
+# Most entries accepted by one batch restock
+MAX_BATCH_RESTOCK = 1000
+# Price history covers the last 30 days unless a range is given
+PRICE_HISTORY_DEFAULT_DAYS = 30
+# Tries at a shard-range sweet id when concurrent creates keep taking it first
+ID_ALLOCATION_ATTEMPTS = 5
 
 def require_admin(current_user: User = Depends(get_current_user)):
     """
@@ -25,6 +49,66 @@ def require_admin(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+def _load_sweets(db: Session, shard, *criteria, order_by=(), limit: Optional[int] = None) -> List[Sweet]:
+    """
+    Sweets matching the criteria on one shard, with exact stock; the
+    request session serves the default shard, a short-lived one the others.
+    """
+    with sharding.shard_sessions(db, [shard]) as sessions:
+        sweets = sessions[shard].query(Sweet).filter(*criteria).order_by(*order_by).limit(limit).all()
+        stock_service.apply_sharded_totals(sessions[shard], sweets)
+        return sweets
+
+async def sweet_fields(
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. id,quantity; all when omitted"
+    )
+) -> Optional[Tuple[str, ...]]:
+    """
+    Dependency parsing a sparse fieldset against the allow-list.
+    Raises 400 for unknown fields.
+    """
+    try:
+        return catalog_service.parse_fields(fields)
+    except catalog_service.UnknownFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+def sweet_etag(sweet: Sweet) -> str:
+    """Entity tag of a sweet's current version"""
+    return f'"{sweet.version}"'
+
+def check_if_match(if_match: Optional[str], sweet: Sweet) -> None:
+    """
+    Enforce an If-Match precondition against a sweet's current version.
+    Raises 412 unless the header is absent, `*`, or lists the current tag.
+    """
+    if if_match is None:
+        return
+    tags = [tag.strip().removeprefix("W/") for tag in if_match.split(",")]
+    if "*" not in tags and sweet_etag(sweet) not in tags:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Sweet has been modified since it was read"
+        )
+
+def commit_versioned(db: Session, if_match: Optional[str], flush_only: bool = False) -> None:
+    """
+    Commit an ORM write to a sweet, or with flush_only just flush it. The
+    flush only matches the version the row was loaded with, so a concurrent
+    write surfaces here: 412 for conditional requests, 409 otherwise.
+    """
+    try:
+        if flush_only:
+            db.flush()
+        else:
+            db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if if_match is not None else status.HTTP_409_CONFLICT,
+            detail="Sweet was modified concurrently"
+        )
+
 @router.post("/", response_model=SweetResponse, status_code=status.HTTP_201_CREATED)
 async def create_sweet(
     sweet_data: SweetCreate,
@@ -33,7 +117,22 @@ async def create_sweet(
 ):
     """
     Create a new sweet (Admin only).
-    Adds a new sweet product to the inventory.
+    Adds a new sweet product to the inventory of its store's shard.
+    """
+    shards = sharding.shard_router
+    shard = shards.engine_for(sweet_data.store_id)
+    if shard is shards.default_engine:
+        return _insert_sweet(db, sweet_data)
+    store_db = shards.session_for(sweet_data.store_id)
+    try:
+        return _insert_sweet(store_db, sweet_data, shards.id_range(shard))
+    finally:
+        store_db.close()
+
+def _insert_sweet(db: Session, sweet_data: SweetCreate, id_range: Optional[Tuple[int, int]] = None) -> Sweet:
+    """
+    Insert a sweet unless its name is taken, and announce it.
+    With `id_range` its id is the next free one in that shard's range.
     """
     # Check if sweet with same name already exists
     existing_sweet = db.query(Sweet).filter(Sweet.name == sweet_data.name).first()
@@ -43,28 +142,159 @@ async def create_sweet(
             detail="Sweet with this name already exists"
         )
     
-    # Create new sweet
-    new_sweet = Sweet(**sweet_data.model_dump())
-    db.add(new_sweet)
+    # Create new sweet; a ranged id taken by a concurrent create is allocated again
+    for attempt in range(ID_ALLOCATION_ATTEMPTS):
+        new_sweet = Sweet(**sweet_data.model_dump())
+        if id_range:
+            try:
+                new_sweet.id = sharding.next_sweet_id(db, id_range)
+            except sharding.IdRangeExhaustedError as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+                    detail=str(exc)
+                )
+        db.add(new_sweet)
+        try:
+            db.flush()
+            break
+        except IntegrityError:
+            db.rollback()
+            taken = id_range and db.query(Sweet.id).filter(Sweet.id == new_sweet.id).first() is not None
+            if not taken or attempt == ID_ALLOCATION_ATTEMPTS - 1:
+                raise
+    # The opening price starts the sweet's price history
+    price_history.record_prices(db, [(new_sweet.id, new_sweet.price)])
     db.commit()
     db.refresh(new_sweet)
     
+    events.publish(events.SWEET_CREATED, sweet=catalog_service.sweet_snapshot(new_sweet))
     return new_sweet
 
+async def _catalog_page(db: Session, store_id: Optional[int], **params) -> List[dict]:
+    """
+    One store's page from its shard, or with several shards and no store,
+    a page gathered from all of them.
+    """
+    if store_id is None and sharding.shard_router.sharded:
+        return await catalog_service.search_shards(sharding.shard_router.engines(), **params)
+    return await catalog_service.search_sweets(db, store_id=store_id, **params)
+
+def sparse_response(content):
+    """
+    JSON response holding only the fields a client asked for. Returned
+    as-is, bypassing the route's full response model, which keeps
+    documenting and validating the default shape.
+    """
+    def trim(row: dict) -> dict:
+        return SparseSweetResponse.model_validate(row).model_dump(exclude_unset=True)
+    rows = [trim(row) for row in content] if isinstance(content, list) else trim(content)
+    return JSONResponse(jsonable_encoder(rows))
+
 @router.get("/", response_model=List[SweetResponse])
 async def get_sweets(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_store_db),
+    current_user: User = Depends(get_current_user),
+    fields: Optional[Tuple[str, ...]] = Depends(sweet_fields),
+    store_id: Optional[int] = Query(None, ge=1, description="Only sweets of this store")
 ):
     """
     Get list of all available sweets.
-    Returns all sweets in the system.
+    Returns all sweets in the system or in one store, optionally only
+    some of their fields.
     """
-    sweets = db.query(Sweet).all()
-    return sweets
+    sweets = await _catalog_page(db, store_id, fields=fields)
+    return sparse_response(sweets) if fields else sweets
 
 @router.get("/search", response_model=List[SweetResponse])
 async def search_sweets(
+    db: Session = Depends(get_store_db),
+    current_user: User = Depends(get_current_user),
+    fields: Optional[Tuple[str, ...]] = Depends(sweet_fields),
+    store_id: Optional[int] = Query(None, ge=1, description="Only sweets of this store"),
+    name: Optional[str] = Query(None, description="Search by sweet name"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    min_price: Optional[float] = Query(None, description="Minimum price filter"),
+    max_price: Optional[float] = Query(None, description="Maximum price filter"),
+    sort: Optional[str] = Query(None, pattern="^(price|name|quantity|id)$", description="Sort by column"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Sort direction"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Number of results to skip")
+):
+    """
+    Search for sweets by various criteria.
+    Supports filtering by name, category (exact, case-insensitive) and
+    price range, sorting by price, name, quantity or id, and pagination.
+    With `fields`, only the requested columns are selected and returned.
+    With `store_id` the search runs on that store's shard only; otherwise
+    every shard is searched in parallel and the results merged.
+    """
+    sweets = await _catalog_page(
+        db,
+        store_id,
+        name=name,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort,
+        order=order,
+        limit=limit,
+        offset=offset,
+        fields=fields
+    )
+    return sparse_response(sweets) if fields else sweets
+
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete_sweets(
+    claims: dict = Depends(get_token_claims),
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    by: str = Query("popularity", pattern="^(popularity|stock)$", description="Rank by recent sales or stock")
+):
+    """
+    Suggest sweets whose name, or a word in it, starts with the prefix.
+    Served from the in-memory autocomplete index with token-only
+    authentication, so keystrokes never touch the database.
+    """
+    return autocomplete_index.suggest(q, limit, by)
+
+@router.get("/autocomplete/stats", response_model=AutocompleteIndexStats)
+async def get_autocomplete_index_stats(admin_user: User = Depends(require_admin)):
+    """
+    Get autocomplete index size and memory footprint (Admin only).
+    """
+    return autocomplete_index.stats()
+
+@router.get("/fuzzy", response_model=List[FuzzyMatch])
+async def fuzzy_search_sweets(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    q: str = Query(..., min_length=1, max_length=100, description="Search text, typos allowed"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results")
+):
+    """
+    Typo-tolerant search over sweet names and categories.
+    Ranked by the in-memory trigram index; only the matched sweets are
+    loaded, each from the shard whose id range holds it.
+    """
+    ranked = fuzzy_index.search(q, limit)
+    sweets = {}
+    for shard, sweet_ids in sharding.shard_router.by_shard(sweet_id for sweet_id, _ in ranked).items():
+        sweets.update((sweet.id, sweet) for sweet in _load_sweets(db, shard, Sweet.id.in_(sweet_ids)))
+    return [
+        {"score": score, "sweet": sweets[sweet_id]}
+        for sweet_id, score in ranked
+        if sweet_id in sweets
+    ]
+
+@router.get("/fuzzy/stats", response_model=FuzzyIndexStats)
+async def get_fuzzy_index_stats(admin_user: User = Depends(require_admin)):
+    """
+    Get fuzzy search index size and memory footprint (Admin only).
+    """
+    return fuzzy_index.stats()
+
+@router.get("/facets", response_model=CatalogFacets)
+async def get_catalog_facets(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     name: Optional[str] = Query(None, description="Search by sweet name"),
@@ -73,54 +303,226 @@ async def search_sweets(
     max_price: Optional[float] = Query(None, description="Maximum price filter")
 ):
     """
-    Search for sweets by various criteria.
-    Supports filtering by name, category, and price range.
+    Get catalog facets for building filters.
+    Returns per-category counts, in-stock counts and price bounds,
+    optionally scoped by the same filters as search, across every store.
     """
-    query = db.query(Sweet)
+    if sharding.shard_router.sharded:
+        return await catalog_service.facet_shards(
+            sharding.shard_router.engines(),
+            name=name,
+            category=category,
+            min_price=min_price,
+            max_price=max_price
+        )
+    return await catalog_service.get_facets(
+        db,
+        name=name,
+        category=category,
+        min_price=min_price,
+        max_price=max_price
+    )
+
+@router.get("/low-stock", response_model=List[SweetResponse])
+async def get_low_stock_sweets(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of results")
+):
+    """
+    Get sweets at or below their reorder threshold (Admin only).
+    Emptiest shelves first across every store; each shard answers from
+    its low-stock partial index and the emptiest overall are kept.
+    """
+    sweets = [
+        sweet
+        for shard in sharding.shard_router.engines()
+        for sweet in _load_sweets(
+            db, shard, Sweet.quantity <= Sweet.reorder_threshold,
+            order_by=(Sweet.quantity, Sweet.id), limit=limit
+        )
+    ]
+    return sorted(sweets, key=lambda sweet: (sweet.quantity, sweet.id))[:limit]
+
+@router.get("/stream")
+async def stream_stock_changes(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_stream_user),
+    since: Optional[int] = Query(None, description="Resume after this stream version"),
+    last_event_id: Optional[int] = Header(None, description="Sent by EventSource on reconnect")
+):
+    """
+    Stream live stock changes as Server-Sent Events.
+    Emits `stock`, `sweet` and `deleted` events tagged with a version;
+    reconnecting clients resume from `since` or Last-Event-ID. A `reset`
+    event means deltas were missed and the client should refetch.
+    """
+    # The stream can stay open for hours; don't hold a pooled connection
+    db.close()
     
-    # Apply filters
-    if name:
-        query = query.filter(Sweet.name.ilike(f"%{name}%"))
+    subscription = stock_stream.stock_broker.subscribe(since if since is not None else last_event_id)
+    return StreamingResponse(
+        stock_stream.stream_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/restock")
+async def restock_sweets(
+    restock_data: BatchRestockRequest,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Restock many sweets in one transaction per store shard (Admin only).
+    Entries for the same sweet are added together. Either every entry
+    is applied or, if any sweet doesn't exist, none are.
+    """
+    if not 0 < len(restock_data.items) <= MAX_BATCH_RESTOCK:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {MAX_BATCH_RESTOCK} restock entries"
+        )
     
-    if category:
-        query = query.filter(Sweet.category.ilike(f"%{category}%"))
+    # Validate every restock quantity is positive
+    if any(item.quantity <= 0 for item in restock_data.items):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Restock quantity must be positive"
+        )
     
-    if min_price is not None:
-        query = query.filter(Sweet.price >= min_price)
+    quantities = {}
+    for item in restock_data.items:
+        quantities[item.sweet_id] = quantities.get(item.sweet_id, 0) + item.quantity
     
-    if max_price is not None:
-        query = query.filter(Sweet.price <= max_price)
+    groups = sharding.shard_router.by_shard(quantities)
+    with sharding.shard_sessions(db, groups) as sessions:
+        changes, missing = [], []
+        for shard, sweet_ids in groups.items():
+            try:
+                shard_changes = stock_service.restock_many(
+                    sessions[shard], {sweet_id: quantities[sweet_id] for sweet_id in sweet_ids}
+                )
+            except stock_service.UnknownSweetsError as exc:
+                missing.extend(exc.sweet_ids)
+                continue
+            for change in shard_changes:
+                outbox.record_stock_change(
+                    sessions[shard], change["sweet"], change["previous_quantity"], change["quantity"], "restock"
+                )
+            changes.extend(shard_changes)
+        if missing:
+            for shard_db in sessions.values():
+                shard_db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=str(stock_service.UnknownSweetsError(sorted(missing)))
+            )
+        for shard_db in sessions.values():
+            shard_db.commit()
+    changes.sort(key=lambda change: change["sweet"]["id"])
     
-    return query.all()
+    for change in changes:
+        events.publish_stock_change(change["sweet"], change["previous_quantity"], change["quantity"], "restock")
+    return {
+        "message": "Restock successful",
+        "items": [
+            {
+                "sweet_id": change["sweet"]["id"],
+                "restocked_quantity": quantities[change["sweet"]["id"]],
+                "previous_quantity": change["previous_quantity"],
+                "new_quantity": change["quantity"]
+            }
+            for change in changes
+        ]
+    }
+
+@router.post("/prices/adjust", response_model=PriceAdjustmentResult, response_model_exclude_none=True)
+async def adjust_prices(
+    adjustment: PriceAdjustmentRequest,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Change the price of every sweet matching the filters (Admin only).
+    `mode` is `percent` (amount is a percentage) or `absolute` (amount is
+    added to the price). New prices are rounded to `round_to` and never
+    drop below it. Every store shard is repriced, each in its own
+    transaction. With `dry_run` nothing is written and the before/after
+    price summary is returned instead.
+    """
+    try:
+        pricing_service.validate_rule(adjustment.mode, adjustment.amount, adjustment.round_to)
+    except pricing_service.PriceRuleError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    
+    rule = {"mode": adjustment.mode, "amount": adjustment.amount, "round_to": adjustment.round_to}
+    filters = {
+        "name": adjustment.name,
+        "category": adjustment.category,
+        "min_price": adjustment.min_price,
+        "max_price": adjustment.max_price,
+    }
+    with sharding.shard_sessions(db, sharding.shard_router.engines()) as sessions:
+        if adjustment.dry_run:
+            return dict(pricing_service.preview_shards(list(sessions.values()), **rule, **filters), dry_run=True)
+
+        changes = []
+        for shard_db in sessions.values():
+            changes.extend(pricing_service.apply_adjustment(shard_db, **rule, **filters))
+        for shard_db in sessions.values():
+            shard_db.commit()
+    
+    for sweet, previous_price in changes:
+        events.publish(events.SWEET_UPDATED, sweet=sweet, previous=dict(sweet, price=previous_price))
+    return {"dry_run": False, "changed": len(changes)}
 
 @router.get("/{sweet_id}", response_model=SweetResponse)
 async def get_sweet(
     sweet_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: Session = Depends(get_store_db),
+    current_user: User = Depends(get_current_user),
+    fields: Optional[Tuple[str, ...]] = Depends(sweet_fields)
 ):
     """
     Get a specific sweet by ID.
-    Returns sweet details if found.
+    Returns sweet details if found, optionally only some of its fields.
+    Full responses carry an ETag to send back as If-Match when editing.
     """
-    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    if fields:
+        sweet = catalog_service.load_sweet(db, sweet_id, fields)
+    else:
+        sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
     if not sweet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
+    if fields:
+        return sparse_response(sweet)
+    stock_service.apply_sharded_totals(db, [sweet])
+    response.headers["ETag"] = sweet_etag(sweet)
     return sweet
 
 @router.put("/{sweet_id}", response_model=SweetResponse)
 async def update_sweet(
     sweet_id: int,
     sweet_update: SweetUpdate,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    response: Response,
+    db: Session = Depends(get_store_db),
+    admin_user: User = Depends(require_admin),
+    if_match: Optional[str] = Header(None, description="ETag the edit is based on")
 ):
     """
     Update a sweet's details (Admin only).
     Updates only provided fields, leaves others unchanged.
+    With If-Match the update only applies to that version of the sweet,
+    otherwise 412; without it a write racing this one still yields 409
+    rather than being silently overwritten.
     """
     sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
     if not sweet:
@@ -128,25 +530,52 @@ async def update_sweet(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
+    check_if_match(if_match, sweet)
+    
+    previous = catalog_service.sweet_snapshot(sweet)
     
     # Update only provided fields
     update_data = sweet_update.model_dump(exclude_unset=True)
+    new_quantity = update_data.pop("quantity", None)
     for field, value in update_data.items():
         setattr(sweet, field, value)
+
+    # Sharded sweets get the new total redistributed over their slots
+    if new_quantity is not None:
+        if sweet.stock_slots:
+            previous["quantity"] = stock_service.sharded_total(db, sweet.id)
+            stock_service.set_sharded_total(db, sweet, new_quantity)
+        else:
+            sweet.quantity = new_quantity
     
+    # Flushed first so the outbox events carry the new version
+    commit_versioned(db, if_match, flush_only=True)
+    snapshot = catalog_service.sweet_snapshot(sweet)
+    if snapshot["price"] != previous["price"]:
+        price_history.record_prices(db, [(sweet.id, snapshot["price"])])
+    outbox.record(db, events.SWEET_UPDATED, sweet.id, sweet=snapshot, previous=previous)
+    if new_quantity is not None and new_quantity != previous["quantity"]:
+        outbox.record_stock_change(db, snapshot, previous["quantity"], new_quantity, "update")
     db.commit()
     db.refresh(sweet)
+    response.headers["ETag"] = sweet_etag(sweet)
+    
+    events.publish(events.SWEET_UPDATED, sweet=snapshot, previous=previous)
+    if new_quantity is not None and new_quantity != previous["quantity"]:
+        events.publish_stock_change(snapshot, previous["quantity"], new_quantity, "update")
     return sweet
 
 @router.delete("/{sweet_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_sweet(
     sweet_id: int,
-    db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin)
+    db: Session = Depends(get_store_db),
+    admin_user: User = Depends(require_admin),
+    if_match: Optional[str] = Header(None, description="ETag the delete is based on")
 ):
     """
     Delete a sweet (Admin only).
-    Removes sweet from inventory permanently.
+    Removes sweet from inventory permanently; with If-Match only if it is
+    still at that version.
     """
     sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
     if not sweet:
@@ -154,20 +583,26 @@ async def delete_sweet(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
+    check_if_match(if_match, sweet)
     
+    snapshot = catalog_service.sweet_snapshot(sweet)
     db.delete(sweet)
-    db.commit()
+    commit_versioned(db, if_match)
+    
+    events.publish(events.SWEET_DELETED, sweet=snapshot)
 
 @router.post("/{sweet_id}/purchase")
 async def purchase_sweet(
     sweet_id: int,
     purchase_data: PurchaseRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_store_db),
+    sales_db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Purchase a sweet, reducing its quantity.
-    Validates sufficient quantity is available.
+    Validates sufficient quantity is available. Stock changes on the
+    store's shard; the sale is recorded on the default database.
     """
     sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
     if not sweet:
@@ -176,30 +611,56 @@ async def purchase_sweet(
             detail="Sweet not found"
         )
     
-    # Check if sufficient quantity available
-    if sweet.quantity < purchase_data.quantity:
+    # Hot sweets take stock from one of their counter slots
+    if sweet.stock_slots:
+        try:
+            remaining = stock_service.purchase_sharded(db, sweet, purchase_data.quantity)
+        except stock_service.InsufficientStockError as exc:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc)
+            )
+        snapshot = catalog_service.sweet_snapshot(sweet)
+        analytics_service.record_sale(sales_db, sweet, current_user.id, purchase_data.quantity)
+        outbox.record_stock_change(db, snapshot, remaining + purchase_data.quantity, remaining, "purchase")
+        analytics_service.commit_sale(db, sales_db)
+        events.publish_stock_change(snapshot, remaining + purchase_data.quantity, remaining, "purchase")
+        return {
+            "message": "Purchase successful",
+            "purchased_quantity": purchase_data.quantity,
+            "remaining_quantity": remaining,
+            "total_cost": purchase_data.quantity * snapshot["price"]
+        }
+
+    # Reduce quantity atomically and record the sale in the same transaction
+    try:
+        remaining = stock_service.purchase_row(db, sweet, purchase_data.quantity)
+    except stock_service.InsufficientStockError as exc:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient quantity. Available: {sweet.quantity}, Requested: {purchase_data.quantity}"
+            detail=str(exc)
         )
+    snapshot = catalog_service.sweet_snapshot(sweet)
+    analytics_service.record_sale(sales_db, sweet, current_user.id, purchase_data.quantity)
+    # The sale's event commits with it, so the hot path stays one transaction
+    outbox.record_stock_change(db, snapshot, remaining + purchase_data.quantity, remaining, "purchase")
+    analytics_service.commit_sale(db, sales_db)
     
-    # Reduce quantity
-    sweet.quantity -= purchase_data.quantity
-    db.commit()
-    db.refresh(sweet)
-    
+    events.publish_stock_change(snapshot, remaining + purchase_data.quantity, remaining, "purchase")
     return {
         "message": "Purchase successful",
         "purchased_quantity": purchase_data.quantity,
-        "remaining_quantity": sweet.quantity,
-        "total_cost": purchase_data.quantity * sweet.price
+        "remaining_quantity": remaining,
+        "total_cost": purchase_data.quantity * snapshot["price"]
     }
 
 @router.post("/{sweet_id}/restock")
 async def restock_sweet(
     sweet_id: int,
     restock_data: RestockRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_store_db),
     admin_user: User = Depends(require_admin)
 ):
     """
@@ -221,14 +682,81 @@ async def restock_sweet(
         )
     
     # Increase quantity
-    old_quantity = sweet.quantity
-    sweet.quantity += restock_data.quantity
+    if sweet.stock_slots:
+        new_quantity = stock_service.restock_sharded(db, sweet, restock_data.quantity)
+    else:
+        new_quantity = stock_service.restock_row(db, sweet, restock_data.quantity)
+    old_quantity = new_quantity - restock_data.quantity
+    snapshot = catalog_service.sweet_snapshot(sweet)
+    outbox.record_stock_change(db, snapshot, old_quantity, new_quantity, "restock")
     db.commit()
-    db.refresh(sweet)
     
+    events.publish_stock_change(snapshot, old_quantity, new_quantity, "restock")
     return {
         "message": "Restock successful",
         "restocked_quantity": restock_data.quantity,
         "previous_quantity": old_quantity,
-        "new_quantity": sweet.quantity
+        "new_quantity": new_quantity
+    }
+
+@router.get("/{sweet_id}/price-history", response_model=PriceHistory)
+async def get_price_history(
+    sweet_id: int,
+    start: Optional[datetime] = Query(None, description="Start of the range (defaults to 30 days before end)"),
+    end: Optional[datetime] = Query(None, description="End of the range (defaults to now)"),
+    resolution: Optional[str] = Query(
+        None, pattern="^(raw|hour|day)$", description="Force a resolution instead of picking one from the range"
+    ),
+    db: Session = Depends(get_store_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Get a sweet's price history (Admin only).
+    Ranges up to two days return every change; longer ranges return
+    hourly, then daily min/max/last rollups so charts stay small.
+    """
+    end = end or utc_now()
+    start = start or end - timedelta(days=PRICE_HISTORY_DEFAULT_DAYS)
+    start, end = price_history.as_utc(start), price_history.as_utc(end)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start must not be after end"
+        )
+    return price_history.price_history(db, sweet_id, start, end, resolution)
+
+@router.put("/{sweet_id}/shards")
+async def set_stock_sharding(
+    sweet_id: int,
+    sharding_data: StockShardingRequest,
+    db: Session = Depends(get_store_db),
+    admin_user: User = Depends(require_admin)
+):
+    """
+    Split a hot sweet's stock across counter slots (Admin only).
+    Setting slots to 0 folds the stock back onto the sweet itself.
+    """
+    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).with_for_update().first()
+    if not sweet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet not found"
+        )
+    
+    if not 0 <= sharding_data.slots <= stock_service.MAX_STOCK_SLOTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Slots must be between 0 and {stock_service.MAX_STOCK_SLOTS}"
+        )
+    
+    previous = catalog_service.sweet_snapshot(sweet)
+    stock_service.set_stock_slots(db, sweet, sharding_data.slots)
+    db.commit()
+    db.refresh(sweet)
+    
+    events.publish(events.SWEET_UPDATED, sweet=catalog_service.sweet_snapshot(sweet), previous=previous)
+    return {
+        "message": "Stock sharding updated",
+        "stock_slots": sweet.stock_slots,
+        "quantity": sweet.quantity
     }
\ No newline at end of file
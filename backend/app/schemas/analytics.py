@@ -0,0 +1,45 @@
+"""
+Pydantic schemas for sales analytics responses.
+"""
+from datetime import date, datetime
+from pydantic import BaseModel
+from typing import List, Optional
+
+class TopSeller(BaseModel):
+    """Schema for a best selling sweet"""
+    sweet_id: int
+    name: str
+    category: str
+    units: int
+    revenue: float
+
+class CategoryRevenue(BaseModel):
+    """Schema for sales totals of one category"""
+    category: str
+    units: int
+    revenue: float
+
+class DailyRevenue(BaseModel):
+    """Schema for sales totals of one day"""
+    day: date
+    units: int
+    revenue: float
+
+class PurchaseRecord(BaseModel):
+    """Schema for one entry of a user's purchase history"""
+    id: int
+    sweet_id: int
+    sweet_name: str
+    category: str
+    quantity: int
+    unit_price: float
+    total_cost: float
+    purchased_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class PurchaseHistoryPage(BaseModel):
+    """Schema for one page of purchase history"""
+    items: List[PurchaseRecord]
+    next_cursor: Optional[str] = None
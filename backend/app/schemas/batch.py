@@ -0,0 +1,26 @@
+"""
+Pydantic schemas for batched API requests.
+"""
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+
+class BatchItem(BaseModel):
+    """Schema for one sub-request of a batch"""
+    id: Optional[str] = None
+    method: str = Field("GET", pattern="^(GET|POST|PUT|DELETE)$")
+    path: str
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    """Schema for a batch of sub-requests"""
+    requests: List[BatchItem] = Field(..., min_length=1)
+
+class BatchItemResult(BaseModel):
+    """Schema for the outcome of one sub-request"""
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    """Schema for batch response, one result per sub-request in order"""
+    results: List[BatchItemResult]
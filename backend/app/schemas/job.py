@@ -0,0 +1,27 @@
+"""
+Pydantic schemas for background job requests and responses.
+"""
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class JobCreate(BaseModel):
+    """Schema for starting a background job"""
+    kind: str
+    params: dict = {}
+
+class JobResponse(BaseModel):
+    """Schema for background job status response"""
+    id: int
+    kind: str
+    params: dict
+    status: str
+    processed: int
+    total: Optional[int] = None
+    cursor: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -1,8 +1,9 @@
 """
 Pydantic schemas for sweet-related API requests and responses.
 """
-from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class SweetBase(BaseModel):
     """Base schema with common sweet fields"""
@@ -10,6 +11,8 @@ class SweetBase(BaseModel):
     category: str
     price: float
     quantity: int
+    reorder_threshold: int = Field(10, ge=0)
+    store_id: int = Field(1, ge=1)
 
 class SweetCreate(SweetBase):
     """Schema for creating a new sweet"""
@@ -21,10 +24,31 @@ class SweetUpdate(BaseModel):
     category: Optional[str] = None
     price: Optional[float] = None
     quantity: Optional[int] = None
+    reorder_threshold: Optional[int] = Field(None, ge=0)
 
 class SweetResponse(SweetBase):
     """Schema for sweet data response"""
     id: int
+    stock_slots: int = 0
+    version: int = 1
+    
+    class Config:
+        from_attributes = True
+
+class SparseSweetResponse(BaseModel):
+    """
+    Schema for sweet data limited to a requested fieldset.
+    Responses omit every field that wasn't asked for.
+    """
+    id: int
+    name: Optional[str] = None
+    category: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+    reorder_threshold: Optional[int] = Field(None, ge=0)
+    store_id: Optional[int] = None
+    stock_slots: Optional[int] = None
+    version: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -35,4 +59,99 @@ class PurchaseRequest(BaseModel):
 
 class RestockRequest(BaseModel):
     """Schema for restock request"""
-    quantity: int
\ No newline at end of file
+    quantity: int
+
+class RestockItem(BaseModel):
+    """Schema for one entry of a batch restock"""
+    sweet_id: int
+    quantity: int
+
+class BatchRestockRequest(BaseModel):
+    """Schema for restocking many sweets at once"""
+    items: List[RestockItem]
+
+class PriceAdjustmentRequest(BaseModel):
+    """Schema for a bulk price rule, filtered like search"""
+    mode: str
+    amount: float
+    round_to: float = 0.01
+    name: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    dry_run: bool = False
+
+class PriceAdjustmentResult(BaseModel):
+    """Schema for the outcome or preview of a bulk price rule"""
+    dry_run: bool
+    matched: Optional[int] = None
+    changed: int
+    min_before: Optional[float] = None
+    max_before: Optional[float] = None
+    avg_before: Optional[float] = None
+    min_after: Optional[float] = None
+    max_after: Optional[float] = None
+    avg_after: Optional[float] = None
+
+class PricePoint(BaseModel):
+    """Schema for one point of a price history: a single change or an hourly/daily rollup"""
+    at: datetime
+    min_price: float
+    max_price: float
+    last_price: float
+    changes: int
+
+class PriceHistory(BaseModel):
+    """Schema for a sweet's price history over a range"""
+    sweet_id: int
+    resolution: str
+    start: datetime
+    end: datetime
+    points: List[PricePoint]
+
+class StockShardingRequest(BaseModel):
+    """Schema for splitting a sweet's stock across counter slots"""
+    slots: int
+
+class CategoryFacet(BaseModel):
+    """Schema for catalog counts and price bounds of one category"""
+    category: str
+    count: int
+    in_stock: int
+    min_price: float
+    max_price: float
+
+class CatalogFacets(BaseModel):
+    """Schema for catalog facet summary response"""
+    total: int
+    in_stock: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    categories: List[CategoryFacet]
+
+class FuzzyMatch(BaseModel):
+    """Schema for one ranked typo-tolerant search result"""
+    score: float
+    sweet: SweetResponse
+
+class FuzzyIndexStats(BaseModel):
+    """Schema for the size and memory footprint of the fuzzy search index"""
+    documents: int
+    words: int
+    trigrams: int
+    cached_matches: int
+    memory_bytes: int
+
+class AutocompleteSuggestion(BaseModel):
+    """Schema for one name suggestion served from the autocomplete index"""
+    id: int
+    name: str
+    category: str
+    quantity: int
+    popularity: int
+
+class AutocompleteIndexStats(BaseModel):
+    """Schema for the size and memory footprint of the autocomplete index"""
+    sweets: int
+    keys: int
+    memory_bytes: int
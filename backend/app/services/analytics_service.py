@@ -0,0 +1,216 @@
+"""
+Sales analytics service.
+Writes the purchase ledger and keeps daily sales rollups up to date in the
+same transaction, so reports read small rollup rows instead of raw sales.
+The ledger and rollups always live on the default database, next to the
+users they reference, whichever shard holds the sweet.
+"""
+import base64
+import logging
+import random
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.purchase import Purchase, utc_now
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.sweet import Sweet
+
+logger = logging.getLogger(__name__)
+
+def _upsert_rollup(db: Session, values: dict) -> None:
+    """Add units and revenue to a rollup row, creating it if needed"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(SalesDailyRollup).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["day", "sweet_id", "bucket"],
+            set_={
+                "units": SalesDailyRollup.units + statement.excluded.units,
+                "revenue": SalesDailyRollup.revenue + statement.excluded.revenue,
+                "sweet_name": statement.excluded.sweet_name,
+                "category": statement.excluded.category,
+            },
+        )
+        db.execute(statement)
+        return
+
+    # Portable fallback: update first, insert when the row doesn't exist yet
+    result = db.execute(
+        update(SalesDailyRollup)
+        .where(
+            SalesDailyRollup.day == values["day"],
+            SalesDailyRollup.sweet_id == values["sweet_id"],
+            SalesDailyRollup.bucket == values["bucket"],
+        )
+        .values(
+            units=SalesDailyRollup.units + values["units"],
+            revenue=SalesDailyRollup.revenue + values["revenue"],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.add(SalesDailyRollup(**values))
+        db.flush()
+
+def record_sale(
+    db: Session,
+    sweet: Sweet,
+    user_id: int,
+    quantity: int,
+    purchased_at: Optional[datetime] = None,
+) -> Purchase:
+    """
+    Append a purchase to the ledger and fold it into the daily rollup.
+    Does not commit; the caller commits together with the stock change.
+    """
+    purchased_at = purchased_at or utc_now()
+    total_cost = quantity * sweet.price
+    purchase = Purchase(
+        sweet_id=sweet.id,
+        user_id=user_id,
+        sweet_name=sweet.name,
+        category=sweet.category,
+        quantity=quantity,
+        unit_price=sweet.price,
+        total_cost=total_cost,
+        purchased_at=purchased_at,
+    )
+    db.add(purchase)
+    _upsert_rollup(db, {
+        "day": purchased_at.date(),
+        "sweet_id": sweet.id,
+        "bucket": random.randrange(sweet.stock_slots) if sweet.stock_slots else 0,
+        "sweet_name": sweet.name,
+        "category": sweet.category,
+        "units": quantity,
+        "revenue": total_cost,
+    })
+    return purchase
+
+def commit_sale(store_db: Session, sales_db: Session) -> None:
+    """
+    Commit a purchase's stock change on its store's session and its sale
+    on the default database's. For stores on the default database both
+    are one session and one transaction. Otherwise the stock change
+    commits first: the sale can't be allowed to outlive a failed stock
+    change, and a sale that fails to commit after it is logged rather than
+    failing a purchase that has already happened.
+    """
+    store_db.commit()
+    if sales_db is store_db:
+        return
+    try:
+        sales_db.commit()
+    except Exception:
+        sales_db.rollback()
+        logger.exception("Purchase committed on its store but its sale wasn't recorded")
+
+def encode_history_cursor(purchase: Purchase) -> str:
+    """Opaque cursor pointing just past a purchase in newest-first order"""
+    raw = f"{purchase.purchased_at.isoformat()}|{purchase.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_history_cursor; raises ValueError for malformed cursors"""
+    try:
+        moment, purchase_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(moment), int(purchase_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+def purchase_history(
+    db: Session,
+    user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Purchase], Optional[str]]:
+    """
+    One page of a user's purchases, newest first, and the cursor for the next page.
+
+    Pages are keyset-paginated on (purchased_at, id) so every page costs
+    the same however deep it is. The plain upper bound on purchased_at
+    lets Postgres prune the monthly partitions newer than the cursor;
+    with ORDER BY ... LIMIT the remaining partitions are read newest
+    first and stop as soon as the page is full, so a recent page touches
+    one or two partitions regardless of how much history exists.
+    """
+    query = db.query(Purchase).filter(Purchase.user_id == user_id)
+    if cursor:
+        purchased_at, purchase_id = decode_history_cursor(cursor)
+        query = query.filter(
+            Purchase.purchased_at <= purchased_at,
+            tuple_(Purchase.purchased_at, Purchase.id) < tuple_(purchased_at, purchase_id),
+        )
+    rows = query.order_by(Purchase.purchased_at.desc(), Purchase.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def _in_range(query, start: date, end: date):
+    """Restrict a rollup query to an inclusive day range"""
+    return query.filter(SalesDailyRollup.day >= start, SalesDailyRollup.day <= end)
+
+def top_sellers(db: Session, start: date, end: date, limit: int = 10, by: str = "units") -> List[dict]:
+    """Best selling sweets in a day range, ranked by units or revenue"""
+    units = func.sum(SalesDailyRollup.units).label("units")
+    revenue = func.sum(SalesDailyRollup.revenue).label("revenue")
+    query = _in_range(
+        db.query(
+            SalesDailyRollup.sweet_id,
+            func.max(SalesDailyRollup.sweet_name).label("name"),
+            func.max(SalesDailyRollup.category).label("category"),
+            units,
+            revenue,
+        ),
+        start,
+        end,
+    ).group_by(SalesDailyRollup.sweet_id)
+    ranking = revenue if by == "revenue" else units
+    rows = query.order_by(ranking.desc(), SalesDailyRollup.sweet_id).limit(limit).all()
+    return [
+        {
+            "sweet_id": row.sweet_id,
+            "name": row.name,
+            "category": row.category,
+            "units": int(row.units),
+            "revenue": round(row.revenue, 2),
+        }
+        for row in rows
+    ]
+
+def revenue_by_category(db: Session, start: date, end: date) -> List[dict]:
+    """Units and revenue per category in a day range"""
+    rows = _in_range(
+        db.query(
+            SalesDailyRollup.category,
+            func.sum(SalesDailyRollup.units).label("units"),
+            func.sum(SalesDailyRollup.revenue).label("revenue"),
+        ),
+        start,
+        end,
+    ).group_by(SalesDailyRollup.category).order_by(func.sum(SalesDailyRollup.revenue).desc()).all()
+    return [
+        {"category": row.category, "units": int(row.units), "revenue": round(row.revenue, 2)}
+        for row in rows
+    ]
+
+def daily_revenue(db: Session, start: date, end: date, category: Optional[str] = None) -> List[dict]:
+    """Units and revenue per day in a day range, optionally for one category"""
+    query = _in_range(
+        db.query(
+            SalesDailyRollup.day,
+            func.sum(SalesDailyRollup.units).label("units"),
+            func.sum(SalesDailyRollup.revenue).label("revenue"),
+        ),
+        start,
+        end,
+    )
+    if category:
+        query = query.filter(SalesDailyRollup.category == category)
+    rows = query.group_by(SalesDailyRollup.day).order_by(SalesDailyRollup.day).all()
+    return [
+        {"day": row.day, "units": int(row.units), "revenue": round(row.revenue, 2)}
+        for row in rows
+    ]
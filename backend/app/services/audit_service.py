@@ -0,0 +1,123 @@
+"""
+Inventory audit service.
+Turns committed inventory events into audit rows and writes them in
+batches from a background task, so neither the event loop nor the
+purchase transaction waits on the audit insert.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from typing import Callable, Deque
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal
+from app.models.inventory_audit import InventoryAudit
+from app.models.purchase import utc_now
+from app.services import events
+from app.services.request_logging import get_context_value
+
+logger = logging.getLogger(__name__)
+
+# Seconds between audit flushes
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", 1))
+# Rows written per INSERT
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+# Rows buffered before the oldest are dropped rather than growing without bound
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", 50000))
+
+# Sweet fields whose changes are audited on update; quantity comes from stock events
+_AUDITED_FIELDS = ("name", "category", "price", "reorder_threshold")
+
+class AuditWriter:
+    """Buffers audit rows in memory and inserts them in batches"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self._pending: Deque[dict] = deque()
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def record(self, action: str, sweet_id: int, **values) -> None:
+        """Queue one audit row; never blocks and never touches the database"""
+        row = {
+            "action": action,
+            "sweet_id": sweet_id,
+            "user_id": get_context_value("user_id"),
+            "previous_quantity": values.get("previous_quantity"),
+            "quantity": values.get("quantity"),
+            "changes": values.get("changes"),
+            "created_at": utc_now(),
+        }
+        with self._lock:
+            if len(self._pending) >= AUDIT_MAX_PENDING:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(row)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Insert everything queued so far, one multi-row INSERT per batch"""
+        written = 0
+        while True:
+            with self._lock:
+                batch = [self._pending.popleft() for _ in range(min(AUDIT_BATCH_SIZE, len(self._pending)))]
+            if not batch:
+                return written
+            db = self.session_factory()
+            try:
+                db.execute(insert(InventoryAudit), batch)
+                db.commit()
+                written += len(batch)
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    self._pending.extendleft(reversed(batch))
+                raise
+            finally:
+                db.close()
+
+    async def run(self, interval: float = AUDIT_FLUSH_INTERVAL) -> None:
+        """Flush periodically until cancelled, then flush what is left"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception:
+                    logger.exception("Failed to write inventory audit batch")
+        finally:
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("Failed to write final inventory audit batch")
+
+audit_writer = AuditWriter()
+
+def _on_stock_changed(sweet_id: int, previous_quantity: int, quantity: int, reason: str, **payload) -> None:
+    audit_writer.record(reason, sweet_id, previous_quantity=previous_quantity, quantity=quantity)
+
+def _on_sweet_created(sweet: dict, **payload) -> None:
+    audit_writer.record("create", sweet["id"], quantity=sweet["quantity"], changes={
+        field: [None, sweet[field]] for field in _AUDITED_FIELDS
+    })
+
+def _on_sweet_updated(sweet: dict, previous: dict, **payload) -> None:
+    changes = {
+        field: [previous[field], sweet[field]]
+        for field in _AUDITED_FIELDS
+        if previous.get(field) != sweet.get(field)
+    }
+    if changes:
+        audit_writer.record("update", sweet["id"], changes=changes)
+
+def _on_sweet_deleted(sweet: dict, **payload) -> None:
+    audit_writer.record("delete", sweet["id"], previous_quantity=sweet["quantity"], quantity=0)
+
+events.subscribe(events.STOCK_CHANGED, _on_stock_changed)
+events.subscribe(events.SWEET_CREATED, _on_sweet_created)
+events.subscribe(events.SWEET_UPDATED, _on_sweet_updated)
+events.subscribe(events.SWEET_DELETED, _on_sweet_deleted)
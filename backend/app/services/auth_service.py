@@ -3,11 +3,13 @@ Authentication service for user management.
 Handles password hashing, JWT token creation, and user verification.
 """
 import os
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from dotenv import load_dotenv
+from app.services.revocation import revocation_list
 
 # Load environment variables
 load_dotenv()
@@ -43,19 +45,22 @@ class AuthService:
         else:
             expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-        to_encode.update({"exp": expire})
+        # jti identifies the token so it can be revoked before it expires
+        to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
         encode_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
         return encode_jwt
     
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
-        """Verify and decode a JWT token"""
+        """Verify and decode a JWT token, rejecting revoked tokens"""
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
         except JWTError:
             return None
+        if revocation_list.is_revoked(payload.get("jti"), payload["exp"]):
+            return None
+        return payload
 
 # Convenience functions for backwards compatibility
 verify_password = AuthService.verify_password
@@ -0,0 +1,309 @@
+"""
+Autocomplete service.
+Answers per-keystroke name suggestions from an in-memory sorted index,
+ranked by recent sales or stock, without touching the database. Built at
+startup and kept current from sweet and stock events, including those
+other workers publish through the stock stream.
+"""
+import heapq
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.purchase import utc_now
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.sweet import Sweet
+from app.services import events, stock_stream
+
+# Characters of a name kept per index key; longer prefixes are matched on these
+KEY_LENGTH = 32
+# Words of a name that suggestions can start from ("choc" finds "Milk Chocolate")
+MAX_WORD_STARTS = 4
+# Days of sales counted towards popularity
+POPULARITY_DAYS = 30
+
+RANKINGS = ("popularity", "stock")
+
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+def normalize(text: str) -> str:
+    """Lowercase with whitespace collapsed, as names are keyed"""
+    return " ".join(text.lower().split())
+
+def rank_key(score: int, sweet_id: int) -> int:
+    """Pack a score and id into one int that sorts by score descending, then id"""
+    return (-score << _ID_BITS) | sweet_id
+
+def score_of(key: int) -> int:
+    """Score packed into a rank key"""
+    return -(key >> _ID_BITS)
+
+def _joined(keys: Tuple[str, ...]) -> str:
+    """Keys in one string, each preceded by a separator, for substring prefix tests"""
+    return "".join(f"\0{key}" for key in keys)
+
+def index_keys(name: str) -> Tuple[str, ...]:
+    """Keys a name is found under: the name from each of its first few words on"""
+    normalized = normalize(name)
+    keys = [normalized[:KEY_LENGTH]]
+    position = 0
+    for _ in range(MAX_WORD_STARTS - 1):
+        position = normalized.find(" ", position) + 1
+        if not position:
+            break
+        keys.append(normalized[position:position + KEY_LENGTH])
+    return tuple(dict.fromkeys(keys))
+
+class AutocompleteIndex:
+    """
+    Prefix index over sweet names kept as one sorted list of keys with a
+    parallel array of sweet ids, plus one sorted array of packed
+    (score, id) keys per ranking.
+
+    A prefix's matches are the contiguous slice found by two bisections.
+    A narrow slice is ranked directly; for a wide one (short prefixes)
+    it is cheaper to walk the ranking from the top and keep the first
+    sweets that match, since roughly one in (catalog / slice) does. The
+    crossover is picked per query, so both paths stay well under a
+    millisecond. Keys are truncated and a name contributes a fixed number
+    of them, so memory grows linearly with the catalog and nothing else.
+
+    Popularity is the sum of per-day sales buckets over the last
+    POPULARITY_DAYS; once a day leaves that window its units are taken
+    off again, so sweets that stopped selling sink back down.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._ids = array("q")
+        self._sweets: Dict[int, Tuple[str, str, Tuple[str, ...], str]] = {}
+        self._rank_keys: Dict[str, Dict[int, int]] = {by: {} for by in RANKINGS}
+        self._rankings: Dict[str, array] = {by: array("q") for by in RANKINGS}
+        self._daily_sales: Dict[date, Dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sweets)
+
+    def _insert(self, sweet_id: int, name: str, category: str) -> None:
+        keys = index_keys(name)
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, sweet_id)
+        self._sweets[sweet_id] = (name, category, keys, _joined(keys))
+
+    def _delete(self, sweet_id: int) -> None:
+        entry = self._sweets.pop(sweet_id, None)
+        if entry is None:
+            return
+        for key in entry[2]:
+            position = bisect_left(self._keys, key)
+            while self._ids[position] != sweet_id:
+                position += 1
+            del self._keys[position]
+            del self._ids[position]
+
+    def _set_score(self, by: str, sweet_id: int, score: int) -> None:
+        rank_keys, ranking = self._rank_keys[by], self._rankings[by]
+        key = rank_key(score, sweet_id)
+        previous = rank_keys.get(sweet_id)
+        if previous == key:
+            return
+        if previous is not None:
+            del ranking[bisect_left(ranking, previous)]
+        ranking.insert(bisect_left(ranking, key), key)
+        rank_keys[sweet_id] = key
+
+    def upsert(self, sweet_id: int, name: str, category: str, quantity: int) -> None:
+        """Index a sweet or refresh its name, category and stock"""
+        with self._lock:
+            entry = self._sweets.get(sweet_id)
+            if entry is None or entry[0] != name:
+                self._delete(sweet_id)
+                self._insert(sweet_id, name, category)
+            else:
+                self._sweets[sweet_id] = (name, category) + entry[2:]
+            self._set_score("stock", sweet_id, quantity)
+            if sweet_id not in self._rank_keys["popularity"]:
+                self._set_score("popularity", sweet_id, 0)
+
+    def remove(self, sweet_id: int) -> None:
+        """Drop a sweet from the index"""
+        with self._lock:
+            self._delete(sweet_id)
+            for by in RANKINGS:
+                key = self._rank_keys[by].pop(sweet_id, None)
+                if key is not None:
+                    ranking = self._rankings[by]
+                    del ranking[bisect_left(ranking, key)]
+
+    def set_stock(self, sweet_id: int, quantity: int) -> None:
+        """Record a sweet's current stock"""
+        with self._lock:
+            if sweet_id in self._sweets:
+                self._set_score("stock", sweet_id, quantity)
+
+    def _expire_sales(self, today: date) -> None:
+        """Take days that left the popularity window off the scores"""
+        cutoff = today - timedelta(days=POPULARITY_DAYS)
+        expired = [day for day in self._daily_sales if day < cutoff]
+        if not expired:
+            return
+        rank_keys = self._rank_keys["popularity"]
+        for day in expired:
+            for sweet_id, units in self._daily_sales.pop(day).items():
+                if sweet_id in rank_keys:
+                    rank_keys[sweet_id] = rank_key(score_of(rank_keys[sweet_id]) - units, sweet_id)
+        # Many scores may have moved; one sort beats an insert per sweet
+        self._rankings["popularity"] = array("q", sorted(rank_keys.values()))
+
+    def add_sales(self, sweet_id: int, units: int, day: Optional[date] = None) -> None:
+        """Count units sold on a day, today by default, towards a sweet's popularity"""
+        today = utc_now().date()
+        day = day or today
+        with self._lock:
+            self._expire_sales(today)
+            if sweet_id not in self._sweets or day < today - timedelta(days=POPULARITY_DAYS):
+                return
+            sales = self._daily_sales.setdefault(day, {})
+            sales[sweet_id] = sales.get(sweet_id, 0) + units
+            popularity = score_of(self._rank_keys["popularity"][sweet_id])
+            self._set_score("popularity", sweet_id, popularity + units)
+
+    def rebuild(self, db: Session, *shards: Session) -> int:
+        """
+        Replace the index with every sweet in the database and on the given
+        shards; returns the count. Sales rollups are read from `db` alone,
+        where every store's sales are recorded.
+        """
+        since = (utc_now() - timedelta(days=POPULARITY_DAYS)).date()
+        daily_sales: Dict[date, Dict[int, int]] = {}
+        popularity: Dict[int, int] = {}
+        for day, sweet_id, units in (
+            db.query(SalesDailyRollup.day, SalesDailyRollup.sweet_id, func.sum(SalesDailyRollup.units))
+            .filter(SalesDailyRollup.day >= since)
+            .group_by(SalesDailyRollup.day, SalesDailyRollup.sweet_id)
+        ):
+            daily_sales.setdefault(day, {})[sweet_id] = int(units)
+            popularity[sweet_id] = popularity.get(sweet_id, 0) + int(units)
+        entries = []
+        sweets, stock = {}, {}
+        for source in (db, *shards):
+            for sweet_id, name, category, quantity in source.query(
+                Sweet.id, Sweet.name, Sweet.category, Sweet.quantity
+            ).yield_per(5000):
+                keys = index_keys(name)
+                entries.extend((key, sweet_id) for key in keys)
+                sweets[sweet_id] = (name, category, keys, _joined(keys))
+                stock[sweet_id] = quantity
+        entries.sort()
+        scores = {
+            "stock": stock,
+            "popularity": {sweet_id: popularity.get(sweet_id, 0) for sweet_id in sweets},
+        }
+        rank_keys = {
+            by: {sweet_id: rank_key(score, sweet_id) for sweet_id, score in scores[by].items()}
+            for by in RANKINGS
+        }
+        rankings = {by: array("q", sorted(rank_keys[by].values())) for by in RANKINGS}
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._ids = array("q", (sweet_id for _, sweet_id in entries))
+            self._sweets = sweets
+            self._rank_keys = rank_keys
+            self._rankings = rankings
+            self._daily_sales = daily_sales
+        return len(sweets)
+
+    def _rank_slice(self, low: int, high: int, by: str, limit: int) -> List[int]:
+        """Top sweets among one prefix's slice of keys"""
+        keys = heapq.nsmallest(limit, map(self._rank_keys[by].__getitem__, set(self._ids[low:high])))
+        return [key & _ID_MASK for key in keys]
+
+    def _walk_ranking(self, prefix: str, by: str, limit: int) -> List[int]:
+        """Top sweets matching a prefix, found by walking the ranking from the top"""
+        sweets = self._sweets
+        needle = f"\0{prefix}"
+        ranked = []
+        for key in self._rankings[by]:
+            sweet_id = key & _ID_MASK
+            if needle in sweets[sweet_id][3]:
+                ranked.append(sweet_id)
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def suggest(self, prefix: str, limit: int = 10, by: str = "popularity") -> List[dict]:
+        """Sweets whose name, or one of its first words, starts with the prefix"""
+        prefix = normalize(prefix)[:KEY_LENGTH]
+        if not prefix:
+            return []
+        today = utc_now().date()
+        with self._lock:
+            self._expire_sales(today)
+            low = bisect_left(self._keys, prefix)
+            high = bisect_left(self._keys, prefix + "\U0010ffff", low)
+            # Ranking the slice costs ~its width; walking costs ~limit * catalog / width
+            width = high - low
+            if width * width > limit * len(self._sweets):
+                ranked = self._walk_ranking(prefix, by, limit)
+            else:
+                ranked = self._rank_slice(low, high, by, limit)
+            return [
+                {
+                    "id": sweet_id,
+                    "name": self._sweets[sweet_id][0],
+                    "category": self._sweets[sweet_id][1],
+                    "quantity": score_of(self._rank_keys["stock"][sweet_id]),
+                    "popularity": score_of(self._rank_keys["popularity"][sweet_id]),
+                }
+                for sweet_id in ranked
+            ]
+
+    def stats(self) -> dict:
+        """Index size and an estimate of the memory it holds, in bytes"""
+        with self._lock:
+            memory = sys.getsizeof(self._keys) + sum(sys.getsizeof(key) for key in self._keys)
+            memory += sys.getsizeof(self._ids)
+            memory += sys.getsizeof(self._sweets) + sum(sys.getsizeof(entry) for entry in self._sweets.values())
+            for by in RANKINGS:
+                memory += sys.getsizeof(self._rank_keys[by]) + sys.getsizeof(self._rankings[by])
+            memory += sum(sys.getsizeof(sales) for sales in self._daily_sales.values())
+            return {
+                "sweets": len(self._sweets),
+                "keys": len(self._keys),
+                "memory_bytes": memory,
+            }
+
+autocomplete_index = AutocompleteIndex()
+
+def _on_sweet_written(sweet: dict, **payload) -> None:
+    autocomplete_index.upsert(sweet["id"], sweet["name"], sweet["category"], sweet["quantity"])
+
+def _on_sweet_deleted(sweet: dict, **payload) -> None:
+    autocomplete_index.remove(sweet["id"])
+
+def _on_stock_changed(sweet_id: int, previous_quantity: int, quantity: int, reason: str, **payload) -> None:
+    autocomplete_index.set_stock(sweet_id, quantity)
+    if reason == "purchase":
+        autocomplete_index.add_sales(sweet_id, previous_quantity - quantity)
+
+def _on_remote_delta(delta: dict) -> None:
+    if delta["type"] == "sweet":
+        _on_sweet_written(delta["sweet"])
+    elif delta["type"] == "deleted":
+        autocomplete_index.remove(delta["sweet_id"])
+    elif delta["type"] == "stock":
+        _on_stock_changed(**delta)
+
+events.subscribe(events.SWEET_CREATED, _on_sweet_written)
+events.subscribe(events.SWEET_UPDATED, _on_sweet_written)
+events.subscribe(events.SWEET_DELETED, _on_sweet_deleted)
+events.subscribe(events.STOCK_CHANGED, _on_stock_changed)
+stock_stream.subscribe_remote(_on_remote_delta)
@@ -0,0 +1,120 @@
+"""
+Batch dispatch service.
+Runs the sub-requests of a batch through the application's own routes
+in-process, without another HTTP round trip or middleware pass.
+"""
+import asyncio
+import json
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, List, Tuple
+from urllib.parse import urlsplit
+from starlette.middleware.exceptions import ExceptionMiddleware
+from starlette.requests import Request
+from starlette.types import ASGIApp
+from app.schemas.batch import BatchItem
+
+logger = logging.getLogger(__name__)
+
+# Route prefixes a batch may call
+BATCH_PREFIXES = ("/api/sweets", "/api/auth")
+# Routes that make no sense inside a batch: streams and session management
+BATCH_EXCLUDED_PATHS = {"/api/sweets/stream", "/api/auth/login", "/api/auth/register", "/api/auth/logout"}
+
+class BatchItemError(Exception):
+    """Raised when a sub-request can't be part of a batch"""
+
+def check_item(item: BatchItem) -> None:
+    """Reject sub-requests outside the batchable routes"""
+    path = urlsplit(item.path).path.rstrip("/") or "/"
+    if not path.startswith(BATCH_PREFIXES) or path in BATCH_EXCLUDED_PATHS:
+        raise BatchItemError(f"Path not allowed in a batch: {item.path}")
+
+def _routes_app(request: Request) -> ASGIApp:
+    """The app's routes wrapped only in its exception handlers, built once per app"""
+    app = request.app
+    routes_app = getattr(app.state, "batch_routes_app", None)
+    if routes_app is None:
+        routes_app = ExceptionMiddleware(app.router, handlers=app.exception_handlers)
+        app.state.batch_routes_app = routes_app
+    return routes_app
+
+async def dispatch(request: Request, item: BatchItem) -> Tuple[int, Any]:
+    """
+    Run one sub-request with the batch request's credentials and return
+    its status and decoded body. Errors become statuses, never exceptions.
+    """
+    url = urlsplit(item.path)
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    authorization = request.headers.get("authorization")
+    if authorization:
+        headers.append((b"authorization", authorization.encode()))
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": request.url.scheme,
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "app": request.app,
+    }
+
+    sent = False
+    async def receive() -> dict:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    response = {"status": 500, "body": []}
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    try:
+        # FastAPI runs yield-dependency cleanup from this stack, as its own middleware would
+        async with AsyncExitStack() as stack:
+            scope["fastapi_astack"] = stack
+            await _routes_app(request)(scope, receive, send)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        return 500, {"detail": "Internal Server Error"}
+
+    raw = b"".join(response["body"])
+    if not raw:
+        return response["status"], None
+    try:
+        return response["status"], json.loads(raw)
+    except ValueError:
+        return response["status"], raw.decode(errors="replace")
+
+def plan(items: List[BatchItem]) -> List[List[int]]:
+    """
+    Group sub-request indexes into steps run one after another.
+    Consecutive reads share a step and run concurrently; every write is a
+    step of its own, so reads see the writes listed before them.
+    """
+    steps: List[List[int]] = []
+    for index, item in enumerate(items):
+        if item.method == "GET" and steps and items[steps[-1][0]].method == "GET":
+            steps[-1].append(index)
+        else:
+            steps.append([index])
+    return steps
+
+async def run_step(request: Request, items: List[BatchItem]) -> List[Tuple[int, Any]]:
+    """
+    Run one step's sub-requests concurrently. Those using the batch's
+    shared session take turns on it; the rest overlap freely.
+    """
+    return await asyncio.gather(*(dispatch(request, item) for item in items))
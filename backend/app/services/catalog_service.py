@@ -0,0 +1,486 @@
+"""
+Catalog read service for sweet listings, searches and facets.
+Builds catalog queries and coalesces identical concurrent reads so that
+a burst of the same request runs a single database query.
+"""
+import asyncio
+import heapq
+import threading
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database.connection import shared_session
+from app.models.sweet import Sweet
+from app.schemas.sweet import SweetResponse
+from app.services import events, stock_service, stock_stream
+from app.services.columnar_catalog import columnar_catalog, sorts_by_code_point
+from app.services.single_flight import SingleFlight
+
+# Shared by every catalog read in this process
+catalog_flights = SingleFlight()
+
+# Sortable columns; id is always the final tiebreaker so pages are stable
+SORT_COLUMNS = {
+    "id": Sweet.id,
+    "name": Sweet.name,
+    "price": Sweet.price,
+    "quantity": Sweet.quantity,
+}
+
+# Fields a client may ask for with `fields=`; id is always included
+SPARSE_FIELDS = tuple(SweetResponse.model_fields)
+
+class UnknownFieldsError(Exception):
+    """Raised when a sparse fieldset names fields outside the allow-list"""
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        super().__init__(f"Unknown fields: {', '.join(fields)}. Available: {', '.join(SPARSE_FIELDS)}")
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma-separated `fields=` value into allow-listed field names
+    in a canonical order, so equal fieldsets share cache keys.
+    None (or blank) means every field.
+    """
+    requested = {field.strip() for field in (fields or "").split(",") if field.strip()}
+    if not requested:
+        return None
+    unknown = sorted(requested - set(SPARSE_FIELDS))
+    if unknown:
+        raise UnknownFieldsError(unknown)
+    requested.add("id")
+    return tuple(field for field in SPARSE_FIELDS if field in requested)
+
+def _field_columns(fields: Sequence[str]) -> list:
+    """
+    Columns to select for a fieldset. stock_slots is added when quantity is
+    asked for, since sharded sweets need their quantity from the slots.
+    """
+    columns = [getattr(Sweet, field) for field in fields]
+    if "quantity" in fields and "stock_slots" not in fields:
+        columns.append(Sweet.stock_slots)
+    return columns
+
+def project_rows(db: Session, rows, fields: Sequence[str]) -> List[dict]:
+    """Turn selected column rows into response dicts holding exactly `fields`"""
+    projected = [dict(row._mapping) for row in rows]
+    if "quantity" in fields:
+        sharded = [row["id"] for row in projected if row["stock_slots"]]
+        totals = stock_service.sharded_totals(db, sharded)
+        for row in projected:
+            if row["id"] in totals:
+                row["quantity"] = totals[row["id"]]
+            if "stock_slots" not in fields:
+                del row["stock_slots"]
+    return projected
+
+def _normalize_text(value: Optional[str]) -> Optional[str]:
+    """Normalize a case-insensitive text filter; blank means no filter"""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    return value or None
+
+def _normalize_filters(
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    store_id: Optional[int] = None,
+) -> dict:
+    """Normalize search filters so equivalent requests share cache keys"""
+    return {
+        "name": _normalize_text(name),
+        "category": _normalize_text(category),
+        "min_price": None if min_price is None else float(min_price),
+        "max_price": None if max_price is None else float(max_price),
+        "store_id": store_id,
+    }
+
+def apply_filters(
+    query,
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    store_id: Optional[int] = None,
+):
+    """
+    Apply the search filters to a query over sweets.
+    Category is a case-insensitive exact match so it can lead the
+    lower(category) composite indexes.
+    """
+    if store_id is not None:
+        query = query.filter(Sweet.store_id == store_id)
+    
+    if name:
+        query = query.filter(Sweet.name.ilike(f"%{name}%"))
+    
+    if category:
+        query = query.filter(func.lower(Sweet.category) == category.lower())
+    
+    if min_price is not None:
+        query = query.filter(Sweet.price >= min_price)
+    
+    if max_price is not None:
+        query = query.filter(Sweet.price <= max_price)
+    
+    return query
+
+def exact_stock(slot_totals):
+    """
+    A sweet's stock as returned to clients: its slot total when sharded,
+    given slot_totals (stock_service.slot_totals_subquery) is outer joined.
+    """
+    return case(
+        (Sweet.stock_slots > 0, func.coalesce(slot_totals.c.quantity, 0)),
+        else_=Sweet.quantity
+    )
+
+def apply_sorting(query, sort: Optional[str] = None, order: str = "asc", collation: Optional[str] = None):
+    """
+    Order a sweets query by a sortable column, then by id.
+    Quantity sorts on the stock returned to clients rather than the
+    reconciled snapshot; `collation` overrides the one names sort by.
+    """
+    column = SORT_COLUMNS.get(sort or "id", Sweet.id)
+    if column is Sweet.quantity:
+        slot_totals = stock_service.slot_totals_subquery()
+        query = query.outerjoin(slot_totals, slot_totals.c.sweet_id == Sweet.id)
+        column = exact_stock(slot_totals)
+    elif column is Sweet.name and collation:
+        column = Sweet.name.collate(collation)
+    direction = (lambda c: c.desc()) if order == "desc" else (lambda c: c.asc())
+    if column is Sweet.id:
+        return query.order_by(direction(Sweet.id))
+    return query.order_by(direction(column), direction(Sweet.id))
+
+def build_search_query(
+    db: Session,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    fields: Optional[Sequence[str]] = None,
+    collation: Optional[str] = None,
+    **filters
+):
+    """
+    Build the sorted, paginated sweets query for the given search filters.
+    With `fields`, only those columns are selected, so an index holding
+    them all can answer the query without visiting the table.
+    """
+    query = db.query(*_field_columns(fields)) if fields else db.query(Sweet)
+    query = apply_sorting(apply_filters(query, **filters), sort, order, collation)
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def sweet_snapshot(sweet: Sweet) -> dict:
+    """Plain copy of a sweet's public fields, safe to share and cache"""
+    return SweetResponse.model_validate(sweet).model_dump()
+
+def load_sweet(db: Session, sweet_id: int, fields: Sequence[str]) -> Optional[dict]:
+    """One sweet's requested fields, selecting only those columns"""
+    rows = db.query(*_field_columns(fields)).filter(Sweet.id == sweet_id).all()
+    projected = project_rows(db, rows, fields)
+    return projected[0] if projected else None
+
+def _query_sweets(db: Session, fields: Optional[Sequence[str]] = None, **params) -> List[dict]:
+    """Run a catalog query on the given session and return plain rows"""
+    if fields:
+        return project_rows(db, build_search_query(db, fields=fields, **params).all(), fields)
+    sweets = build_search_query(db, **params).all()
+    stock_service.apply_sharded_totals(db, sweets)
+    return [sweet_snapshot(sweet) for sweet in sweets]
+
+def _load_sweets(bind, **params) -> List[dict]:
+    """Run a catalog query on a private session and return plain rows"""
+    db = Session(bind=bind)
+    try:
+        return _query_sweets(db, **params)
+    finally:
+        db.close()
+
+async def _on_shared_session(db: Session, query, **params):
+    """
+    Run a catalog query on a batch's shared session, off the event loop.
+    The calling sub-request holds the session (see get_db), so no other
+    sub-request uses it from another thread meanwhile.
+    """
+    return await run_in_threadpool(query, db, **params)
+
+async def search_sweets(
+    db: Session,
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None,
+    store_id: Optional[int] = None,
+) -> List[dict]:
+    """
+    Return a page of sweets matching the filters, sharing one query among
+    all concurrent callers with the same normalized parameters.
+    With `fields` (from parse_fields) each row holds only those fields.
+    The query runs on its own session bound to the caller's engine, so a
+    cancelled caller can't close the session out from under the others.
+    Inside a batch it runs on the batch's shared session instead.
+    """
+    params = _normalize_filters(name, category, min_price, max_price, store_id)
+    params.update(sort=sort or "id", order=order, limit=limit, offset=offset, fields=fields)
+    bind = db.get_bind()
+    if db is not shared_session.get() or (columnar_catalog is not None and columnar_catalog.serves(bind, params["sort"])):
+        return await _search_on(bind, params)
+    return await _on_shared_session(db, _query_sweets, **params)
+
+async def _search_on(bind, params: dict) -> List[dict]:
+    """
+    Run a normalized catalog search on one engine, coalescing identical
+    calls, or answer it from the columnar read model when that holds the engine.
+    """
+    if columnar_catalog is not None and columnar_catalog.serves(bind, params["sort"]):
+        return await run_in_threadpool(lambda: columnar_catalog.search(**params))
+    key = ("sweets", bind, tuple(sorted(params.items())))
+    return await catalog_flights.do(key, lambda: run_in_threadpool(_load_sweets, bind, **params))
+
+# Code-point collation per dialect, for merging shard runs sorted by name
+CODE_POINT_COLLATION = {"postgresql": "C", "sqlite": "BINARY"}
+
+# Per engine: None when names already sort by code point, else the collation to ask for
+_name_collations: Dict[object, Optional[str]] = {}
+
+def _name_collation(bind) -> Optional[str]:
+    """Collation a shard must sort names by to match a code-point merge; checked once per engine"""
+    if bind not in _name_collations:
+        with Session(bind=bind) as db:
+            code_point = sorts_by_code_point(db)
+        _name_collations[bind] = None if code_point else CODE_POINT_COLLATION.get(bind.dialect.name, "C")
+    return _name_collations[bind]
+
+async def search_shards(
+    shards: Sequence,
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> List[dict]:
+    """
+    Return a page of sweets across every store by scatter-gather.
+
+    Each shard engine is asked, in parallel, for its first offset + limit
+    matches in the requested order; those sorted runs are merged on
+    (sort column, id) and the requested page is cut from the merge. The
+    sort column is fetched even when `fields` leaves it out, and dropped
+    again after merging.
+
+    The merge compares names by code point, as Python does, so shards
+    whose names sort under another collation are asked to sort by a
+    code-point one instead. Quantities merge on the exact stock the
+    shards both sort on and return.
+    """
+    sort = sort or "id"
+    shard_fields = fields
+    if fields and sort not in fields:
+        shard_fields = tuple(field for field in SPARSE_FIELDS if field in fields or field == sort)
+    params = _normalize_filters(name, category, min_price, max_price)
+    params.update(
+        sort=sort, order=order, offset=0, fields=shard_fields,
+        limit=None if limit is None else offset + limit,
+    )
+    if sort == "name":
+        collations = await asyncio.gather(*[run_in_threadpool(_name_collation, shard) for shard in shards])
+        runs = await asyncio.gather(*[
+            _search_on(shard, dict(params, collation=collation) if collation else params)
+            for shard, collation in zip(shards, collations)
+        ])
+    else:
+        runs = await asyncio.gather(*[_search_on(shard, params) for shard in shards])
+
+    sort_key = (lambda row: row["id"]) if sort == "id" else (lambda row: (row[sort], row["id"]))
+    merged = heapq.merge(*runs, key=sort_key, reverse=order == "desc")
+    page = list(islice(merged, offset, None if limit is None else offset + limit))
+    if shard_fields is not fields:
+        page = [{field: row[field] for field in row if field != sort} for row in page]
+    return page
+
+class FacetCache:
+    """
+    Cache of facet summaries keyed by normalized filters.
+
+    Every invalidation bumps a generation counter; a result computed while
+    an invalidation happened is returned to its callers but not stored, so
+    a slow query can't put pre-write numbers back into the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, dict] = {}
+        self.generation = 0
+
+    def get(self, key: tuple) -> Optional[dict]:
+        """Return the cached summary for key, if any"""
+        return self._entries.get(key)
+
+    def put(self, key: tuple, value: dict, generation: int) -> None:
+        """Store a summary computed at the given generation"""
+        with self._lock:
+            if generation == self.generation:
+                self._entries[key] = value
+
+    def invalidate(self, **payload) -> None:
+        """Drop every cached summary"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+facet_cache = FacetCache()
+
+def _invalidate_on_stock_change(previous_quantity: int, quantity: int, **payload) -> None:
+    """Only crossing zero changes facet numbers; other stock moves keep the cache"""
+    if (previous_quantity > 0) != (quantity > 0):
+        facet_cache.invalidate()
+
+def _invalidate_on_remote_delta(delta: dict) -> None:
+    """Other workers' writes clear the cache as local ones do; so do deltas that may have been missed"""
+    if delta["type"] == "stock":
+        _invalidate_on_stock_change(delta["previous_quantity"], delta["quantity"])
+    else:
+        facet_cache.invalidate()
+
+events.subscribe(events.SWEET_CREATED, facet_cache.invalidate)
+events.subscribe(events.SWEET_UPDATED, facet_cache.invalidate)
+events.subscribe(events.SWEET_DELETED, facet_cache.invalidate)
+events.subscribe(events.STOCK_CHANGED, _invalidate_on_stock_change)
+stock_stream.subscribe_remote(_invalidate_on_remote_delta)
+
+def _query_facets(db: Session, **filters) -> dict:
+    """
+    Compute per-category facets with one grouped aggregate query.
+    Sharded sweets count as in stock by their slot totals, not by the
+    sweets.quantity snapshot the reconcile loop refreshes.
+    """
+    slot_totals = stock_service.slot_totals_subquery()
+    stock = exact_stock(slot_totals)
+    rows = apply_filters(
+        db.query(
+            Sweet.category,
+            func.count(Sweet.id).label("count"),
+            func.sum(case((stock > 0, 1), else_=0)).label("in_stock"),
+            func.min(Sweet.price).label("min_price"),
+            func.max(Sweet.price).label("max_price"),
+        ).select_from(Sweet).outerjoin(slot_totals, slot_totals.c.sweet_id == Sweet.id),
+        **filters
+    ).group_by(Sweet.category).order_by(Sweet.category).all()
+
+    return _summarize([
+        {
+            "category": row.category,
+            "count": row.count,
+            "in_stock": int(row.in_stock or 0),
+            "min_price": row.min_price,
+            "max_price": row.max_price,
+        }
+        for row in rows
+    ])
+
+def _summarize(categories: List[dict]) -> dict:
+    """Catalog-wide totals and price bounds over per-category facets"""
+    return {
+        "total": sum(facet["count"] for facet in categories),
+        "in_stock": sum(facet["in_stock"] for facet in categories),
+        "min_price": min((facet["min_price"] for facet in categories), default=None),
+        "max_price": max((facet["max_price"] for facet in categories), default=None),
+        "categories": categories,
+    }
+
+def _load_facets(bind, **filters) -> dict:
+    """Compute facets on a private session"""
+    db = Session(bind=bind)
+    try:
+        return _query_facets(db, **filters)
+    finally:
+        db.close()
+
+async def get_facets(
+    db: Session,
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> dict:
+    """
+    Return category counts, stock counts and price bounds for the sweets
+    matching the filters. Served from the facet cache when possible;
+    concurrent misses for the same filters share one query, except inside
+    a batch, where a miss is computed on the batch's shared session.
+    """
+    filters = _normalize_filters(name, category, min_price, max_price)
+    return await _facets_on(db.get_bind(), filters, db if db is shared_session.get() else None)
+
+async def _facets_on(bind, filters: dict, shared: Optional[Session] = None) -> dict:
+    """
+    Facets of one engine, from the columnar read model, the facet cache,
+    the batch's `shared` session or a coalesced query, in that order.
+    """
+    if columnar_catalog is not None and columnar_catalog.serves(bind):
+        return await run_in_threadpool(lambda: columnar_catalog.facets(**filters))
+    key = ("facets", bind, tuple(sorted(filters.items())))
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+
+    generation = facet_cache.generation
+    if shared is not None:
+        facets = await _on_shared_session(shared, _query_facets, **filters)
+        facet_cache.put(key, facets, generation)
+        return facets
+
+    async def compute() -> dict:
+        facets = await run_in_threadpool(_load_facets, bind, **filters)
+        facet_cache.put(key, facets, generation)
+        return facets
+
+    # Callers arriving after an invalidation don't join a pre-write query
+    return await catalog_flights.do(key + (generation,), compute)
+
+async def facet_shards(
+    shards: Sequence,
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> dict:
+    """
+    Return facets across every store by scatter-gather.
+    Each shard engine's facets are fetched in parallel, through the same
+    cache as single-engine facets, and merged per category: counts add
+    up and price bounds widen.
+    """
+    filters = _normalize_filters(name, category, min_price, max_price)
+    merged: Dict[str, dict] = {}
+    for facets in await asyncio.gather(*[_facets_on(shard, filters) for shard in shards]):
+        for facet in facets["categories"]:
+            into = merged.get(facet["category"])
+            if into is None:
+                merged[facet["category"]] = dict(facet)
+                continue
+            into["count"] += facet["count"]
+            into["in_stock"] += facet["in_stock"]
+            into["min_price"] = min(into["min_price"], facet["min_price"])
+            into["max_price"] = max(into["max_price"], facet["max_price"])
+    return _summarize([merged[category] for category in sorted(merged)])
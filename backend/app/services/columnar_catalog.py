@@ -0,0 +1,524 @@
+"""
+Columnar catalog read model.
+Holds the sweets table in memory as contiguous NumPy arrays, one per
+column with categories dictionary-encoded, and answers catalog searches
+and facets with vectorized filters, sorts and aggregates instead of SQL.
+Optional: enabled with COLUMNAR_CATALOG=1 when NumPy is installed, built
+at startup and kept current from sweet and stock events, including those
+other workers publish through the stock stream.
+"""
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.sweet import Sweet
+from app.services import events, stock_service, stock_stream
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Database collations that order text by code point, as Python does
+CODE_POINT_COLLATIONS = {"C", "POSIX", "C.UTF-8", "C.utf8", "ucs_basic"}
+
+# Serve catalog reads from memory; needs NumPy
+COLUMNAR_CATALOG = os.getenv("COLUMNAR_CATALOG", "0").lower() not in ("", "0", "false")
+
+# Numeric columns held as arrays; category is stored as codes next to them
+NUMERIC_COLUMNS = {
+    "id": "int64",
+    "price": "float64",
+    "quantity": "int64",
+    "reorder_threshold": "int64",
+    "store_id": "int64",
+    "stock_slots": "int64",
+    "version": "int64",
+}
+# Row layout returned to callers, matching SweetResponse
+ROW_FIELDS = ("name", "category", "price", "quantity", "reorder_threshold", "store_id", "id", "stock_slots", "version")
+
+INITIAL_CAPACITY = 1024
+# Sort orders kept up to date incrementally; quantity changes with every sale, so it's sorted per query
+ORDERED_COLUMNS = ("id", "price", "name")
+# Positions tested in the first chunk of an ordered scan; later chunks double
+SCAN_CHUNK = 1024
+# Names tested one by one before a name filter switches to a full substring scan
+NAME_SCAN_BUDGET = 32768
+
+def available() -> bool:
+    """Whether NumPy is installed so the model can be built at all"""
+    return np is not None
+
+class _Filter:
+    """
+    One search's filters, compiled against the catalog and applied to
+    batches of row positions. A name filter tests names one by one while
+    few have been tested, then computes a mask for the whole catalog once.
+    """
+
+    def __init__(self, catalog: "ColumnarCatalog", name, codes, min_price, max_price, store_id):
+        self.catalog = catalog
+        self.name = name
+        self.codes = codes
+        self.min_price = min_price
+        self.max_price = max_price
+        self.store_id = store_id
+        self.name_mask = None
+        self.names_tested = 0
+
+    @property
+    def empty(self) -> bool:
+        return self.name is None and self.codes is None and self.min_price is None \
+            and self.max_price is None and self.store_id is None
+
+    def _numeric(self, take) -> Optional["np.ndarray"]:
+        """Mask of the numeric filters over the values `take` selects from each column"""
+        catalog = self.catalog
+        mask = None
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+        if self.store_id is not None:
+            narrow(take(catalog._columns["store_id"]) == self.store_id)
+        if self.codes is not None:
+            codes = take(catalog._category_codes)
+            narrow(codes == self.codes[0] if len(self.codes) == 1 else np.isin(codes, self.codes))
+        if self.min_price is not None or self.max_price is not None:
+            prices = take(catalog._columns["price"])
+            if self.min_price is not None:
+                narrow(prices >= self.min_price)
+            if self.max_price is not None:
+                narrow(prices <= self.max_price)
+        return mask
+
+    def _names(self, positions):
+        if self.name is None:
+            return positions
+        if self.name_mask is None and self.names_tested + len(positions) <= NAME_SCAN_BUDGET:
+            self.names_tested += len(positions)
+            lowered, text = self.catalog._lowered, self.name
+            keep = np.fromiter((text in lowered[row] for row in positions.tolist()), dtype=bool, count=len(positions))
+            return positions[keep]
+        if self.name_mask is None:
+            self.name_mask = self.catalog._name_mask(self.name)
+        return positions[self.name_mask[positions]]
+
+    def select(self, positions) -> "np.ndarray":
+        """The given live positions that pass every filter, in the same order"""
+        mask = self._numeric(lambda column: column[positions])
+        return self._names(positions if mask is None else positions[mask])
+
+    def select_all(self) -> "np.ndarray":
+        """Every live position passing the filters, in position order"""
+        size = self.catalog._size
+        mask = self._numeric(lambda column: column[:size])
+        live = self.catalog._live[:size]
+        rows = np.flatnonzero(live if mask is None else live & mask)
+        if self.name is None:
+            return rows
+        self.name_mask = self.catalog._name_mask(self.name)
+        return rows[self.name_mask[rows]]
+
+def sorts_by_code_point(db: Session) -> bool:
+    """Whether the database orders sweet names by code point"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # BINARY, the default collation, compares UTF-8 bytes: code point order
+        return True
+    if dialect == "postgresql":
+        collation = db.execute(text(
+            "SELECT coalesce(c.collname, d.datcollate) FROM pg_attribute a"
+            " JOIN pg_database d ON d.datname = current_database()"
+            " LEFT JOIN pg_collation c ON c.oid = a.attcollation AND c.collname <> 'default'"
+            " WHERE a.attrelid = 'sweets'::regclass AND a.attname = 'name'"
+        )).scalar()
+        return collation in CODE_POINT_COLLATIONS
+    return False
+
+class ColumnarCatalog:
+    """
+    In-memory column store of the sweets catalog.
+
+    Every column is a contiguous array indexed by row position; deleted
+    rows are only marked dead and squeezed out once they pile up, so
+    positions stay stable. Row positions sorted by (id), (price, id) and
+    (name, id) are maintained incrementally with bisection, so a sorted
+    page is read by scanning an order in growing chunks and stopping once
+    the page is full, with each chunk filtered by vectorized comparisons.
+    Quantity sorts and facets work on the full filter mask instead.
+    Names are also kept lowercased and, for selective name filters, as one
+    blob searched with str.find.
+
+    Names sort by code point ("Zest" before "apple"), which is how SQLite
+    and the C collation order them. On a database with a locale collation
+    name sorts are left to SQL, so the two paths never disagree on order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bind = None
+        self.sorts_names = False
+        self._reset(0)
+
+    def _reset(self, capacity: int) -> None:
+        capacity = max(capacity, INITIAL_CAPACITY)
+        self._size = 0
+        self._dead = 0
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        self._category_codes = np.zeros(capacity, dtype="int32")
+        self._live = np.zeros(capacity, dtype=bool)
+        self._categories: List[str] = []
+        self._category_index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lowered: List[str] = []
+        self._position: Dict[int, int] = {}
+        self._orders = {sort: np.zeros(0, dtype="int64") for sort in ORDERED_COLUMNS}
+        self._blob = None
+        self._blob_starts = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the model has been built and can answer queries"""
+        return self.bind is not None
+
+    def serves(self, bind, sort: Optional[str] = None) -> bool:
+        """Whether searches against this engine, in this order, can be answered from memory"""
+        if sort == "name" and not self.sorts_names:
+            return False
+        return self.bind is not None and self.bind is bind
+
+    def _encode_category(self, category: str) -> int:
+        code = self._category_index.get(category)
+        if code is None:
+            code = self._category_index[category] = len(self._categories)
+            self._categories.append(category)
+        return code
+
+    def _order_key(self, sort: str):
+        """Key of a row position in one of the maintained sort orders"""
+        ids = self._columns["id"]
+        if sort == "id":
+            return lambda row: ids[row]
+        if sort == "price":
+            prices = self._columns["price"]
+            return lambda row: (prices[row], ids[row])
+        names = self._names
+        return lambda row: (names[row], ids[row])
+
+    def _unlink(self, row: int, sorts: Sequence[str]) -> None:
+        """Take a row out of sort orders, before its sort values change"""
+        for sort in sorts:
+            key = self._order_key(sort)
+            order = self._orders[sort]
+            index = bisect_left(order, key(row), key=key)
+            self._orders[sort] = np.delete(order, index)
+
+    def _link(self, row: int, sorts: Sequence[str]) -> None:
+        """Put a row into sort orders at its current sort values"""
+        for sort in sorts:
+            key = self._order_key(sort)
+            order = self._orders[sort]
+            self._orders[sort] = np.insert(order, bisect_left(order, key(row), key=key), row)
+
+    def _grow(self) -> None:
+        """Double every column's capacity"""
+        capacity = len(self._live) * 2
+        for name, column in list(self._columns.items()):
+            self._columns[name] = self._resized(column, capacity)
+        self._category_codes = self._resized(self._category_codes, capacity)
+        self._live = self._resized(self._live, capacity)
+
+    def _resized(self, column, capacity: int):
+        grown = np.zeros(capacity, dtype=column.dtype)
+        grown[:self._size] = column[:self._size]
+        return grown
+
+    def rebuild(self, db: Session) -> None:
+        """Load every sweet in one columnar pass and serve this session's engine"""
+        sorts_names = sorts_by_code_point(db)
+        rows = db.query(
+            *[getattr(Sweet, name) for name in NUMERIC_COLUMNS], Sweet.name, Sweet.category
+        ).order_by(Sweet.id).all()
+        totals = stock_service.sharded_totals(db, [row.id for row in rows if row.stock_slots])
+        with self._lock:
+            self._reset(len(rows))
+            count = len(rows)
+            if rows:
+                values = list(zip(*rows))
+                for index, name in enumerate(NUMERIC_COLUMNS):
+                    self._columns[name][:count] = values[index]
+                self._names = list(values[-2])
+                self._lowered = [name.lower() for name in self._names]
+                self._category_codes[:count] = [self._encode_category(category) for category in values[-1]]
+                self._live[:count] = True
+                self._position = {sweet_id: row for row, sweet_id in enumerate(values[0])}
+                for sweet_id, total in totals.items():
+                    self._columns["quantity"][self._position[sweet_id]] = total
+            self._size = count
+            # Rows are in id order, so stable sorts break ties by id
+            self._orders["id"] = np.arange(count, dtype="int64")
+            self._orders["price"] = np.argsort(self._columns["price"][:count], kind="stable")
+            self._orders["name"] = np.array(sorted(range(count), key=self._names.__getitem__), dtype="int64")
+            self.sorts_names = sorts_names
+            self.bind = db.get_bind()
+
+    def upsert(self, sweet: dict) -> None:
+        """Insert or overwrite one sweet from a snapshot"""
+        if not self.ready:
+            return
+        with self._lock:
+            row = self._position.get(sweet["id"])
+            if row is None:
+                if self._size == len(self._live):
+                    self._grow()
+                row = self._position[sweet["id"]] = self._size
+                self._size += 1
+                self._names.append(sweet["name"])
+                self._lowered.append(sweet["name"].lower())
+                self._live[row] = True
+                moved = ORDERED_COLUMNS
+            else:
+                moved = [sort for sort in ("price", "name") if self._value(row, sort) != sweet[sort]]
+                self._unlink(row, moved)
+                self._names[row] = sweet["name"]
+                self._lowered[row] = sweet["name"].lower()
+            for name in NUMERIC_COLUMNS:
+                self._columns[name][row] = sweet[name]
+            self._category_codes[row] = self._encode_category(sweet["category"])
+            self._link(row, moved)
+            if "name" in moved:
+                self._blob = None
+
+    def _value(self, row: int, field: str):
+        return self._names[row] if field == "name" else self._columns[field][row]
+
+    def set_stock(self, sweet_id: int, quantity: int, version: Optional[int] = None) -> None:
+        """Apply a committed stock change; versions only move forward"""
+        if not self.ready:
+            return
+        with self._lock:
+            row = self._position.get(sweet_id)
+            if row is None:
+                return
+            self._columns["quantity"][row] = quantity
+            if version is not None and version > self._columns["version"][row]:
+                self._columns["version"][row] = version
+
+    def remove(self, sweet_id: int) -> None:
+        """Mark a sweet dead, compacting once dead rows make up a quarter of the catalog"""
+        if not self.ready:
+            return
+        with self._lock:
+            row = self._position.pop(sweet_id, None)
+            if row is None:
+                return
+            self._unlink(row, ORDERED_COLUMNS)
+            self._live[row] = False
+            self._dead += 1
+            if self._dead > max(INITIAL_CAPACITY, self._size // 4):
+                self._compact()
+
+    def _compact(self) -> None:
+        """Drop dead rows; sort orders are renumbered without re-sorting"""
+        size = self._size
+        keep = np.flatnonzero(self._live[:size])
+        renumber = np.full(size, -1, dtype="int64")
+        renumber[keep] = np.arange(len(keep))
+        for name, column in self._columns.items():
+            column[:len(keep)] = column[keep]
+        self._category_codes[:len(keep)] = self._category_codes[keep]
+        self._live[:size] = False
+        self._live[:len(keep)] = True
+        self._names = [self._names[row] for row in keep.tolist()]
+        self._lowered = [self._lowered[row] for row in keep.tolist()]
+        self._orders = {sort: renumber[order] for sort, order in self._orders.items()}
+        self._position = {sweet_id: row for row, sweet_id in enumerate(self._columns["id"][:len(keep)].tolist())}
+        self._size = len(keep)
+        self._dead = 0
+        self._blob = None
+
+    def _name_mask(self, text: str):
+        """Positions whose lowercased name contains `text`, via str.find over one blob"""
+        if self._blob is None or len(self._blob_starts) != self._size:
+            lengths = np.fromiter((len(name) + 1 for name in self._lowered), dtype="int64", count=self._size)
+            self._blob_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype("int64")
+            self._blob = "\0".join(self._lowered) + "\0"
+        hits = []
+        find = self._blob.find
+        position = find(text)
+        while position != -1:
+            hits.append(position)
+            position = find(text, position + 1)
+        mask = np.zeros(self._size, dtype=bool)
+        if hits:
+            mask[np.searchsorted(self._blob_starts, hits, side="right") - 1] = True
+        return mask
+
+    def _compile(
+        self,
+        name: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        store_id: Optional[int] = None,
+    ) -> Optional[_Filter]:
+        """Compile filters the way SQL's apply_filters reads them; None if nothing can match"""
+        codes = None
+        if category:
+            codes = [code for value, code in self._category_index.items() if value.lower() == category.lower()]
+            if not codes:
+                return None
+        return _Filter(self, name.lower() if name else None, codes, min_price, max_price, store_id)
+
+    def _scan(self, sequence, query: _Filter, offset: int, limit: Optional[int]):
+        """Filter an ordered sequence of positions in growing chunks until the page is full"""
+        depth = None if limit is None else offset + limit
+        if query.empty:
+            return sequence[offset:depth]
+        if depth is None:
+            return query.select(sequence)[offset:]
+        parts, found, start, chunk = [], 0, 0, SCAN_CHUNK
+        while found < depth and start < len(sequence):
+            part = query.select(sequence[start:start + chunk])
+            parts.append(part)
+            found += len(part)
+            start += chunk
+            chunk *= 2
+        return np.concatenate(parts)[offset:depth] if parts else sequence[:0]
+
+    def _price_range(self, order, min_price: Optional[float], max_price: Optional[float]):
+        """Slice of the price order inside the price filter, found by bisection"""
+        prices = self._columns["price"]
+        price = lambda row: prices[row]
+        start = 0 if min_price is None else bisect_left(order, min_price, key=price)
+        end = len(order) if max_price is None else bisect_right(order, max_price, key=price)
+        return order[start:end]
+
+    def search(
+        self,
+        sort: str = "id",
+        order: str = "asc",
+        limit: Optional[int] = None,
+        offset: int = 0,
+        fields: Optional[Sequence[str]] = None,
+        **filters
+    ) -> List[dict]:
+        """
+        One page of matching sweets ordered by (sort column, id), like the SQL path.
+        Quantity pages use np.partition to keep only rows that can reach the
+        page before sorting them.
+        """
+        with self._lock:
+            query = self._compile(**filters)
+            if query is None:
+                return []
+            if sort in self._orders:
+                sequence = self._orders[sort]
+                if sort == "price":
+                    sequence = self._price_range(sequence, filters.get("min_price"), filters.get("max_price"))
+                page = self._scan(sequence[::-1] if order == "desc" else sequence, query, offset, limit)
+                return self._rows(page, fields or ROW_FIELDS)
+
+            rows = query.select_all()
+            keys = self._columns[sort][rows]
+            ids = self._columns["id"][rows]
+            if order == "desc":
+                keys, ids = -keys, -ids
+            depth = None if limit is None else offset + limit
+            if depth is not None and depth < len(rows):
+                # Every row tied with the page's last key stays in, so ids still break ties
+                cutoff = np.partition(keys, depth - 1)[depth - 1]
+                within = keys <= cutoff
+                rows, keys, ids = rows[within], keys[within], ids[within]
+            page = rows[np.lexsort((ids, keys))][offset:depth]
+            return self._rows(page, fields or ROW_FIELDS)
+
+    def _rows(self, page, fields: Sequence[str]) -> List[dict]:
+        """Materialize rows at the given positions as plain dicts"""
+        values = {}
+        for field in fields:
+            if field == "name":
+                values[field] = [self._names[row] for row in page.tolist()]
+            elif field == "category":
+                values[field] = [self._categories[code] for code in self._category_codes[page].tolist()]
+            else:
+                values[field] = self._columns[field][page].tolist()
+        return [dict(zip(fields, row)) for row in zip(*values.values())]
+
+    def facets(self, **filters) -> dict:
+        """Per-category counts, in-stock counts and price bounds via bincount and ufunc.at"""
+        with self._lock:
+            query = self._compile(**filters)
+            rows = query.select_all() if query is not None else np.zeros(0, dtype="int64")
+            codes = self._category_codes[rows]
+            prices = self._columns["price"][rows]
+            width = len(self._categories)
+            counts = np.bincount(codes, minlength=width)
+            in_stock = np.bincount(codes, weights=self._columns["quantity"][rows] > 0, minlength=width)
+            lows = np.full(width, np.inf)
+            highs = np.full(width, -np.inf)
+            np.minimum.at(lows, codes, prices)
+            np.maximum.at(highs, codes, prices)
+            present = sorted((self._categories[code], code) for code in np.flatnonzero(counts).tolist())
+
+        categories = [
+            {
+                "category": category,
+                "count": int(counts[code]),
+                "in_stock": int(in_stock[code]),
+                "min_price": float(lows[code]),
+                "max_price": float(highs[code]),
+            }
+            for category, code in present
+        ]
+        return {
+            "total": sum(facet["count"] for facet in categories),
+            "in_stock": sum(facet["in_stock"] for facet in categories),
+            "min_price": min((facet["min_price"] for facet in categories), default=None),
+            "max_price": max((facet["max_price"] for facet in categories), default=None),
+            "categories": categories,
+        }
+
+    def stats(self) -> dict:
+        """Live row count and approximate memory held by the columns, orders and names"""
+        with self._lock:
+            arrays = sum(column.nbytes for column in self._columns.values())
+            arrays += self._category_codes.nbytes + self._live.nbytes
+            arrays += sum(order.nbytes for order in self._orders.values())
+            names = sum(sys.getsizeof(name) for name in self._names) + sum(sys.getsizeof(name) for name in self._lowered)
+            return {
+                "rows": self._size - self._dead,
+                "categories": len(self._categories),
+                "memory_bytes": arrays + names + (sys.getsizeof(self._blob) if self._blob else 0),
+            }
+
+columnar_catalog = ColumnarCatalog() if available() else None
+
+def _on_sweet_written(sweet: dict, **payload) -> None:
+    columnar_catalog.upsert(sweet)
+
+def _on_sweet_deleted(sweet: dict, **payload) -> None:
+    columnar_catalog.remove(sweet["id"])
+
+def _on_stock_changed(sweet_id: int, quantity: int, version: Optional[int] = None, **payload) -> None:
+    columnar_catalog.set_stock(sweet_id, quantity, version)
+
+def _on_remote_delta(delta: dict) -> None:
+    if delta["type"] == "sweet":
+        columnar_catalog.upsert(delta["sweet"])
+    elif delta["type"] == "deleted":
+        columnar_catalog.remove(delta["sweet_id"])
+    elif delta["type"] == "stock":
+        # The delta's version numbers the stream, not the sweet
+        columnar_catalog.set_stock(delta["sweet_id"], delta["quantity"])
+
+if columnar_catalog is not None:
+    events.subscribe(events.SWEET_CREATED, _on_sweet_written)
+    events.subscribe(events.SWEET_UPDATED, _on_sweet_written)
+    events.subscribe(events.SWEET_DELETED, _on_sweet_deleted)
+    events.subscribe(events.STOCK_CHANGED, _on_stock_changed)
+    stock_stream.subscribe_remote(_on_remote_delta)
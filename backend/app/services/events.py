@@ -0,0 +1,63 @@
+"""
+In-process event hub for inventory changes.
+Routers publish after a change is committed; caches, indexes and
+notifiers subscribe to keep themselves in sync without polling.
+"""
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Event types
+SWEET_CREATED = "sweet.created"
+SWEET_UPDATED = "sweet.updated"
+SWEET_DELETED = "sweet.deleted"
+STOCK_CHANGED = "stock.changed"
+LOW_STOCK = "stock.low"
+
+_subscribers: Dict[str, List[Callable]] = defaultdict(list)
+
+def subscribe(event_type: str, handler: Callable) -> None:
+    """Register a handler called with the event's payload as keyword arguments"""
+    _subscribers[event_type].append(handler)
+
+def unsubscribe(event_type: str, handler: Callable) -> None:
+    """Remove a previously registered handler"""
+    if handler in _subscribers[event_type]:
+        _subscribers[event_type].remove(handler)
+
+def publish(event_type: str, **payload) -> None:
+    """
+    Deliver an event to every subscriber synchronously.
+    A failing subscriber is logged and never breaks the publishing request.
+    """
+    for handler in list(_subscribers[event_type]):
+        try:
+            handler(**payload)
+        except Exception:
+            logger.exception("Event handler %r failed for %s", handler, event_type)
+
+def publish_stock_change(sweet: dict, previous_quantity: int, quantity: int, reason: str) -> None:
+    """
+    Publish a committed stock change, plus a low-stock event when the
+    change takes the sweet from above its reorder threshold to at or below it.
+    `sweet` is the snapshot after the change, so its version is current.
+    """
+    publish(
+        STOCK_CHANGED,
+        sweet_id=sweet["id"],
+        previous_quantity=previous_quantity,
+        quantity=quantity,
+        reason=reason,
+        version=sweet.get("version")
+    )
+    threshold = sweet["reorder_threshold"]
+    if previous_quantity > threshold >= quantity:
+        publish(
+            LOW_STOCK,
+            sweet_id=sweet["id"],
+            name=sweet["name"],
+            quantity=quantity,
+            reorder_threshold=threshold
+        )
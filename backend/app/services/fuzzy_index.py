@@ -0,0 +1,312 @@
+"""
+Fuzzy search service.
+Keeps an in-memory trigram index over the words of sweet names and
+categories so typo-tolerant lookups ("choclate") are answered without
+touching the database. Built at startup and kept current from sweet
+events, including those other workers publish through the stock stream.
+"""
+import heapq
+import re
+import sys
+import threading
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.models.sweet import Sweet
+from app.services import events, stock_stream
+
+# Vocabulary words rescored by edit distance per query word
+WORD_CANDIDATES = 12
+# Trigram postings read per query word before settling for the words found
+WORD_POSTING_BUDGET = 5000
+# Query words whose similarity to a vocabulary word falls below this don't match it
+MIN_WORD_SIMILARITY = 0.6
+# Prefix matches ("choc" for "chocolate") count for slightly less than whole words
+PREFIX_WEIGHT = 0.9
+# Category matches count for slightly less than name matches
+CATEGORY_WEIGHT = 0.9
+# Sweets scored per requested result
+CANDIDATES_PER_RESULT = 5
+# Query words considered; the rest of a long query is ignored
+MAX_QUERY_WORDS = 6
+# Vocabulary matches remembered between queries
+MATCH_CACHE_SIZE = 4096
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words, splitting on punctuation and whitespace"""
+    return _NON_WORD.sub(" ", text.lower()).split()
+
+def trigrams(word: str) -> Set[str]:
+    """Trigrams of a word, padded so its start and end count too"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+def word_similarity(query: str, word: str) -> float:
+    """
+    1 minus the edit distance normalized by the longer word, or the
+    (discounted) similarity to the word's prefix when the query is a
+    word still being typed.
+    """
+    similarity = 1 - edit_distance(query, word) / max(len(query), len(word))
+    if len(query) >= 3 and len(word) > len(query):
+        prefix = word[:len(query)]
+        similarity = max(similarity, PREFIX_WEIGHT * (1 - edit_distance(query, prefix) / len(query)))
+    return similarity
+
+# Everything rebuild() swaps in from a freshly built index
+_STATE = (
+    "_word_ids", "_words", "_next_word_id", "_grams",
+    "_name_postings", "_category_postings", "_docs", "_match_cache",
+)
+
+class FuzzyIndex:
+    """
+    Two-level index: trigrams -> vocabulary words -> sweets.
+
+    Names share far fewer distinct words than there are sweets, so each
+    query word is fuzzily matched against the vocabulary (trigram overlap
+    to shortlist, edit distance to score) and only then expanded to sweets
+    through per-word posting sets. Sweets matching every query word are
+    found with set intersections; a bounded pool of candidates is then
+    scored by how well their name and category words cover the query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._word_ids: Dict[str, int] = {}
+        self._words: Dict[int, str] = {}
+        self._next_word_id = 0
+        self._grams: Dict[str, Set[int]] = {}
+        self._name_postings: Dict[int, Set[int]] = {}
+        self._category_postings: Dict[int, Set[int]] = {}
+        self._docs: Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...], int]] = {}
+        self._match_cache: Dict[str, Dict[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._next_word_id
+            self._next_word_id += 1
+            self._word_ids[word] = word_id
+            self._words[word_id] = word
+            for gram in trigrams(word):
+                self._grams.setdefault(gram, set()).add(word_id)
+            self._match_cache.clear()
+        return word_id
+
+    def _release_word(self, word_id: int) -> None:
+        """Forget a word no sweet uses any more"""
+        if word_id in self._name_postings or word_id in self._category_postings:
+            return
+        word = self._words.pop(word_id)
+        del self._word_ids[word]
+        for gram in trigrams(word):
+            word_ids = self._grams[gram]
+            word_ids.discard(word_id)
+            if not word_ids:
+                del self._grams[gram]
+        self._match_cache.clear()
+
+    def _add(self, sweet_id: int, name: str, category: str) -> None:
+        name_words = tuple(dict.fromkeys(self._word_id(word) for word in tokenize(name)))
+        category_words = tuple(dict.fromkeys(self._word_id(word) for word in tokenize(category)))
+        for word_id in name_words:
+            self._name_postings.setdefault(word_id, set()).add(sweet_id)
+        for word_id in category_words:
+            self._category_postings.setdefault(word_id, set()).add(sweet_id)
+        self._docs[sweet_id] = (name_words, category_words, len(name))
+
+    def _remove(self, sweet_id: int) -> None:
+        doc = self._docs.pop(sweet_id, None)
+        if doc is None:
+            return
+        for postings, word_ids in ((self._name_postings, doc[0]), (self._category_postings, doc[1])):
+            for word_id in word_ids:
+                sweet_ids = postings[word_id]
+                sweet_ids.discard(sweet_id)
+                if not sweet_ids:
+                    del postings[word_id]
+        for word_id in set(doc[0] + doc[1]):
+            self._release_word(word_id)
+
+    def upsert(self, sweet_id: int, name: str, category: str) -> None:
+        """Index a sweet, replacing whatever was indexed for it before"""
+        with self._lock:
+            self._remove(sweet_id)
+            self._add(sweet_id, name, category)
+
+    def remove(self, sweet_id: int) -> None:
+        """Drop a sweet from the index"""
+        with self._lock:
+            self._remove(sweet_id)
+
+    def rebuild(self, db: Session, *shards: Session) -> int:
+        """Replace the index with every sweet in the database and on the given shards; returns the count"""
+        fresh = FuzzyIndex()
+        for source in (db, *shards):
+            for sweet_id, name, category in source.query(Sweet.id, Sweet.name, Sweet.category).yield_per(5000):
+                fresh._add(sweet_id, name, category)
+        with self._lock:
+            for attribute in _STATE:
+                setattr(self, attribute, getattr(fresh, attribute))
+        return len(fresh)
+
+    def _match_word(self, query_word: str) -> Dict[int, float]:
+        """Vocabulary words similar to a query word, with their similarity"""
+        cached = self._match_cache.get(query_word)
+        if cached is not None:
+            return cached
+        # Count shared trigrams rarest first, so common ones can't blow the budget
+        counts: Dict[int, int] = {}
+        budget = WORD_POSTING_BUDGET
+        for word_ids in sorted((self._grams.get(gram, ()) for gram in trigrams(query_word)), key=len):
+            if budget <= 0:
+                break
+            for word_id in word_ids:
+                counts[word_id] = counts.get(word_id, 0) + 1
+            budget -= len(word_ids)
+        shortlist = set(heapq.nlargest(WORD_CANDIDATES, counts, key=counts.__getitem__))
+        if query_word in self._word_ids:
+            shortlist.add(self._word_ids[query_word])
+        matches = {}
+        for word_id in shortlist:
+            similarity = word_similarity(query_word, self._words[word_id])
+            if similarity >= MIN_WORD_SIMILARITY:
+                matches[word_id] = similarity
+        if len(self._match_cache) >= MATCH_CACHE_SIZE:
+            self._match_cache.clear()
+        self._match_cache[query_word] = matches
+        return matches
+
+    def _postings_for(self, matches: Dict[int, float]) -> List[Set[int]]:
+        """Posting sets of the matched words, best matches first"""
+        postings = []
+        for word_id in sorted(matches, key=matches.__getitem__, reverse=True):
+            for field in (self._name_postings, self._category_postings):
+                if word_id in field:
+                    postings.append(field[word_id])
+        return postings
+
+    def _best_postings(self, matches: Dict[int, float]) -> List[Set[int]]:
+        """Posting sets of the words matching a query word best"""
+        top = max(matches.values())
+        return self._postings_for({word_id: score for word_id, score in matches.items() if score == top})
+
+    def _score(self, sweet_id: int, matches: List[Dict[int, float]]) -> float:
+        """Mean over query words of the best similarity among the sweet's words"""
+        name_words, category_words, _ = self._docs[sweet_id]
+        total = 0.0
+        for word_matches in matches:
+            best = max((word_matches.get(word_id, 0.0) for word_id in name_words), default=0.0)
+            for word_id in category_words:
+                best = max(best, CATEGORY_WEIGHT * word_matches.get(word_id, 0.0))
+            total += best
+        return total / len(matches)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Ranked (sweet_id, score) matches for a possibly misspelled query"""
+        query_words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_WORDS]
+        if not query_words:
+            return []
+        budget = limit * CANDIDATES_PER_RESULT
+        with self._lock:
+            matches = [self._match_word(word) for word in query_words]
+            if not any(matches):
+                return []
+
+            # Sweets matching every query word at its best similarity come first...
+            pool: Set[int] = set()
+            if len(matches) > 1 and all(matches):
+                best = sorted(
+                    (self._best_postings(word_matches) for word_matches in matches),
+                    key=lambda sets: sum(map(len, sets))
+                )
+                # Walk the smallest posting lists lazily instead of materializing unions,
+                # stopping once there are enough sweets that match everything
+                hits = (
+                    sweet_id for sweet_ids in best[0] for sweet_id in sweet_ids
+                    if all(any(sweet_id in other for other in sets) for sets in best[1:])
+                )
+                pool.update(islice(hits, limit * 2))
+            # ...then sweets matching the rarest query words, until the budget is spent
+            postings = sorted(
+                (self._postings_for(word_matches) for word_matches in matches if word_matches),
+                key=lambda word_postings: sum(map(len, word_postings))
+            )
+            for sweet_ids in (sweet_ids for word_postings in postings for sweet_ids in word_postings):
+                if len(pool) >= budget:
+                    break
+                pool.update(islice(sweet_ids, budget - len(pool)))
+
+            scored = [(self._score(sweet_id, matches), self._docs[sweet_id][2], sweet_id) for sweet_id in pool]
+        ranked = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], item[1], item[2]))
+        return [(sweet_id, round(score, 4)) for score, _, sweet_id in ranked]
+
+    def stats(self) -> dict:
+        """
+        Index size and an estimate of the memory it holds, in bytes,
+        including the cache of vocabulary matches. Counts the containers
+        and strings; sweet and word ids are small ints shared between them
+        and aren't counted per reference.
+        """
+        with self._lock:
+            maps = (
+                self._word_ids, self._words, self._grams, self._name_postings,
+                self._category_postings, self._docs, self._match_cache,
+            )
+            memory = sum(sys.getsizeof(mapping) for mapping in maps)
+            memory += sum(sys.getsizeof(word) for word in self._word_ids)
+            memory += sum(sys.getsizeof(gram) + sys.getsizeof(ids) for gram, ids in self._grams.items())
+            memory += sum(sys.getsizeof(ids) for ids in self._name_postings.values())
+            memory += sum(sys.getsizeof(ids) for ids in self._category_postings.values())
+            memory += sum(sys.getsizeof(doc) + sys.getsizeof(doc[0]) + sys.getsizeof(doc[1]) for doc in self._docs.values())
+            memory += sum(sys.getsizeof(word) + sys.getsizeof(matches) for word, matches in self._match_cache.items())
+            return {
+                "documents": len(self._docs),
+                "words": len(self._words),
+                "trigrams": len(self._grams),
+                "cached_matches": len(self._match_cache),
+                "memory_bytes": memory,
+            }
+
+fuzzy_index = FuzzyIndex()
+
+def _on_sweet_written(sweet: dict, previous: Optional[dict] = None, **payload) -> None:
+    if previous and (previous["name"], previous["category"]) == (sweet["name"], sweet["category"]):
+        return
+    fuzzy_index.upsert(sweet["id"], sweet["name"], sweet["category"])
+
+def _on_sweet_deleted(sweet: dict, **payload) -> None:
+    fuzzy_index.remove(sweet["id"])
+
+def _on_remote_delta(delta: dict) -> None:
+    if delta["type"] == "sweet":
+        _on_sweet_written(delta["sweet"])
+    elif delta["type"] == "deleted":
+        fuzzy_index.remove(delta["sweet_id"])
+
+events.subscribe(events.SWEET_CREATED, _on_sweet_written)
+events.subscribe(events.SWEET_UPDATED, _on_sweet_written)
+events.subscribe(events.SWEET_DELETED, _on_sweet_deleted)
+stock_stream.subscribe_remote(_on_remote_delta)
@@ -0,0 +1,146 @@
+"""
+Health service for liveness and readiness probes.
+Background samplers measure event-loop lag and database reachability,
+so a probe only reads cached numbers and never touches the database.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Readiness fails once any of these is exceeded
+READINESS_MAX_LOOP_LAG_MS = float(os.getenv("READINESS_MAX_LOOP_LAG_MS", 500))
+READINESS_MAX_POOL_SATURATION = float(os.getenv("READINESS_MAX_POOL_SATURATION", 0.9))
+READINESS_MAX_IN_FLIGHT = int(os.getenv("READINESS_MAX_IN_FLIGHT", 200))
+# Seconds between background DB pings, and how old the last good ping may be
+DB_PING_INTERVAL = float(os.getenv("DB_PING_INTERVAL", 5))
+DB_PING_MAX_AGE = float(os.getenv("DB_PING_MAX_AGE", 15))
+# Seconds between loop-lag samples, and how many recent samples are kept
+LOOP_LAG_INTERVAL = 0.25
+LOOP_LAG_WINDOW = 20
+
+class LoopLagSampler:
+    """
+    Measures how late the event loop wakes a sleeping task.
+    Anything blocking the loop (bcrypt, sync I/O) shows up as lag.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, window: int = LOOP_LAG_WINDOW):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, lag_ms: float) -> None:
+        self.samples.append(max(lag_ms, 0.0))
+
+    def current(self) -> float:
+        """Most recent lag in milliseconds"""
+        return self.samples[-1] if self.samples else 0.0
+
+    def worst(self) -> float:
+        """Worst lag in the recent window, in milliseconds"""
+        return max(self.samples, default=0.0)
+
+    async def run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record((time.perf_counter() - started - self.interval) * 1000)
+
+class DbPinger:
+    """Pings the database in the background and caches the outcome"""
+
+    def __init__(self, engine: Engine, interval: float = DB_PING_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.ok: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def ping(self) -> bool:
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            self.ok, self.error = True, None
+        except Exception as exc:
+            self.ok, self.error = False, str(exc)
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.checked_at = time.monotonic()
+        return self.ok
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last ping finished"""
+        return None if self.checked_at is None else time.monotonic() - self.checked_at
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.to_thread(self.ping)
+            await asyncio.sleep(self.interval)
+
+class InFlightCounter:
+    """
+    Number of HTTP requests this worker is handling and hasn't started
+    answering yet. A request leaves the count once its response starts,
+    so long-lived streams such as SSE don't read as saturation.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def enter(self) -> None:
+        self.count += 1
+
+    def leave(self) -> None:
+        self.count -= 1
+
+def pool_saturation(engine: Engine) -> Optional[float]:
+    """Checked-out connections as a share of what the pool can hand out"""
+    pool = engine.pool
+    size = getattr(pool, "size", None)
+    checked_out = getattr(pool, "checkedout", None)
+    if not callable(size) or not callable(checked_out):
+        return None
+    capacity = size() + max(getattr(pool, "_max_overflow", 0), 0)
+    return round(checked_out() / capacity, 3) if capacity else None
+
+loop_lag = LoopLagSampler()
+in_flight = InFlightCounter()
+
+def readiness(engine: Engine, pinger: DbPinger) -> dict:
+    """
+    Evaluate readiness from cached signals only.
+    Each check reports its value, its threshold and whether it passes.
+    """
+    db_age = pinger.age()
+    saturation = pool_saturation(engine)
+    checks = {
+        "database": {
+            "ok": bool(pinger.ok) and db_age is not None and db_age <= DB_PING_MAX_AGE,
+            "latency_ms": pinger.latency_ms,
+            "age_s": None if db_age is None else round(db_age, 3),
+            "max_age_s": DB_PING_MAX_AGE,
+            "error": pinger.error,
+        },
+        "pool": {
+            "ok": saturation is None or saturation < READINESS_MAX_POOL_SATURATION,
+            "saturation": saturation,
+            "max_saturation": READINESS_MAX_POOL_SATURATION,
+        },
+        "event_loop": {
+            "ok": loop_lag.worst() <= READINESS_MAX_LOOP_LAG_MS,
+            "lag_ms": round(loop_lag.current(), 3),
+            "worst_lag_ms": round(loop_lag.worst(), 3),
+            "max_lag_ms": READINESS_MAX_LOOP_LAG_MS,
+        },
+        "in_flight": {
+            "ok": in_flight.count <= READINESS_MAX_IN_FLIGHT,
+            "requests": in_flight.count,
+            "max_requests": READINESS_MAX_IN_FLIGHT,
+        },
+    }
+    ready = all(check["ok"] for check in checks.values())
+    return {"status": "ready" if ready else "unavailable", "checks": checks}
@@ -0,0 +1,271 @@
+"""
+Background job service for long-running admin operations.
+Runs bulk inventory changes outside request handlers in committed chunks,
+with job state and progress persisted so work resumes after a restart.
+
+Jobs cover the default store only: each chunk commits its sweets
+together with the job's cursor and progress, which one database
+transaction can't do for sweets spread over several store shards.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database.connection import SessionLocal
+from app.models.job import Job
+from app.models.purchase import utc_now
+from app.models.sweet import Sweet
+from app.services import catalog_service, events, price_history, stock_service
+
+logger = logging.getLogger(__name__)
+
+# Sweets processed per committed chunk
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", 200))
+# Jobs run at the same time by one worker
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", 2))
+# Seconds without a heartbeat after which another worker may take a job over
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 60))
+
+# Identifies this process as a job owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+ACTIVE_STATUSES = ("pending", "running")
+
+Publication = Tuple[str, dict]
+
+class JobError(Exception):
+    """Raised when a job can't be created from the given parameters"""
+
+class JobKind(ABC):
+    """A kind of bulk job: which sweets it touches and what it does to them"""
+
+    @abstractmethod
+    def validate(self, params: dict) -> dict:
+        """Check and normalize parameters, raising JobError when invalid"""
+
+    def scope(self, query, params: dict):
+        """Restrict a sweets query to the sweets this job touches"""
+        if params.get("category"):
+            query = query.filter(func.lower(Sweet.category) == params["category"].lower())
+        return query
+
+    @abstractmethod
+    def apply(self, db: Session, sweets: List[Sweet], params: dict) -> List[Publication]:
+        """Change one chunk of sweets; return events to publish after commit"""
+
+class RestockJob(JobKind):
+    """Add the same quantity to every sweet, optionally within one category"""
+
+    def validate(self, params: dict) -> dict:
+        quantity = params.get("quantity")
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise JobError("Restock quantity must be positive")
+        return {"quantity": quantity, "category": params.get("category")}
+
+    def apply(self, db: Session, sweets: List[Sweet], params: dict) -> List[Publication]:
+        totals = []
+        for sweet in sweets:
+            if sweet.stock_slots:
+                totals.append(stock_service.restock_sharded(db, sweet, params["quantity"]))
+            else:
+                sweet.quantity += params["quantity"]
+                totals.append(sweet.quantity)
+        # Flushed so the published snapshots carry the bumped versions
+        db.flush()
+        return [
+            ("stock", {
+                "sweet": catalog_service.sweet_snapshot(sweet),
+                "previous_quantity": new_quantity - params["quantity"],
+                "quantity": new_quantity,
+            })
+            for sweet, new_quantity in zip(sweets, totals)
+        ]
+
+class RepriceJob(JobKind):
+    """Change every price by a percentage, optionally within one category"""
+
+    def validate(self, params: dict) -> dict:
+        percent = params.get("percent")
+        if not isinstance(percent, (int, float)) or percent <= -100:
+            raise JobError("Percent must be a number greater than -100")
+        return {"percent": float(percent), "category": params.get("category")}
+
+    def apply(self, db: Session, sweets: List[Sweet], params: dict) -> List[Publication]:
+        previous = [catalog_service.sweet_snapshot(sweet) for sweet in sweets]
+        for sweet in sweets:
+            sweet.price = max(round(sweet.price * (1 + params["percent"] / 100), 2), 0.01)
+        # Flushed so the published snapshots carry the bumped versions
+        db.flush()
+        price_history.record_prices(
+            db, [(sweet.id, sweet.price) for sweet, before in zip(sweets, previous) if sweet.price != before["price"]]
+        )
+        return [
+            (events.SWEET_UPDATED, {"sweet": catalog_service.sweet_snapshot(sweet), "previous": before})
+            for sweet, before in zip(sweets, previous)
+        ]
+
+JOB_KINDS: Dict[str, JobKind] = {
+    "restock": RestockJob(),
+    "reprice": RepriceJob(),
+}
+
+def create_job(db: Session, kind: str, params: dict, user_id: Optional[int] = None) -> Job:
+    """Validate and persist a new pending job"""
+    if kind not in JOB_KINDS:
+        raise JobError(f"Unknown job kind '{kind}'. Available: {', '.join(sorted(JOB_KINDS))}")
+    job = Job(kind=kind, params=JOB_KINDS[kind].validate(params), status="pending", created_by=user_id)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def _aware(moment: Optional[datetime]) -> Optional[datetime]:
+    """SQLite hands back naive datetimes; treat them as UTC"""
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+def _leased_elsewhere(job: Job, now: datetime) -> bool:
+    """Whether another live worker currently holds this job"""
+    heartbeat = _aware(job.heartbeat_at)
+    return (
+        job.owner not in (None, WORKER_ID)
+        and heartbeat is not None
+        and now - heartbeat < timedelta(seconds=JOB_LEASE_SECONDS)
+    )
+
+def _publish(publications: List[Publication]) -> None:
+    """Publish a committed chunk's events"""
+    for event_type, payload in publications:
+        if event_type == "stock":
+            events.publish_stock_change(reason="job", **payload)
+        else:
+            events.publish(event_type, **payload)
+
+class JobRunner:
+    """
+    Executes jobs chunk by chunk with bounded concurrency.
+
+    Each chunk's data changes, cursor and progress commit in one
+    transaction, so a job interrupted at any point resumes after its last
+    committed chunk without redoing or skipping sweets.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        chunk_size: int = JOB_CHUNK_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.max_concurrent = max_concurrent
+        self.chunk_size = chunk_size
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+    def run_chunk(self, job_id: int) -> bool:
+        """Process the next chunk of a job; returns True when there is nothing left to do"""
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+            now = utc_now()
+            if job is None or job.status not in ACTIVE_STATUSES or _leased_elsewhere(job, now):
+                return True
+
+            kind = JOB_KINDS[job.kind]
+            if job.total is None:
+                job.total = kind.scope(db.query(func.count(Sweet.id)), job.params).scalar()
+
+            sweets = kind.scope(db.query(Sweet), job.params).filter(
+                Sweet.id > (job.cursor or 0)
+            ).order_by(Sweet.id).limit(self.chunk_size).with_for_update().all()
+            publications = kind.apply(db, sweets, job.params)
+
+            job.status = "running"
+            job.owner = WORKER_ID
+            job.heartbeat_at = now
+            if sweets:
+                job.cursor = sweets[-1].id
+                job.processed += len(sweets)
+            done = len(sweets) < self.chunk_size
+            if done:
+                job.status = "succeeded"
+                job.finished_at = now
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Job %s failed", job_id)
+            self._fail(db, job_id, exc)
+            return True
+        finally:
+            db.close()
+
+        _publish(publications)
+        return done
+
+    def _fail(self, db: Session, job_id: int, exc: Exception) -> None:
+        """Record a job failure; progress up to the last chunk stays committed"""
+        db.query(Job).filter(Job.id == job_id).update(
+            {"status": "failed", "error": str(exc), "finished_at": utc_now()},
+            synchronize_session=False
+        )
+        db.commit()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limit bound to the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore[0] is not loop:
+            self._semaphore = (loop, asyncio.Semaphore(self.max_concurrent))
+        return self._semaphore[1]
+
+    def submit(self, job_id: int) -> None:
+        """Schedule a job on the running loop unless it is already running here"""
+        task = self._tasks.get(job_id)
+        if task is not None and not task.done():
+            return
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _run(self, job_id: int) -> None:
+        try:
+            async with self._get_semaphore():
+                while not await run_in_threadpool(self.run_chunk, job_id):
+                    pass
+        finally:
+            self._tasks.pop(job_id, None)
+
+    def resumable_job_ids(self) -> List[int]:
+        """Active jobs that are unowned, ours, or whose owner stopped heartbeating"""
+        db = self.session_factory()
+        try:
+            cutoff = utc_now() - timedelta(seconds=JOB_LEASE_SECONDS)
+            rows = db.query(Job.id).filter(
+                Job.status.in_(ACTIVE_STATUSES),
+                or_(Job.owner.is_(None), Job.owner == WORKER_ID, Job.heartbeat_at < cutoff),
+            ).order_by(Job.id).all()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    async def watch(self, interval: float = JOB_LEASE_SECONDS / 2) -> None:
+        """Resume unfinished jobs now and keep adopting orphaned ones"""
+        while True:
+            try:
+                for job_id in await run_in_threadpool(self.resumable_job_ids):
+                    self.submit(job_id)
+            except Exception:
+                logger.exception("Failed to scan for resumable jobs")
+            await asyncio.sleep(interval)
+
+    async def shutdown(self) -> None:
+        """Stop running jobs; their committed progress is resumed later"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+job_runner = JobRunner()
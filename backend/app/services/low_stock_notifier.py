@@ -0,0 +1,59 @@
+"""
+Low-stock alert notifier.
+Collects low-stock events published by the purchase path and delivers
+them to alert sinks in periodic batches, instead of scanning for them.
+"""
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List
+from app.services import events
+
+logger = logging.getLogger(__name__)
+
+def log_sink(alerts: List[dict]) -> None:
+    """Default sink: write one warning line per batch"""
+    summary = ", ".join(f"{alert['name']} ({alert['quantity']}/{alert['reorder_threshold']})" for alert in alerts)
+    logger.warning("Low stock on %d sweet(s): %s", len(alerts), summary)
+
+class LowStockNotifier:
+    """
+    Batches low-stock alerts per sweet.
+
+    Alerts for the same sweet arriving within one interval collapse into
+    the latest one, so a sweet selling out quickly produces a single alert.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, dict] = {}
+        self.sinks: List[Callable[[List[dict]], None]] = [log_sink]
+
+    def handle(self, **alert) -> None:
+        """Queue an alert; called from the event hub"""
+        with self._lock:
+            self._pending[alert["sweet_id"]] = alert
+
+    def flush(self) -> List[dict]:
+        """Deliver and return all queued alerts"""
+        with self._lock:
+            alerts, self._pending = list(self._pending.values()), {}
+        if alerts:
+            for sink in self.sinks:
+                try:
+                    sink(alerts)
+                except Exception:
+                    logger.exception("Low-stock sink %r failed", sink)
+        return alerts
+
+    async def run(self, interval: float) -> None:
+        """Flush queued alerts every interval seconds until cancelled"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.flush()
+        finally:
+            self.flush()
+
+low_stock_notifier = LowStockNotifier()
+events.subscribe(events.LOW_STOCK, low_stock_notifier.handle)
@@ -0,0 +1,92 @@
+"""
+Process metrics for capacity planning.
+Tracks how long pooled database connections stay checked out, so the
+pool can be sized against real hold times instead of guesses.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import List, Sequence
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+# Upper bounds in milliseconds of the hold-time histogram buckets
+HOLD_TIME_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram with count, sum and max"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts: List[int] = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max for the overflow bucket)"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank:
+                    return self.bounds[index] if index < len(self.bounds) else self.max
+            return self.max
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts plus summary statistics"""
+        with self._lock:
+            buckets, cumulative = [], 0
+            for bound, bucket_count in zip(list(self.bounds) + ["+Inf"], self.counts):
+                cumulative += bucket_count
+                buckets.append({"le": bound, "count": cumulative})
+            count, total, maximum = self.count, self.total, self.max
+        return {
+            "count": count,
+            "sum_ms": round(total, 3),
+            "mean_ms": round(total / count, 3) if count else 0.0,
+            "max_ms": round(maximum, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+connection_hold_ms = Histogram(HOLD_TIME_BUCKETS_MS)
+
+_CHECKED_OUT_AT = "checked_out_at"
+
+@event.listens_for(Pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    connection_record.info[_CHECKED_OUT_AT] = time.perf_counter()
+
+@event.listens_for(Pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record) -> None:
+    started = connection_record.info.pop(_CHECKED_OUT_AT, None)
+    if started is not None:
+        connection_hold_ms.observe((time.perf_counter() - started) * 1000)
+
+def pool_status(engine) -> dict:
+    """Current pool occupancy for an engine, where the pool reports it"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
@@ -0,0 +1,209 @@
+"""
+Transactional outbox for inventory events.
+Purchases, restocks and sweet updates insert their event into the
+outbox inside their own transaction, so an event exists exactly when
+its change committed. A relay drains the outbox in large batches, hands
+each batch to pluggable sinks and deletes it in one commit.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.database import sharding
+from app.models.outbox import OutboxEvent
+from app.models.purchase import utc_now
+from app.services import events
+from app.services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Seconds between relay passes
+OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", 0.5))
+# Events delivered and deleted per relay transaction
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 1000))
+# JSON lines file receiving every delivered event, when set
+OUTBOX_FILE = os.getenv("OUTBOX_FILE")
+
+# Upper bounds in milliseconds of the delivery lag histogram buckets
+DELIVERY_LAG_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+def record(db: Session, event_type: str, sweet_id: int, /, **payload) -> None:
+    """
+    Add an event to the caller's transaction; it is only ever delivered
+    if that transaction commits. Does not flush or commit.
+    """
+    db.add(OutboxEvent(event_type=event_type, sweet_id=sweet_id, payload=payload))
+
+def record_stock_change(db: Session, sweet: dict, previous_quantity: int, quantity: int, reason: str) -> None:
+    """Outbox counterpart of events.publish_stock_change, with the same payload"""
+    record(
+        db,
+        events.STOCK_CHANGED,
+        sweet["id"],
+        sweet_id=sweet["id"],
+        previous_quantity=previous_quantity,
+        quantity=quantity,
+        reason=reason,
+        version=sweet.get("version")
+    )
+
+def _aware(moment: datetime) -> datetime:
+    """SQLite hands back naive datetimes; treat them as UTC"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+def log_sink(batch: List[dict]) -> None:
+    """Default sink: one debug line per delivered batch"""
+    logger.debug("Delivered %d outbox event(s) up to #%d", len(batch), batch[-1]["id"])
+
+class JsonLinesSink:
+    """Appends each batch to a file as JSON lines with one write and one fsync"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, batch: List[dict]) -> None:
+        lines = "".join(json.dumps(event, default=str) + "\n" for event in batch)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+            file.flush()
+            os.fsync(file.fileno())
+
+class QueueSink:
+    """Puts every event on an in-process queue; stands in for a message broker"""
+
+    def __init__(self, maxsize: int = 0):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+
+    def __call__(self, batch: List[dict]) -> None:
+        for event in batch:
+            self.queue.put(event)
+
+class OutboxRelay:
+    """
+    Delivers outbox events to sinks at least once.
+
+    Each pass reads up to `batch_size` events per shard, gives the whole
+    batch to every sink, then deletes it and commits once, so a thousand
+    events cost one delivery round and one commit. A failing sink rolls
+    the batch back to be retried on the next pass; a crash between
+    delivery and commit redelivers it, so consumers dedupe on the event id.
+    On Postgres, rows are claimed with SKIP LOCKED so several relays can
+    run side by side.
+
+    Delivery order is not guaranteed. Ids are assigned before commit, so
+    a transaction can commit a lower id after a higher one has already
+    been delivered. Concurrent relays also deliver their batches
+    independently. Consumers that need order use the version carried by
+    stock events, not the event id.
+    """
+
+    def __init__(
+        self,
+        engines: Callable[[], List[Engine]] = lambda: sharding.shard_router.engines(),
+        sinks: Optional[List[Callable[[List[dict]], None]]] = None,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+    ):
+        self.engines = engines
+        self.sinks = sinks if sinks is not None else [log_sink]
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.batches = 0
+        self.failures = 0
+        self.delivery_lag_ms = Histogram(DELIVERY_LAG_BUCKETS_MS)
+
+    def _deliver_batch(self, db: Session) -> int:
+        """Deliver and delete the oldest batch on one shard; returns its size"""
+        rows = db.execute(
+            select(OutboxEvent)
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not rows:
+            return 0
+        batch = [
+            {
+                "id": row.id,
+                "type": row.event_type,
+                "sweet_id": row.sweet_id,
+                "payload": row.payload,
+                "created_at": _aware(row.created_at).isoformat(),
+            }
+            for row in rows
+        ]
+        for sink in self.sinks:
+            sink(batch)
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([row.id for row in rows])))
+        db.commit()
+
+        now = utc_now()
+        for row in rows:
+            self.delivery_lag_ms.observe((now - _aware(row.created_at)).total_seconds() * 1000)
+        self.delivered += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    def drain(self) -> int:
+        """Deliver everything pending on every shard; returns the number of events delivered"""
+        delivered = 0
+        with self._lock:
+            for shard in self.engines():
+                db = Session(bind=shard)
+                try:
+                    while True:
+                        count = self._deliver_batch(db)
+                        delivered += count
+                        if count < self.batch_size:
+                            break
+                except Exception:
+                    db.rollback()
+                    self.failures += 1
+                    logger.exception("Failed to deliver outbox events from %s", shard.url)
+                finally:
+                    db.close()
+        return delivered
+
+    def backlog(self) -> dict:
+        """Undelivered events across shards and the age of the oldest one"""
+        pending, oldest = 0, None
+        for shard in self.engines():
+            with Session(bind=shard) as db:
+                count, first = db.execute(
+                    select(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at))
+                ).one()
+            pending += count
+            if first is not None and (oldest is None or _aware(first) < oldest):
+                oldest = _aware(first)
+        return {
+            "pending": pending,
+            "lag_seconds": round((utc_now() - oldest).total_seconds(), 3) if oldest else 0.0,
+        }
+
+    def stats(self) -> dict:
+        """Delivery counters plus the created-to-delivered lag histogram"""
+        return {
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failures": self.failures,
+            "delivery_lag": self.delivery_lag_ms.snapshot(),
+        }
+
+    async def run(self, interval: float = OUTBOX_RELAY_INTERVAL) -> None:
+        """Drain periodically until cancelled, then deliver what is left"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.drain)
+        finally:
+            await asyncio.to_thread(self.drain)
+
+outbox_relay = OutboxRelay(sinks=[log_sink] + ([JsonLinesSink(OUTBOX_FILE)] if OUTBOX_FILE else []))
@@ -0,0 +1,101 @@
+"""
+Partition maintenance for the purchase ledger.
+Keeps monthly Postgres partitions of `purchases` created ahead of time
+and detaches months that fall out of the retention window. Other
+databases don't partition the ledger and are left untouched.
+"""
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "purchases"
+# Months of partitions kept ready beyond the current one
+PURCHASE_PARTITION_MONTHS_AHEAD = int(os.getenv("PURCHASE_PARTITION_MONTHS_AHEAD", 3))
+# Months of history kept attached; 0 keeps everything
+PURCHASE_RETENTION_MONTHS = int(os.getenv("PURCHASE_RETENTION_MONTHS", 24))
+
+_PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+def month_start(moment: date) -> date:
+    """First day of the month containing a date"""
+    return date(moment.year, moment.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before) a month start"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding a month, e.g. purchases_p2026_10"""
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+def partition_ddl(month: date) -> str:
+    """CREATE statement for one month's partition (UTC bounds)"""
+    start, end = month, add_months(month, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+def is_partitioned(connection: Connection) -> bool:
+    """Whether the ledger is a partitioned Postgres table"""
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {"table": PARENT_TABLE}).first())
+
+def attached_partitions(connection: Connection) -> List[str]:
+    """Names of the partitions currently attached to the ledger"""
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)"
+    ), {"table": PARENT_TABLE})
+    return sorted(row.relname for row in rows)
+
+def ensure_partitions(connection: Connection, today: date, months_ahead: int = PURCHASE_PARTITION_MONTHS_AHEAD) -> None:
+    """Create partitions for the current month and the next `months_ahead`"""
+    current = month_start(today)
+    for offset in range(months_ahead + 1):
+        connection.execute(text(partition_ddl(add_months(current, offset))))
+
+def detach_expired_partitions(
+    connection: Connection,
+    today: date,
+    retention_months: int = PURCHASE_RETENTION_MONTHS,
+) -> List[str]:
+    """
+    Detach partitions whose whole month is older than the retention window.
+    Detached tables keep their rows for archiving; dropping them is left to operators.
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    detached = []
+    for name in attached_partitions(connection):
+        match = _PARTITION_NAME.match(name)
+        if match and date(int(match.group(1)), int(match.group(2)), 1) < cutoff:
+            connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            detached.append(name)
+    return detached
+
+def maintain_partitions(engine: Engine, today: Optional[date] = None) -> List[str]:
+    """Create upcoming partitions and detach expired ones; a no-op unless partitioned"""
+    today = today or datetime.now(timezone.utc).date()
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return []
+        ensure_partitions(connection, today)
+        detached = detach_expired_partitions(connection, today)
+    for name in detached:
+        logger.info("Detached expired purchase partition %s", name)
+    return detached
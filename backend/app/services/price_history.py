@@ -0,0 +1,167 @@
+"""
+Price history service.
+Appends every price change to the time series and folds it into hourly
+and daily rollups in the same transaction, and answers history queries
+from the coarsest resolution that still resolves the requested range.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import case, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.price_history import PriceChange, PriceRollup
+from app.models.purchase import utc_now
+
+# Rollups maintained on every change, finest first
+ROLLUP_RESOLUTIONS = ("hour", "day")
+
+# Ranges up to this long are answered from raw changes
+RAW_MAX_SPAN = timedelta(days=2)
+# Most hourly buckets a range may span before daily rollups are used
+MAX_HOURLY_POINTS = 24 * 31
+
+def as_utc(moment: datetime) -> datetime:
+    """Aware UTC form of a moment; naive ones, as SQLite hands back, are taken as UTC"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+def bucket_start(moment: datetime, resolution: str) -> datetime:
+    """Start of the hour or UTC day containing a moment"""
+    moment = as_utc(moment)
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _rollup_upsert(dialect: str):
+    """
+    INSERT ... ON CONFLICT statement merging one change into a rollup row:
+    min and max widen, and last moves only to a later change.
+    """
+    insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert_(PriceRollup)
+    later = statement.excluded.last_at >= PriceRollup.last_at
+    return statement.on_conflict_do_update(
+        index_elements=["resolution", "sweet_id", "bucket"],
+        set_={
+            "min_price": case((statement.excluded.min_price < PriceRollup.min_price, statement.excluded.min_price), else_=PriceRollup.min_price),
+            "max_price": case((statement.excluded.max_price > PriceRollup.max_price, statement.excluded.max_price), else_=PriceRollup.max_price),
+            "last_price": case((later, statement.excluded.last_price), else_=PriceRollup.last_price),
+            "last_at": case((later, statement.excluded.last_at), else_=PriceRollup.last_at),
+            "changes": PriceRollup.changes + 1,
+        },
+    )
+
+def _merge_rollup(db: Session, values: dict) -> None:
+    """Portable fallback: update first, insert when the row doesn't exist yet"""
+    later = values["last_at"] >= PriceRollup.last_at
+    result = db.execute(
+        update(PriceRollup)
+        .where(
+            PriceRollup.resolution == values["resolution"],
+            PriceRollup.sweet_id == values["sweet_id"],
+            PriceRollup.bucket == values["bucket"],
+        )
+        .values(
+            min_price=case((PriceRollup.min_price > values["min_price"], values["min_price"]), else_=PriceRollup.min_price),
+            max_price=case((PriceRollup.max_price < values["max_price"], values["max_price"]), else_=PriceRollup.max_price),
+            last_price=case((later, values["last_price"]), else_=PriceRollup.last_price),
+            last_at=case((later, values["last_at"]), else_=PriceRollup.last_at),
+            changes=PriceRollup.changes + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.add(PriceRollup(**values))
+        db.flush()
+
+def record_prices(db: Session, prices: Iterable[Tuple[int, float]], changed_at: Optional[datetime] = None) -> int:
+    """
+    Append (sweet id, new price) pairs to the history and fold them into
+    the hourly and daily rollups: one multi-row INSERT plus one batched
+    upsert per resolution. Does not commit; the caller commits together
+    with the price change. Returns the number of changes recorded.
+    """
+    changed_at = changed_at or utc_now()
+    prices = list(prices)
+    if not prices:
+        return 0
+    db.execute(insert(PriceChange), [
+        {"sweet_id": sweet_id, "price": price, "changed_at": changed_at} for sweet_id, price in prices
+    ])
+
+    rollups = [
+        {
+            "resolution": resolution,
+            "sweet_id": sweet_id,
+            "bucket": bucket_start(changed_at, resolution),
+            "min_price": price,
+            "max_price": price,
+            "last_price": price,
+            "last_at": changed_at,
+            "changes": 1,
+        }
+        for resolution in ROLLUP_RESOLUTIONS
+        for sweet_id, price in prices
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        db.execute(_rollup_upsert(dialect), rollups)
+    else:
+        for values in rollups:
+            _merge_rollup(db, values)
+    return len(prices)
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """
+    Finest resolution that keeps the number of points bounded: raw changes
+    for short ranges, hourly rollups up to about a month, daily beyond.
+    """
+    span = end - start
+    if span <= RAW_MAX_SPAN:
+        return "raw"
+    if span <= timedelta(hours=MAX_HOURLY_POINTS):
+        return "hour"
+    return "day"
+
+def price_history(
+    db: Session,
+    sweet_id: int,
+    start: datetime,
+    end: datetime,
+    resolution: Optional[str] = None,
+) -> dict:
+    """
+    A sweet's prices between two moments, oldest first.
+
+    Raw points are single changes; rollup points cover the hour or day
+    starting at `at` and overlapping the range. Long ranges never read
+    price_changes, only one rollup row per period.
+    """
+    resolution = resolution or pick_resolution(start, end)
+    if resolution == "raw":
+        rows = db.query(PriceChange.changed_at, PriceChange.price).filter(
+            PriceChange.sweet_id == sweet_id,
+            PriceChange.changed_at >= start,
+            PriceChange.changed_at <= end,
+        ).order_by(PriceChange.changed_at, PriceChange.id).all()
+        points = [
+            {"at": as_utc(row.changed_at), "min_price": row.price, "max_price": row.price, "last_price": row.price, "changes": 1}
+            for row in rows
+        ]
+    else:
+        rows = db.query(PriceRollup).filter(
+            PriceRollup.resolution == resolution,
+            PriceRollup.sweet_id == sweet_id,
+            PriceRollup.bucket >= bucket_start(start, resolution),
+            PriceRollup.bucket <= end,
+        ).order_by(PriceRollup.bucket).all()
+        points = [
+            {
+                "at": as_utc(row.bucket),
+                "min_price": row.min_price,
+                "max_price": row.max_price,
+                "last_price": row.last_price,
+                "changes": row.changes,
+            }
+            for row in rows
+        ]
+    return {"sweet_id": sweet_id, "resolution": resolution, "start": start, "end": end, "points": points}
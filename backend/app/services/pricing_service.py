@@ -0,0 +1,138 @@
+"""
+Pricing service for bulk price changes.
+Applies percent or absolute price rules to every sweet matching the
+search filters as one set-based UPDATE, with an aggregate-only preview.
+"""
+from decimal import Decimal
+from typing import List, Sequence, Tuple
+from sqlalchemy import Float, Numeric, case, cast, func, literal, select, update
+from sqlalchemy.orm import Session
+from app.models.sweet import Sweet
+from app.services import price_history
+from app.services.catalog_service import apply_filters
+
+PRICE_MODES = ("percent", "absolute")
+
+# Prices can be rounded to any of these steps; the step is also the lowest price
+ROUNDING_STEPS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Columns reported for every repriced sweet
+_SWEET_COLUMNS = ("id", "name", "category", "price", "quantity", "reorder_threshold", "store_id", "stock_slots", "version")
+
+class PriceRuleError(Exception):
+    """Raised when a price rule can't be applied"""
+
+def validate_rule(mode: str, amount: float, round_to: float) -> None:
+    """Reject rules that are unknown or could produce nonsensical prices"""
+    if mode not in PRICE_MODES:
+        raise PriceRuleError(f"Mode must be one of: {', '.join(PRICE_MODES)}")
+    if mode == "percent" and amount <= -100:
+        raise PriceRuleError("Percent must be greater than -100")
+    if round_to not in ROUNDING_STEPS:
+        raise PriceRuleError(f"round_to must be one of: {', '.join(map(str, ROUNDING_STEPS))}")
+
+def adjusted_price(mode: str, amount: float, round_to: float = 0.01):
+    """
+    SQL expression for a sweet's price after a rule.
+    The result is rounded to the nearest `round_to` step and never drops
+    below one step. Rounding goes through NUMERIC so Postgres and SQLite agree.
+    """
+    if mode == "percent":
+        raw = Sweet.price * (1 + amount / 100)
+    else:
+        raw = Sweet.price + amount
+    step = literal(Decimal(str(round_to)), Numeric(12, 2))
+    rounded = cast(func.round(func.round(cast(raw, Numeric(14, 4)) / step) * step, 2), Float)
+    return case((rounded < round_to, round_to), else_=rounded)
+
+def _summarize(db: Session, mode: str, amount: float, round_to: float = 0.01, **filters) -> dict:
+    """Unrounded counts and price bounds before and after a rule, from one aggregate query"""
+    new_price = adjusted_price(mode, amount, round_to)
+    row = db.execute(apply_filters(
+        select(
+            func.count(Sweet.id).label("matched"),
+            func.count(case((new_price != Sweet.price, 1))).label("changed"),
+            func.min(Sweet.price).label("min_before"),
+            func.max(Sweet.price).label("max_before"),
+            func.avg(Sweet.price).label("avg_before"),
+            func.min(new_price).label("min_after"),
+            func.max(new_price).label("max_after"),
+            func.avg(new_price).label("avg_after"),
+        ),
+        **filters
+    )).one()
+    return dict(row._mapping)
+
+def _rounded(summary: dict) -> dict:
+    """Prices of a summary rounded to cents"""
+    for key, value in summary.items():
+        if key not in ("matched", "changed") and value is not None:
+            summary[key] = round(float(value), 2)
+    return summary
+
+def preview_adjustment(db: Session, mode: str, amount: float, round_to: float = 0.01, **filters) -> dict:
+    """Summarize what a rule would change, with one aggregate query and no ORM loading"""
+    return _rounded(_summarize(db, mode, amount, round_to, **filters))
+
+def preview_shards(sessions: Sequence[Session], mode: str, amount: float, round_to: float = 0.01, **filters) -> dict:
+    """
+    preview_adjustment over several store shards: one aggregate query per
+    shard, merged with averages weighted by the sweets each one matched.
+    """
+    summaries = [_summarize(db, mode, amount, round_to, **filters) for db in sessions]
+    matched = [summary for summary in summaries if summary["matched"]]
+    merged = {
+        "matched": sum(summary["matched"] for summary in summaries),
+        "changed": sum(summary["changed"] for summary in summaries),
+    }
+    for side in ("before", "after"):
+        merged[f"min_{side}"] = min((summary[f"min_{side}"] for summary in matched), default=None)
+        merged[f"max_{side}"] = max((summary[f"max_{side}"] for summary in matched), default=None)
+        merged[f"avg_{side}"] = (
+            sum(float(summary[f"avg_{side}"]) * summary["matched"] for summary in matched) / merged["matched"]
+            if matched else None
+        )
+    return _rounded(merged)
+
+def apply_adjustment(db: Session, mode: str, amount: float, round_to: float = 0.01, **filters) -> List[Tuple[dict, float]]:
+    """
+    Reprice every matching sweet whose price actually changes, in one UPDATE.
+
+    On Postgres the pre-update prices come from a subquery in the UPDATE's
+    FROM clause, which is evaluated before any row is written, and are
+    returned alongside the new rows. SQLite can't return columns of FROM
+    tables, so there they are read first in the same transaction.
+    Every new price is appended to the price history in the same
+    transaction. Returns (sweet, previous price) for each updated sweet.
+    Does not commit.
+    """
+    new_price = adjusted_price(mode, amount, round_to)
+    sweets = Sweet.__table__
+    returned = [sweets.c[name] for name in _SWEET_COLUMNS]
+
+    if db.get_bind().dialect.name == "postgresql":
+        matching = apply_filters(
+            select(Sweet.id.label("sweet_id"), Sweet.price.label("old_price")), **filters
+        ).subquery("matching")
+        rows = db.execute(
+            update(sweets)
+            .where(sweets.c.id == matching.c.sweet_id, new_price != matching.c.old_price)
+            .values(price=new_price, version=sweets.c.version + 1)
+            .returning(*returned, matching.c.old_price)
+        ).all()
+        changed = [(row, row.old_price) for row in rows]
+    else:
+        previous = dict(db.execute(
+            apply_filters(select(Sweet.id, Sweet.price), **filters).where(new_price != Sweet.price)
+        ).all())
+        rows = db.execute(
+            apply_filters(update(sweets), **filters)
+            .where(new_price != sweets.c.price)
+            .values(price=new_price, version=sweets.c.version + 1)
+            .returning(*returned)
+        ).all()
+        changed = [(row, previous[row.id]) for row in rows]
+
+    changed.sort(key=lambda change: change[0].id)
+    price_history.record_prices(db, [(row.id, row.price) for row, _ in changed])
+    return [({name: getattr(row, name) for name in _SWEET_COLUMNS}, old_price) for row, old_price in changed]
@@ -0,0 +1,231 @@
+"""
+Request profiling service.
+Samples the stacks of a single opted-in request, records the SQL it
+runs, and keeps the results in memory for admins to download as
+flamegraph-ready folded stacks.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.models.purchase import utc_now
+
+# Milliseconds between stack samples
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5))
+# Sampling stops after this many seconds even if the response is still streaming
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 30))
+# Finished profiles kept in memory, oldest dropped first
+MAX_STORED_PROFILES = int(os.getenv("MAX_STORED_PROFILES", 20))
+# SQL statements recorded per profile
+MAX_PROFILE_STATEMENTS = 500
+
+# Leaf frames of threads that are parked, not working
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "get", "_worker", "acquire"}
+
+_active_profile: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("active_profile", default=None)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _fold(frame) -> Optional[str]:
+    """A stack as a root-first, semicolon separated string"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels)) if labels else None
+
+class Profile:
+    """Samples and SQL statements collected for one request"""
+
+    def __init__(self, method: str, path: str, user_id: int, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.user_id = user_id
+        self.interval_ms = interval_ms
+        self.started_at = utc_now()
+        self.status_code: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.statements: List[dict] = []
+        self.statements_dropped = 0
+        self._lock = threading.Lock()
+
+    def record_statement(self, statement: str, parameters, duration_ms: float) -> None:
+        with self._lock:
+            if len(self.statements) >= MAX_PROFILE_STATEMENTS:
+                self.statements_dropped += 1
+                return
+            self.statements.append({
+                "statement": statement,
+                "parameters": repr(parameters)[:500],
+                "duration_ms": round(duration_ms, 3),
+            })
+
+    def folded(self) -> str:
+        """Folded stacks, one `stack count` line each, as read by flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 20) -> List[dict]:
+        """Functions ranked by samples where they were on top of the stack"""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {"function": name, "samples": count, "percent": round(100 * count / total, 1)}
+            for name, count in leaves.most_common(limit)
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "user_id": self.user_id,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "samples": sum(self.stacks.values()),
+            "sample_interval_ms": self.interval_ms,
+            "sql_count": len(self.statements) + self.statements_dropped,
+            "sql_ms": round(sum(entry["duration_ms"] for entry in self.statements), 3),
+        }
+
+    def report(self) -> dict:
+        return dict(
+            self.summary(),
+            top_functions=self.top_functions(),
+            statements=list(self.statements),
+            statements_dropped=self.statements_dropped,
+        )
+
+class StackSampler:
+    """
+    Background thread sampling the stacks working on one request.
+
+    On the event loop thread only samples taken while the request's own
+    task is running count. While that task is suspended, busy threadpool
+    threads are sampled too, since that is usually where it waits (sync
+    dependencies and endpoints). Under concurrent load those samples can
+    include other requests' work; profile on a quiet worker for clean results.
+    """
+
+    def __init__(self, profile: Profile, task: asyncio.Task, loop_thread_id: int):
+        self.profile = profile
+        self.task = task
+        self.loop = task.get_loop()
+        self.loop_thread_id = loop_thread_id
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{profile.id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self) -> None:
+        interval = self.profile.interval_ms / 1000
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        own_id = threading.get_ident()
+        while not self._stopping.wait(interval) and time.monotonic() < deadline:
+            ours_running = asyncio.current_task(self.loop) is self.task
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id == self.loop_thread_id:
+                    if not ours_running:
+                        continue
+                elif ours_running or frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+                stack = _fold(frame)
+                if stack:
+                    self.profile.stacks[stack] += 1
+
+class ProfileStore:
+    """Bounded in-memory store of finished profiles"""
+
+    def __init__(self, capacity: int = MAX_STORED_PROFILES):
+        self.capacity = capacity
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+profile_store = ProfileStore()
+
+# SQL capture listeners are attached only while at least one profile is active
+_listener_lock = threading.Lock()
+_listener_users = 0
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.record_statement(statement, parameters, (time.perf_counter() - starts.pop()) * 1000)
+
+def _attach_sql_listeners() -> None:
+    global _listener_users
+    with _listener_lock:
+        if _listener_users == 0:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listener_users += 1
+
+def _detach_sql_listeners() -> None:
+    global _listener_users
+    with _listener_lock:
+        _listener_users -= 1
+        if _listener_users == 0:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+
+class profiling:
+    """
+    Context manager profiling the code run by the current task.
+    Starts the sampler and SQL capture on entry; on exit stores the profile.
+    """
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+
+    def __enter__(self) -> Profile:
+        self._token = _active_profile.set(self.profile)
+        _attach_sql_listeners()
+        self._sampler = StackSampler(self.profile, asyncio.current_task(), threading.get_ident())
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self.profile
+
+    def __exit__(self, *exc_info) -> None:
+        self._sampler.stop()
+        self.profile.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        _detach_sql_listeners()
+        _active_profile.reset(self._token)
+        profile_store.add(self.profile)
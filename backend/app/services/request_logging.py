@@ -0,0 +1,91 @@
+"""
+Structured logging service.
+Formats application and access logs as JSON lines and hands them to a
+queue, so writing a log record never blocks the event loop; a listener
+thread does the actual I/O. Also keeps a per-request context that
+access logs and the audit trail read the user id and DB time from.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Mutable dict shared by everything handling one request, including threadpool work
+request_context: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_context", default=None)
+
+def set_context(**values) -> None:
+    """Attach values (e.g. user_id) to the current request's log context, if any"""
+    context = request_context.get()
+    if context is not None:
+        context.update(values)
+
+def get_context_value(name: str):
+    """Read a value from the current request's log context"""
+    context = request_context.get()
+    return None if context is None else context.get(name)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; structured fields come from `extra={"fields": {...}}`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging() -> None:
+    """Route the app's loggers through the log queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(_log_queue, output, respect_handler_level=True)
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    app_logger.propagate = False
+
+def start_logging() -> None:
+    """Start the thread writing queued records"""
+    configure_logging()
+    if _listener._thread is None:
+        _listener.start()
+
+def stop_logging() -> None:
+    """Write out queued records and stop the writer thread"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _time_query_start(conn, cursor, statement, parameters, context, executemany):
+    if request_context.get() is not None:
+        conn.info["request_query_start"] = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _time_query_end(conn, cursor, statement, parameters, context, executemany):
+    log_context = request_context.get()
+    started = conn.info.pop("request_query_start", None)
+    if log_context is not None and started is not None:
+        log_context["db_ms"] = log_context.get("db_ms", 0.0) + (time.perf_counter() - started) * 1000
+        log_context["db_queries"] = log_context.get("db_queries", 0) + 1
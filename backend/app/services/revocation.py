@@ -0,0 +1,167 @@
+"""
+Token revocation service.
+Keeps revoked access tokens in memory so checking a token never needs a
+database round trip; the revoked_tokens table is the shared source that
+every worker periodically refreshes from.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal
+from app.models.purchase import utc_now
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Width in seconds of the expiry buckets revocations are grouped by
+REVOCATION_BUCKET_SECONDS = int(os.getenv("REVOCATION_BUCKET_SECONDS", 600))
+# Revocations per bucket the Bloom filter is sized for, and its target false-positive rate
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 10000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.01))
+# Seconds between refreshes from the revoked_tokens table
+REVOCATION_REFRESH_INTERVAL = float(os.getenv("REVOCATION_REFRESH_INTERVAL", 5))
+# Re-read this far behind the last refresh so slow commits aren't missed
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using double hashing on one blake2b digest"""
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, item: str) -> bool:
+        """False means definitely absent; True means probably present"""
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class _Bucket:
+    """Revocations whose tokens expire within one bucket-width window"""
+
+    def __init__(self):
+        self.bloom = BloomFilter()
+        self.jtis: Set[str] = set()
+
+class RevocationList:
+    """
+    In-memory view of revoked tokens.
+
+    Revocations are grouped by token expiry, so whole buckets are dropped
+    once their tokens have expired. A lookup finds the token's bucket by
+    its `exp` claim and asks the bucket's Bloom filter first: almost every
+    token isn't revoked and is answered there. Only probable hits are
+    confirmed against the exact set, so false positives never reject a
+    valid token.
+    """
+
+    def __init__(self, bucket_seconds: int = REVOCATION_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[int, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[datetime] = None
+
+    def _bucket_key(self, expires_at: float) -> int:
+        return int(expires_at) // self.bucket_seconds
+
+    def add(self, jti: str, expires_at: float) -> None:
+        """Mark a token as revoked until its expiry timestamp"""
+        key = self._bucket_key(expires_at)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+            bucket.bloom.add(jti)
+            bucket.jtis.add(jti)
+
+    def is_revoked(self, jti: Optional[str], expires_at: float) -> bool:
+        """Whether a token is revoked; O(1) and never touches the database"""
+        if not jti:
+            return False
+        bucket = self._buckets.get(self._bucket_key(expires_at))
+        if bucket is None or not bucket.bloom.might_contain(jti):
+            return False
+        return jti in bucket.jtis
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop buckets whose tokens have all expired; returns how many were dropped"""
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        current = self._bucket_key(now)
+        with self._lock:
+            expired = [key for key in self._buckets if key < current]
+            for key in expired:
+                del self._buckets[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return sum(len(bucket.jtis) for bucket in list(self._buckets.values()))
+
+    def refresh(self, db: Session) -> int:
+        """
+        Load revocations made since the last refresh (all of them the first
+        time), prune expired buckets and delete expired rows.
+        Returns the number of revocations read.
+        """
+        now = utc_now()
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+        if self._refreshed_at is not None:
+            query = query.filter(RevokedToken.revoked_at >= self._refreshed_at - REFRESH_OVERLAP)
+        rows = query.all()
+        for row in rows:
+            self.add(row.jti, _timestamp(row.expires_at))
+        self._refreshed_at = now
+
+        self.prune(now.timestamp())
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        db.commit()
+        return len(rows)
+
+    def _refresh_once(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    async def run(self, interval: float = REVOCATION_REFRESH_INTERVAL) -> None:
+        """Keep this worker in sync with revocations made by the others"""
+        while True:
+            try:
+                await asyncio.to_thread(self._refresh_once)
+            except Exception:
+                logger.exception("Failed to refresh revoked tokens")
+            await asyncio.sleep(interval)
+
+def _timestamp(moment: datetime) -> float:
+    """SQLite hands back naive datetimes; treat them as UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def revoke_token(db: Session, jti: str, expires_at: float, user_id: Optional[int] = None) -> None:
+    """Persist a revocation for every worker and apply it here immediately"""
+    if db.get(RevokedToken, jti) is None:
+        db.add(RevokedToken(
+            jti=jti,
+            user_id=user_id,
+            expires_at=datetime.fromtimestamp(expires_at, timezone.utc),
+        ))
+        db.commit()
+    revocation_list.add(jti, expires_at)
+
+revocation_list = RevocationList()
@@ -0,0 +1,42 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight call
+instead of each running their own copy of it.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key.
+
+    The first caller for a key starts the work as a separate task; callers
+    arriving while it runs await the same task. Results and exceptions are
+    delivered to every waiter. A cancelled waiter only stops waiting; the
+    shared task keeps running for the others. The key is forgotten as soon
+    as the task finishes, so later calls always start fresh work.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed"""
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the call already in flight for it"""
+        flight_key = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._finish(flight_key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key, task: asyncio.Task) -> None:
+        """Drop a finished flight and mark its exception as retrieved"""
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        if not task.cancelled():
+            task.exception()
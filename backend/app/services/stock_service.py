@@ -0,0 +1,269 @@
+"""
+Stock service for sharded inventory counters.
+Lets hot sweets spread their quantity over several counter rows so that
+concurrent purchases update different rows instead of queueing on one.
+"""
+import random
+from typing import Dict, Iterable, List
+from sqlalchemy import Integer, bindparam, column, func, select, update, values
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.sweet import Sweet
+from app.models.stock_shard import SweetStockShard
+
+MAX_STOCK_SLOTS = 64
+
+class InsufficientStockError(Exception):
+    """Raised when a purchase asks for more than the available stock"""
+
+    def __init__(self, available: int, requested: int):
+        self.available = available
+        self.requested = requested
+        super().__init__(f"Insufficient quantity. Available: {available}, Requested: {requested}")
+
+def _split(total: int, slots: int) -> List[int]:
+    """Split a total into `slots` near-equal parts"""
+    base, extra = divmod(total, slots)
+    return [base + 1 if slot < extra else base for slot in range(slots)]
+
+def sharded_total(db: Session, sweet_id: int) -> int:
+    """Sum the stock held across all slots of a sharded sweet"""
+    total = db.query(func.coalesce(func.sum(SweetStockShard.quantity), 0)).filter(
+        SweetStockShard.sweet_id == sweet_id
+    ).scalar()
+    return int(total)
+
+def _lock_shards(db: Session, sweet_id: int) -> List[SweetStockShard]:
+    """Load a sweet's slots with row locks, always in slot order to avoid deadlocks"""
+    return db.query(SweetStockShard).filter(
+        SweetStockShard.sweet_id == sweet_id
+    ).order_by(SweetStockShard.slot).with_for_update().populate_existing().all()
+
+def set_stock_slots(db: Session, sweet: Sweet, slots: int) -> None:
+    """
+    Enable, resize or disable sharding for a sweet.
+    The current total is redistributed evenly over the new slots;
+    slots=0 folds everything back onto the sweets row.
+    """
+    if sweet.stock_slots:
+        shards = _lock_shards(db, sweet.id)
+        total = sum(shard.quantity for shard in shards)
+        for shard in shards:
+            db.delete(shard)
+        db.flush()
+    else:
+        total = sweet.quantity
+
+    sweet.stock_slots = slots
+    sweet.quantity = total
+    for slot, quantity in enumerate(_split(total, slots) if slots else []):
+        db.add(SweetStockShard(sweet_id=sweet.id, slot=slot, quantity=quantity))
+
+def set_sharded_total(db: Session, sweet: Sweet, total: int) -> None:
+    """Overwrite a sharded sweet's stock, spreading the new total over its slots"""
+    shards = _lock_shards(db, sweet.id)
+    for shard, quantity in zip(shards, _split(total, len(shards))):
+        shard.quantity = quantity
+    sweet.quantity = total
+
+def purchase_row(db: Session, sweet: Sweet, quantity: int) -> int:
+    """
+    Take stock from an unsharded sweet and return the remaining quantity.
+
+    One conditional UPDATE decrements the row and bumps its version, so
+    concurrent purchases never overwrite each other and no lock is held
+    beyond the statement's own row lock. The sweet is refreshed with the
+    committed-to-be quantity and version.
+    """
+    result = db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet.id, Sweet.quantity >= quantity)
+        .values(quantity=Sweet.quantity - quantity, version=Sweet.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.refresh(sweet)
+    if result.rowcount != 1:
+        raise InsufficientStockError(sweet.quantity, quantity)
+    return sweet.quantity
+
+def restock_row(db: Session, sweet: Sweet, quantity: int) -> int:
+    """Add stock to an unsharded sweet in one UPDATE and return the new quantity"""
+    db.execute(
+        update(Sweet)
+        .where(Sweet.id == sweet.id)
+        .values(quantity=Sweet.quantity + quantity, version=Sweet.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.refresh(sweet)
+    return sweet.quantity
+
+def purchase_sharded(db: Session, sweet: Sweet, quantity: int) -> int:
+    """
+    Take stock from a sharded sweet and return the remaining total.
+
+    A random slot is tried first with a conditional decrement, then the
+    other slots in random order. Only if no single slot can cover the
+    request are all slots locked (in slot order) and drained together.
+    The `quantity >= n` guard on every decrement keeps overselling impossible.
+    """
+    slots = random.sample(range(sweet.stock_slots), sweet.stock_slots)
+    for slot in slots:
+        result = db.execute(
+            update(SweetStockShard)
+            .where(
+                SweetStockShard.sweet_id == sweet.id,
+                SweetStockShard.slot == slot,
+                SweetStockShard.quantity >= quantity,
+            )
+            .values(quantity=SweetStockShard.quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return sharded_total(db, sweet.id)
+
+    shards = _lock_shards(db, sweet.id)
+    available = sum(shard.quantity for shard in shards)
+    if available < quantity:
+        raise InsufficientStockError(available, quantity)
+
+    remaining = quantity
+    for shard in shards:
+        take = min(shard.quantity, remaining)
+        shard.quantity -= take
+        remaining -= take
+        if not remaining:
+            break
+    db.flush()
+    return available - quantity
+
+def restock_sharded(db: Session, sweet: Sweet, quantity: int) -> int:
+    """Spread restocked units evenly over the slots and return the new total"""
+    offset = random.randrange(sweet.stock_slots)
+    for index, amount in enumerate(_split(quantity, sweet.stock_slots)):
+        if amount:
+            db.execute(
+                update(SweetStockShard)
+                .where(
+                    SweetStockShard.sweet_id == sweet.id,
+                    SweetStockShard.slot == (index + offset) % sweet.stock_slots,
+                )
+                .values(quantity=SweetStockShard.quantity + amount)
+                .execution_options(synchronize_session=False)
+            )
+    return sharded_total(db, sweet.id)
+
+class UnknownSweetsError(Exception):
+    """Raised when a batch refers to sweets that don't exist"""
+
+    def __init__(self, sweet_ids: List[int]):
+        self.sweet_ids = sweet_ids
+        super().__init__(f"Sweets not found: {', '.join(map(str, sweet_ids))}")
+
+# Columns reported for every sweet touched by a batch restock
+_BATCH_COLUMNS = ("id", "name", "category", "price", "quantity", "reorder_threshold", "store_id", "stock_slots", "version")
+
+def restock_many(db: Session, quantities: Dict[int, int]) -> List[dict]:
+    """
+    Add stock to many sweets at once, keyed by sweet id.
+
+    Unsharded sweets are updated by one set-based statement: UPDATE ...
+    FROM (VALUES ...) RETURNING on Postgres, a single executemany plus one
+    read-back elsewhere. Sharded sweets go through their slots. Returns
+    {"sweet", "previous_quantity", "quantity"} per sweet in id order.
+    Raises UnknownSweetsError if any id doesn't exist. Does not commit.
+    """
+    sweets = Sweet.__table__
+    returned = [sweets.c[name] for name in _BATCH_COLUMNS]
+    ids = sorted(quantities)
+    connection = db.connection()
+
+    if connection.dialect.name == "postgresql":
+        batch = values(
+            column("sweet_id", Integer), column("amount", Integer), name="batch"
+        ).data([(sweet_id, quantities[sweet_id]) for sweet_id in ids])
+        rows = connection.execute(
+            update(sweets)
+            .where(sweets.c.id == batch.c.sweet_id, sweets.c.stock_slots == 0)
+            .values(quantity=sweets.c.quantity + batch.c.amount, version=sweets.c.version + 1)
+            .returning(*returned)
+        ).all()
+    else:
+        connection.execute(
+            update(sweets)
+            .where(sweets.c.id == bindparam("sweet_id"), sweets.c.stock_slots == 0)
+            .values(quantity=sweets.c.quantity + bindparam("amount"), version=sweets.c.version + 1),
+            [{"sweet_id": sweet_id, "amount": quantities[sweet_id]} for sweet_id in ids]
+        )
+        rows = connection.execute(
+            select(*returned).where(sweets.c.id.in_(ids), sweets.c.stock_slots == 0)
+        ).all()
+
+    changed = {row.id: dict(row._mapping) for row in rows}
+    remaining = [sweet_id for sweet_id in ids if sweet_id not in changed]
+    if remaining:
+        sharded = db.query(Sweet).filter(Sweet.id.in_(remaining)).order_by(Sweet.id).all()
+        missing = sorted(set(remaining) - {sweet.id for sweet in sharded})
+        if missing:
+            raise UnknownSweetsError(missing)
+        for sweet in sharded:
+            total = restock_sharded(db, sweet, quantities[sweet.id])
+            changed[sweet.id] = dict({name: getattr(sweet, name) for name in _BATCH_COLUMNS}, quantity=total)
+
+    return [
+        {
+            "sweet": changed[sweet_id],
+            "previous_quantity": changed[sweet_id]["quantity"] - quantities[sweet_id],
+            "quantity": changed[sweet_id]["quantity"],
+        }
+        for sweet_id in ids
+    ]
+
+def sharded_totals(db: Session, sweet_ids: Iterable[int]) -> Dict[int, int]:
+    """Exact slot totals for sharded sweets, from one grouped query"""
+    sweet_ids = list(sweet_ids)
+    if not sweet_ids:
+        return {}
+    totals = dict(
+        db.query(SweetStockShard.sweet_id, func.sum(SweetStockShard.quantity))
+        .filter(SweetStockShard.sweet_id.in_(sweet_ids))
+        .group_by(SweetStockShard.sweet_id)
+        .all()
+    )
+    return {sweet_id: int(totals.get(sweet_id, 0)) for sweet_id in sweet_ids}
+
+def slot_totals_subquery():
+    """Slot totals per sharded sweet, to outer join onto sweets in aggregate queries"""
+    return (
+        select(SweetStockShard.sweet_id, func.sum(SweetStockShard.quantity).label("quantity"))
+        .group_by(SweetStockShard.sweet_id)
+        .subquery()
+    )
+
+def apply_sharded_totals(db: Session, sweets: Iterable[Sweet]) -> None:
+    """
+    Overlay exact slot totals onto sharded sweets being returned to clients.
+    Uses one grouped query and doesn't mark the instances dirty.
+    """
+    sharded = {sweet.id: sweet for sweet in sweets if sweet.stock_slots}
+    for sweet_id, total in sharded_totals(db, sharded).items():
+        set_committed_value(sharded[sweet_id], "quantity", total)
+
+def reconcile_totals(db: Session) -> int:
+    """
+    Write slot totals back into sweets.quantity for every sharded sweet,
+    so SQL-side filters on quantity see an up-to-date snapshot.
+    Returns the number of sweets refreshed.
+    """
+    totals = (
+        db.query(func.coalesce(func.sum(SweetStockShard.quantity), 0))
+        .filter(SweetStockShard.sweet_id == Sweet.id)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(Sweet)
+        .where(Sweet.stock_slots > 0, Sweet.quantity != totals)
+        .values(quantity=totals)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
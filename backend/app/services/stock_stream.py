@@ -0,0 +1,304 @@
+"""
+Live stock stream for pushing inventory changes to clients.
+Turns committed sweet and stock events into versioned deltas and fans
+them out to Server-Sent Events subscribers, optionally bridged across
+worker processes through Postgres LISTEN/NOTIFY.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import uuid
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.services import events
+
+logger = logging.getLogger(__name__)
+
+# Deltas kept for resuming reconnecting clients
+RESUME_WINDOW = int(os.getenv("STOCK_STREAM_RESUME_WINDOW", 1000))
+# Deltas buffered per subscriber before it is treated as a slow consumer
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("STOCK_STREAM_QUEUE_SIZE", 256))
+# Seconds of silence before a keep-alive comment is sent
+KEEPALIVE_INTERVAL = 15.0
+
+NOTIFY_CHANNEL = "stock_deltas"
+VERSION_SEQUENCE = "stock_stream_version"
+
+# Tags this worker's NOTIFY payloads, so it can tell its own deltas from its peers'
+WORKER_ID = uuid.uuid4().hex
+
+_remote_handlers: List[Callable[[dict], None]] = []
+
+def subscribe_remote(handler: Callable[[dict], None]) -> None:
+    """
+    Register a handler called with every delta another worker published,
+    so in-memory state kept from local events follows their writes too.
+    After the listener lost its connection, and may have missed deltas,
+    handlers get a {"type": "reset"} delta instead.
+    """
+    _remote_handlers.append(handler)
+
+def deliver_remote(delta: dict) -> None:
+    """Hand a delta from another worker to the remote handlers"""
+    for handler in list(_remote_handlers):
+        try:
+            handler(delta)
+        except Exception:
+            logger.exception("Remote delta handler %r failed for %s", handler, delta["type"])
+
+class Subscription:
+    """
+    One connected client's bounded delta queue.
+
+    When the queue is full the subscriber is marked as lagging instead of
+    blocking the publisher; its stream then sends a reset telling the
+    client to refetch and continue from the current version.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagging = False
+
+    def offer(self, delta: dict) -> None:
+        """Queue a delta without ever blocking; runs on the subscriber's loop"""
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            self.lagging = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+class StockBroker:
+    """In-process fan-out of versioned stock deltas"""
+
+    def __init__(self, resume_window: int = RESUME_WINDOW):
+        self._lock = threading.Lock()
+        self._history: Deque[dict] = deque(maxlen=resume_window)
+        self._subscribers: Set[Subscription] = set()
+        self.version = 0
+
+    def next_version(self) -> int:
+        """Allocate a local version number"""
+        with self._lock:
+            self.version += 1
+            return self.version
+
+    def deliver(self, delta: dict) -> None:
+        """Record a versioned delta and hand it to every subscriber"""
+        with self._lock:
+            self.version = max(self.version, delta["version"])
+            self._history.append(delta)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, delta)
+            except RuntimeError:
+                # The subscriber's loop is gone; it will never read again
+                self.unsubscribe(subscription)
+
+    def subscribe(self, since: Optional[int] = None) -> Subscription:
+        """
+        Register a subscriber on the running loop.
+        With `since`, deltas newer than that version are replayed first; if
+        they have already left the resume window the stream starts with a reset.
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            if since is not None and since < self.version:
+                oldest = self._history[0]["version"] if self._history else self.version + 1
+                if oldest > since + 1:
+                    subscription.lagging = True
+                else:
+                    for delta in self._history:
+                        if delta["version"] > since:
+                            subscription.offer(delta)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Forget a subscriber"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers"""
+        return len(self._subscribers)
+
+class LocalBridge:
+    """Single-process stand-in for the cross-worker bridge"""
+
+    def __init__(self, broker: StockBroker):
+        self.broker = broker
+
+    def publish(self, delta: dict) -> None:
+        """Version and deliver a delta in this process only"""
+        self.broker.deliver(dict(delta, version=self.broker.next_version()))
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+class PostgresBridge:
+    """
+    Bridges workers through Postgres LISTEN/NOTIFY.
+
+    Versions come from a shared sequence so a client can resume on any
+    worker. Publishing only enqueues; a sender thread issues the NOTIFY and
+    a listener thread feeds every worker's broker, including the sender's.
+    """
+
+    def __init__(self, broker: StockBroker, engine: Engine):
+        self.broker = broker
+        self.engine = engine
+        self._outbox: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def publish(self, delta: dict) -> None:
+        """Queue a delta for NOTIFY without touching the database in the caller"""
+        self._outbox.put(delta)
+
+    def start(self) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {VERSION_SEQUENCE}"))
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._send_loop, name="stock-stream-notify", daemon=True),
+            threading.Thread(target=self._listen_loop, name="stock-stream-listen", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._outbox.put(None)
+
+    def _send_loop(self) -> None:
+        while not self._stopping.is_set():
+            delta = self._outbox.get()
+            if delta is None:
+                continue
+            try:
+                with self.engine.begin() as connection:
+                    version = connection.execute(text(f"SELECT nextval('{VERSION_SEQUENCE}')")).scalar()
+                    connection.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": NOTIFY_CHANNEL, "payload": json.dumps(dict(delta, version=version, origin=WORKER_ID))},
+                    )
+            except Exception:
+                logger.exception("Failed to publish stock delta")
+
+    def receive(self, payload: str) -> None:
+        """Deliver one NOTIFY payload locally; peers' deltas also go to the remote handlers"""
+        delta = json.loads(payload)
+        origin = delta.pop("origin", None)
+        self.broker.deliver(delta)
+        if origin != WORKER_ID:
+            deliver_remote(delta)
+
+    def _listen_loop(self) -> None:
+        listened = False
+        while not self._stopping.is_set():
+            try:
+                raw = self.engine.raw_connection()
+                try:
+                    raw.driver_connection.autocommit = True
+                    cursor = raw.cursor()
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    if listened:
+                        # Deltas sent while reconnecting are lost
+                        deliver_remote({"type": "reset"})
+                    listened = True
+                    connection = raw.driver_connection
+                    while not self._stopping.is_set():
+                        if select.select([connection], [], [], 1.0) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            self.receive(connection.notifies.pop(0).payload)
+                finally:
+                    raw.invalidate()
+            except Exception:
+                logger.exception("Stock stream listener failed, reconnecting")
+                self._stopping.wait(1.0)
+
+stock_broker = StockBroker()
+bridge = LocalBridge(stock_broker)
+
+def configure_bridge(engine: Engine) -> None:
+    """
+    Pick the bridge for this deployment: LISTEN/NOTIFY on Postgres unless
+    STOCK_STREAM_BRIDGE=local, the in-process stand-in everywhere else.
+    """
+    global bridge
+    mode = os.getenv("STOCK_STREAM_BRIDGE", "auto")
+    if mode != "local" and engine.dialect.name == "postgresql":
+        bridge = PostgresBridge(stock_broker, engine)
+    else:
+        bridge = LocalBridge(stock_broker)
+
+def _on_stock_changed(sweet_id: int, previous_quantity: int, quantity: int, reason: str, **payload) -> None:
+    bridge.publish({
+        "type": "stock",
+        "sweet_id": sweet_id,
+        "quantity": quantity,
+        "previous_quantity": previous_quantity,
+        "reason": reason,
+    })
+
+def _on_sweet_written(sweet: dict, **payload) -> None:
+    bridge.publish({"type": "sweet", "sweet_id": sweet["id"], "sweet": sweet})
+
+def _on_sweet_deleted(sweet: dict, **payload) -> None:
+    bridge.publish({"type": "deleted", "sweet_id": sweet["id"]})
+
+events.subscribe(events.STOCK_CHANGED, _on_stock_changed)
+events.subscribe(events.SWEET_CREATED, _on_sweet_written)
+events.subscribe(events.SWEET_UPDATED, _on_sweet_written)
+events.subscribe(events.SWEET_DELETED, _on_sweet_deleted)
+
+def format_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Encode one Server-Sent Event"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+async def stream_events(
+    subscription: Subscription,
+    broker: StockBroker = stock_broker,
+    keepalive: float = KEEPALIVE_INTERVAL,
+) -> AsyncIterator[str]:
+    """
+    Yield SSE frames for a subscription until the client goes away.
+    A lagging subscriber gets a single reset frame carrying the current
+    version, after which it is live again.
+    """
+    try:
+        while True:
+            if subscription.lagging:
+                subscription.lagging = False
+                yield format_event("reset", {"version": broker.version}, broker.version)
+                continue
+            try:
+                delta = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if subscription.lagging:
+                continue
+            yield format_event(delta["type"], delta, delta["version"])
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,133 @@
+"""
+Test cases for sales analytics API endpoints.
+Tests the purchase ledger and rollup based reports.
+"""
+from conftest import engine, TestingSessionLocal
+
+def create_and_buy(client, admin_headers, auth_headers, sweet, purchases):
+    """Create a sweet and purchase it once per entry in purchases"""
+    sweet_id = client.post("/api/sweets", json=sweet, headers=admin_headers).json()["id"]
+    for quantity in purchases:
+        client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": quantity}, headers=auth_headers)
+    return sweet_id
+
+def test_purchase_writes_ledger_entry(client, auth_headers, admin_headers):
+    """Test that every purchase is recorded in the ledger"""
+    from app.models.purchase import Purchase
+
+    sweet_id = create_and_buy(
+        client, admin_headers, auth_headers,
+        {"name": "Toffee", "category": "Chewy", "price": 1.25, "quantity": 10},
+        [2, 3]
+    )
+
+    db = TestingSessionLocal()
+    purchases = db.query(Purchase).filter(Purchase.sweet_id == sweet_id).order_by(Purchase.id).all()
+    db.close()
+    assert [p.quantity for p in purchases] == [2, 3]
+    assert purchases[1].total_cost == 3.75
+    assert purchases[0].sweet_name == "Toffee"
+
+def test_top_sellers_and_category_revenue(client, auth_headers, admin_headers):
+    """Test reports served from the daily rollups"""
+    create_and_buy(
+        client, admin_headers, auth_headers,
+        {"name": "Milk Chocolate", "category": "Chocolate", "price": 2.00, "quantity": 50},
+        [1, 1]
+    )
+    create_and_buy(
+        client, admin_headers, auth_headers,
+        {"name": "Dark Chocolate", "category": "Chocolate", "price": 5.00, "quantity": 50},
+        [1]
+    )
+    create_and_buy(
+        client, admin_headers, auth_headers,
+        {"name": "Gummy Bears", "category": "Gummy", "price": 1.00, "quantity": 50},
+        [5]
+    )
+
+    response = client.get("/api/analytics/top-sellers?limit=2", headers=admin_headers)
+    assert response.status_code == 200
+    assert [row["name"] for row in response.json()] == ["Gummy Bears", "Milk Chocolate"]
+
+    response = client.get("/api/analytics/top-sellers?by=revenue&limit=1", headers=admin_headers)
+    assert response.json()[0]["name"] == "Dark Chocolate"
+
+    response = client.get("/api/analytics/revenue-by-category", headers=admin_headers)
+    assert response.json() == [
+        {"category": "Chocolate", "units": 3, "revenue": 9.0},
+        {"category": "Gummy", "units": 5, "revenue": 5.0},
+    ]
+
+    response = client.get("/api/analytics/daily-revenue?category=Gummy", headers=admin_headers)
+    assert len(response.json()) == 1
+    assert response.json()[0]["revenue"] == 5.0
+
+def test_reports_respect_date_range(client, auth_headers, admin_headers):
+    """Test that rollups outside the requested range are excluded"""
+    create_and_buy(
+        client, admin_headers, auth_headers,
+        {"name": "Lollipop", "category": "Hard", "price": 1.00, "quantity": 5},
+        [1]
+    )
+
+    response = client.get(
+        "/api/analytics/revenue-by-category?start=2000-01-01&end=2000-01-31",
+        headers=admin_headers
+    )
+    assert response.json() == []
+
+    response = client.get(
+        "/api/analytics/top-sellers?start=2000-02-01&end=2000-01-01",
+        headers=admin_headers
+    )
+    assert response.status_code == 400
+
+def test_analytics_requires_admin(client, auth_headers):
+    """Test that regular users cannot read sales reports"""
+    response = client.get("/api/analytics/top-sellers", headers=auth_headers)
+    assert response.status_code == 403
+
+def test_purchase_history_pages_newest_first(client, auth_headers, admin_headers):
+    """Test keyset pagination of the current user's purchase history"""
+    create_and_buy(
+        client, admin_headers, auth_headers,
+        {"name": "Caramel", "category": "Chewy", "price": 1.00, "quantity": 50},
+        [1, 2, 3, 4, 5]
+    )
+
+    first = client.get("/api/auth/me/purchases?limit=2", headers=auth_headers).json()
+    assert [item["quantity"] for item in first["items"]] == [5, 4]
+    assert first["next_cursor"]
+
+    second = client.get(
+        f"/api/auth/me/purchases?limit=2&cursor={first['next_cursor']}",
+        headers=auth_headers
+    ).json()
+    assert [item["quantity"] for item in second["items"]] == [3, 2]
+
+    last = client.get(
+        f"/api/auth/me/purchases?limit=2&cursor={second['next_cursor']}",
+        headers=auth_headers
+    ).json()
+    assert [item["quantity"] for item in last["items"]] == [1]
+    assert last["next_cursor"] is None
+
+    # Other users only see their own purchases
+    assert client.get("/api/auth/me/purchases", headers=admin_headers).json()["items"] == []
+
+    response = client.get("/api/auth/me/purchases?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+def test_partition_layout():
+    """Test monthly partition naming, bounds and that other databases are skipped"""
+    from datetime import date
+    from app.services import partitions
+
+    assert partitions.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert partitions.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partitions.partition_name(date(2026, 3, 1)) == "purchases_p2026_03"
+    assert "FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')" in partitions.partition_ddl(date(2026, 12, 1))
+
+    if engine.dialect.name != "postgresql":
+        assert partitions.maintain_partitions(engine) == []
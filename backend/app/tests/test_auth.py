@@ -37,4 +37,43 @@ def test_invalid_token_verification():
     """Test that invalid tokens are rejected"""
     invalid_token = "invalid.jwt.token"
     payload = verify_token(invalid_token)
-    assert payload is None
\ No newline at end of file
+    assert payload is None
+
+def test_revoked_token_is_rejected():
+    """Test that revoking a token's jti makes verification fail"""
+    from app.services.revocation import revocation_list
+
+    token = create_access_token(data={"sub": "testuser", "user_id": 1})
+    payload = verify_token(token)
+    assert payload["jti"]
+
+    revocation_list.add(payload["jti"], payload["exp"])
+    assert verify_token(token) is None
+    assert verify_token(create_access_token(data={"sub": "testuser", "user_id": 1})) is not None
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added item is reported as possibly present"""
+    from app.services.revocation import BloomFilter
+
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [f"jti-{index}" for index in range(1000)]
+    for item in added:
+        bloom.add(item)
+
+    assert all(bloom.might_contain(item) for item in added)
+    false_positives = sum(bloom.might_contain(f"other-{index}") for index in range(10000))
+    assert false_positives < 300
+
+def test_revocations_are_pruned_at_expiry():
+    """Test that buckets are dropped once their tokens have expired"""
+    from app.services.revocation import RevocationList
+
+    revocations = RevocationList(bucket_seconds=60)
+    revocations.add("old", expires_at=1000)
+    revocations.add("new", expires_at=5000)
+    assert revocations.is_revoked("old", 1000)
+
+    assert revocations.prune(now=2000) == 1
+    assert not revocations.is_revoked("old", 1000)
+    assert revocations.is_revoked("new", 5000)
+    assert len(revocations) == 1
@@ -0,0 +1,134 @@
+"""
+Test cases for the in-memory autocomplete index.
+Tests prefix matching, ranking and incremental updates.
+"""
+import pytest, json
+from datetime import timedelta
+from conftest import engine, TestingSessionLocal
+from app.database.connection import Base
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.purchase import utc_now
+from app.models.sweet import Sweet
+from app.services import autocomplete
+from app.services.autocomplete import POPULARITY_DAYS, AutocompleteIndex, index_keys
+from app.services.stock_stream import PostgresBridge, StockBroker
+
+@pytest.fixture
+def index():
+    """Index holding a small catalog"""
+    index = AutocompleteIndex()
+    index.upsert(1, "Milk Chocolate", "Chocolate", 10)
+    index.upsert(2, "Dark Chocolate", "Chocolate", 30)
+    index.upsert(3, "Chocolate Fudge", "Fudge", 20)
+    index.upsert(4, "Mint Humbug", "Hard Candy", 5)
+    return index
+
+def names(suggestions):
+    return [suggestion["name"] for suggestion in suggestions]
+
+def test_index_keys_start_at_words():
+    """Test that a name is keyed from each of its first words"""
+    assert index_keys("Milk  Chocolate Bar") == ("milk chocolate bar", "chocolate bar", "bar")
+    assert len(index_keys("a b c d e f")) == 4
+
+def test_prefix_matches_any_word_start(index):
+    """Test that a prefix matches the name or one of its words"""
+    assert set(names(index.suggest("choc"))) == {"Milk Chocolate", "Dark Chocolate", "Chocolate Fudge"}
+    assert names(index.suggest("MI")) == ["Milk Chocolate", "Mint Humbug"]
+    assert names(index.suggest("milk c")) == ["Milk Chocolate"]
+    assert index.suggest("hoc") == []
+    assert index.suggest(" ") == []
+
+def test_ranked_by_stock_or_popularity(index):
+    """Test top-k ordering by stock and by units sold"""
+    assert names(index.suggest("choc", by="stock")) == ["Dark Chocolate", "Chocolate Fudge", "Milk Chocolate"]
+    index.add_sales(1, 7)
+    index.add_sales(3, 2)
+    suggestions = index.suggest("choc", limit=2, by="popularity")
+    assert names(suggestions) == ["Milk Chocolate", "Chocolate Fudge"]
+    assert suggestions[0]["popularity"] == 7
+
+def test_old_sales_age_out(index, monkeypatch):
+    """Test that units sold stop counting once their day leaves the popularity window"""
+    today = utc_now()
+    index.add_sales(1, 7, day=(today - timedelta(days=POPULARITY_DAYS)).date())
+    index.add_sales(3, 2)
+    assert names(index.suggest("choc", limit=1)) == ["Milk Chocolate"]
+    
+    # A day later the first sale is out of the window
+    monkeypatch.setattr(autocomplete, "utc_now", lambda: today + timedelta(days=1))
+    suggestions = index.suggest("choc", limit=2)
+    assert names(suggestions) == ["Chocolate Fudge", "Milk Chocolate"]
+    assert [suggestion["popularity"] for suggestion in suggestions] == [2, 0]
+    
+    # Sales dated before the window are ignored outright
+    index.add_sales(2, 50, day=(today - timedelta(days=POPULARITY_DAYS)).date())
+    assert names(index.suggest("dark")) == ["Dark Chocolate"]
+    assert index.suggest("dark")[0]["popularity"] == 0
+
+def test_follows_writes_of_other_workers(index, monkeypatch):
+    """Test that deltas another worker sends through the bridge update the index"""
+    monkeypatch.setattr(autocomplete, "autocomplete_index", index)
+    bridge = PostgresBridge(StockBroker(), engine=None)
+    def receive(delta):
+        bridge.receive(json.dumps(dict(delta, origin="peer")))
+    
+    receive({"type": "stock", "sweet_id": 4, "quantity": 2, "previous_quantity": 5, "reason": "purchase", "version": 1})
+    suggestion = index.suggest("mint")[0]
+    assert (suggestion["quantity"], suggestion["popularity"]) == (2, 3)
+    
+    sweet = {"id": 5, "name": "Mint Imperial", "category": "Hard Candy", "quantity": 40}
+    receive({"type": "sweet", "sweet_id": 5, "sweet": sweet, "version": 2})
+    assert names(index.suggest("mint", by="stock")) == ["Mint Imperial", "Mint Humbug"]
+    
+    receive({"type": "deleted", "sweet_id": 5, "version": 3})
+    assert names(index.suggest("mint")) == ["Mint Humbug"]
+
+def test_wide_prefix_walks_ranking():
+    """Test that a prefix matching most of the catalog ranks the same way"""
+    index = AutocompleteIndex()
+    for sweet_id in range(1, 201):
+        index.upsert(sweet_id, f"Toffee {sweet_id}", "Toffee", sweet_id % 50)
+    index.upsert(500, "Fudge", "Fudge", 1000)
+    suggestions = index.suggest("t", limit=3, by="stock")
+    assert [suggestion["quantity"] for suggestion in suggestions] == [49, 49, 49]
+    assert [suggestion["id"] for suggestion in suggestions] == [49, 99, 149]
+
+def test_updates_and_removals(index):
+    """Test that renames, stock changes and deletions apply immediately"""
+    index.upsert(4, "Mint Crisp", "Chocolate", 5)
+    assert names(index.suggest("hum")) == []
+    assert names(index.suggest("cri")) == ["Mint Crisp"]
+
+    index.set_stock(1, 100)
+    assert names(index.suggest("choc", limit=1, by="stock")) == ["Milk Chocolate"]
+
+    index.remove(1)
+    assert "Milk Chocolate" not in names(index.suggest("choc"))
+    assert index.stats()["sweets"] == 3
+    assert index.stats()["memory_bytes"] > 0
+
+def test_rebuild_from_database():
+    """Test loading names, stock and recent sales from the database"""
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        lemon = Sweet(name="Lemon Drops", category="Hard Candy", price=1.49, quantity=5)
+        lime = Sweet(name="Lime Drops", category="Hard Candy", price=1.49, quantity=8)
+        db.add_all([lemon, lime])
+        db.flush()
+        db.add(SalesDailyRollup(
+            day=utc_now().date(), sweet_id=lemon.id, bucket=0,
+            sweet_name=lemon.name, category=lemon.category, units=4, revenue=5.96
+        ))
+        db.commit()
+        index = AutocompleteIndex()
+        index.upsert(999, "Stale Entry", "Gone", 1)
+        assert index.rebuild(db) == 2
+        assert index.suggest("stale") == []
+        suggestions = index.suggest("l")
+        assert names(suggestions) == ["Lemon Drops", "Lime Drops"]
+        assert suggestions[0]["popularity"] == 4
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,156 @@
+"""
+Test cases for the batch request endpoint.
+Tests per-item results, ordering of writes and shared auth and sessions.
+"""
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from conftest import TestingSessionLocal
+from app.main import app
+from app.database import connection
+from app.database.connection import get_db
+from app.services import catalog_service
+from app.services.auth_service import AuthService
+
+@pytest.fixture
+def sweet_id(client):
+    """Create a sweet directly in the database and return its id"""
+    from app.models.sweet import Sweet
+    db = TestingSessionLocal()
+    sweet = Sweet(name="Toffee Apple", category="Toffee", price=2.00, quantity=10)
+    db.add(sweet)
+    db.commit()
+    sweet_id = sweet.id
+    db.close()
+    return sweet_id
+
+def test_batch_runs_reads_and_writes_in_order(client, auth_headers, sweet_id):
+    """Test per-item statuses and that reads see earlier writes"""
+    response = client.post("/api/batch", json={"requests": [
+        {"id": "me", "path": "/api/auth/me"},
+        {"id": "before", "path": f"/api/sweets/{sweet_id}"},
+        {"id": "buy", "method": "POST", "path": f"/api/sweets/{sweet_id}/purchase", "body": {"quantity": 3}},
+        {"id": "after", "path": f"/api/sweets/{sweet_id}"},
+        {"id": "search", "path": "/api/sweets/search?name=toffee"},
+        {"id": "missing", "path": "/api/sweets/9999"},
+    ]}, headers=auth_headers)
+    assert response.status_code == 200
+    results = {result["id"]: result for result in response.json()["results"]}
+    assert [result["id"] for result in response.json()["results"]] == [
+        "me", "before", "buy", "after", "search", "missing"
+    ]
+    assert results["me"]["body"]["username"] == "testuser"
+    assert results["before"]["body"]["quantity"] == 10
+    assert results["buy"]["status"] == 200
+    assert results["after"]["body"]["quantity"] == 7
+    assert results["search"]["body"][0]["quantity"] == 7
+    assert results["missing"]["status"] == 404
+    assert results["missing"]["body"] == {"detail": "Sweet not found"}
+
+def test_batch_item_errors_stay_per_item(client, auth_headers, sweet_id):
+    """Test that invalid or failing sub-requests don't affect the others"""
+    response = client.post("/api/batch", json={"requests": [
+        {"method": "POST", "path": f"/api/sweets/{sweet_id}/purchase", "body": {"quantity": 50}},
+        {"method": "POST", "path": f"/api/sweets/{sweet_id}/purchase", "body": {"quantity": "lots"}},
+        {"path": "/api/sweets/stream"},
+        {"path": "/api/analytics/top-sellers"},
+        {"method": "POST", "path": f"/api/sweets/{sweet_id}/purchase", "body": {"quantity": 1}},
+    ]}, headers=auth_headers)
+    statuses = [result["status"] for result in response.json()["results"]]
+    assert statuses == [400, 422, 400, 400, 200]
+    assert response.json()["results"][4]["body"]["remaining_quantity"] == 9
+
+def test_batch_authenticates_once_on_one_session(client, auth_headers, sweet_id, monkeypatch):
+    """Test that sub-requests reuse the batch's user and database session"""
+    verifications = []
+    sessions = []
+    original_verify = AuthService.verify_token
+    original_factory = connection.SessionLocal
+    monkeypatch.setattr(AuthService, "verify_token", staticmethod(
+        lambda token: verifications.append(token) or original_verify(token)
+    ))
+    monkeypatch.setattr(connection, "SessionLocal", lambda: sessions.append(1) or original_factory())
+    # Use the real session dependency for this batch
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    
+    response = client.post("/api/batch", json={"requests": [
+        {"path": "/api/auth/me"},
+        {"path": f"/api/sweets/{sweet_id}"},
+        {"path": "/api/sweets/facets"},
+        {"method": "POST", "path": f"/api/sweets/{sweet_id}/purchase", "body": {"quantity": 1}},
+        {"path": f"/api/sweets/{sweet_id}"},
+    ]}, headers=auth_headers)
+    assert [result["status"] for result in response.json()["results"]] == [200] * 5
+    assert len(verifications) == 1
+    assert len(sessions) == 1
+
+def test_batch_catalog_reads_use_the_shared_session(client, auth_headers, sweet_id, monkeypatch):
+    """Test that list, search and facets sub-requests don't open sessions of their own"""
+    checkouts = []
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    listener = lambda *args: checkouts.append(1)
+    event.listen(connection.engine, "checkout", listener)
+    try:
+        response = client.post("/api/batch", json={"requests": [
+            {"path": "/api/sweets/"},
+            {"path": "/api/sweets/search?category=toffee"},
+            {"path": "/api/sweets/facets"},
+        ]}, headers=auth_headers)
+    finally:
+        event.remove(connection.engine, "checkout", listener)
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [200] * 3
+    assert results[1]["body"][0]["id"] == sweet_id
+    assert results[2]["body"]["total"] == 1
+    assert len(checkouts) == 1
+
+def test_batch_sub_requests_take_turns_on_the_shared_session(client, auth_headers, sweet_id, monkeypatch):
+    """Test that no sub-request queries the shared session while a catalog read runs on it in a thread"""
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    reading, overlaps = set(), []
+    query_sweets = catalog_service._query_sweets
+
+    def slow_query_sweets(db, **params):
+        if reading:
+            overlaps.append("catalog read")
+        reading.add(threading.get_ident())
+        try:
+            time.sleep(0.05)
+            return query_sweets(db, **params)
+        finally:
+            reading.discard(threading.get_ident())
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if reading and threading.get_ident() not in reading:
+            overlaps.append(statement)
+
+    monkeypatch.setattr(catalog_service, "_query_sweets", slow_query_sweets)
+    event.listen(connection.engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/api/batch", json={"requests": [
+            {"path": "/api/sweets/search?name=toffee"},
+            {"path": f"/api/sweets/{sweet_id}"},
+            {"path": "/api/auth/me"},
+            {"path": "/api/sweets/fuzzy?q=tofee"},
+            {"path": "/api/sweets/search?category=toffee"},
+            {"path": f"/api/sweets/{sweet_id}"},
+        ]}, headers=auth_headers)
+    finally:
+        event.remove(connection.engine, "before_cursor_execute", record)
+    assert [result["status"] for result in response.json()["results"]] == [200] * 6
+    assert overlaps == []
+
+def test_batch_limits(client, auth_headers):
+    """Test authentication and size limits of the batch itself"""
+    assert client.post("/api/batch", json={"requests": [{"path": "/api/auth/me"}]}).status_code == 401
+    
+    response = client.post(
+        "/api/batch", json={"requests": [{"path": "/api/auth/me"}] * 21}, headers=auth_headers
+    )
+    assert response.status_code == 400
+    
+    response = client.post(
+        "/api/batch", json={"requests": [{"method": "PATCH", "path": "/api/auth/me"}]}, headers=auth_headers
+    )
+    assert response.status_code == 422
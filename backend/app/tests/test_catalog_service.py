@@ -0,0 +1,227 @@
+"""
+Test cases for the catalog read service.
+Tests read coalescing and the query plans of sorted catalog searches.
+"""
+import asyncio
+import pytest
+from sqlalchemy import event, insert, text
+from conftest import engine, TestingSessionLocal
+from app.database.connection import Base
+from app.models.sweet import Sweet
+from app.services import catalog_service, stock_stream
+from app.services.single_flight import SingleFlight
+
+@pytest.fixture
+def db_session():
+    """Create test database session with a few sweets"""
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        Sweet(name="Milk Chocolate", category="Chocolate", price=2.99, quantity=10),
+        Sweet(name="Dark Chocolate", category="Chocolate", price=3.99, quantity=5),
+        Sweet(name="Gummy Bears", category="Gummy", price=1.99, quantity=20),
+    ])
+    db.commit()
+
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def sweet_queries():
+    """Count SELECT statements against the sweets table"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM sweets" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_searches_run_one_query(db_session, sweet_queries):
+    """Test that a burst of identical searches shares a single DB query"""
+    results = await asyncio.gather(*[
+        catalog_service.search_sweets(db_session, name=" Chocolate ", category="chocolate")
+        for _ in range(50)
+    ])
+
+    assert len(sweet_queries) == 1
+    assert all(len(result) == 2 for result in results)
+    assert catalog_service.catalog_flights.in_flight() == 0
+
+    # Once the flight has landed, the next call queries again
+    await catalog_service.search_sweets(db_session, name="chocolate", category="Chocolate")
+    assert len(sweet_queries) == 2
+
+@pytest.mark.asyncio
+async def test_different_filters_are_not_coalesced(db_session, sweet_queries):
+    """Test that distinct normalized filters each get their own query"""
+    all_sweets, gummies = await asyncio.gather(
+        catalog_service.search_sweets(db_session),
+        catalog_service.search_sweets(db_session, category="gummy"),
+    )
+
+    assert len(sweet_queries) == 2
+    assert len(all_sweets) == 3
+    assert [sweet["name"] for sweet in gummies] == ["Gummy Bears"]
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_all_waiters():
+    """Test that a failing flight raises in every waiter and is not cached"""
+    flights = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *[flights.do("key", failing) for _ in range(5)],
+        return_exceptions=True
+    )
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    with pytest.raises(RuntimeError):
+        await flights.do("key", failing)
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_waiter():
+    """Test that cancelling one waiter doesn't cancel the shared call"""
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("key", slow))
+    second = asyncio.ensure_future(flights.do("key", slow))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    assert first.cancelled()
+
+def test_facet_cache_follows_writes_of_other_workers():
+    """Test that deltas from another worker clear cached facets, stock only when it crosses zero"""
+    cache = catalog_service.facet_cache
+
+    def cached_after(delta):
+        cache.put(("facets",), {"total": 1}, cache.generation)
+        catalog_service._invalidate_on_remote_delta(delta)
+        return cache.get(("facets",)) is not None
+
+    stock = {"type": "stock", "sweet_id": 7, "reason": "purchase", "version": 4}
+    assert cached_after(dict(stock, previous_quantity=5, quantity=3))
+    assert not cached_after(dict(stock, previous_quantity=3, quantity=0))
+    assert not cached_after({"type": "sweet", "sweet_id": 7, "sweet": {"id": 7}, "version": 5})
+    assert not cached_after({"type": "deleted", "sweet_id": 7, "version": 6})
+    assert not cached_after({"type": "reset"})
+    assert catalog_service._invalidate_on_remote_delta in stock_stream._remote_handlers
+
+@pytest.fixture
+def large_catalog():
+    """Create a session over a catalog large enough for the planner to prefer indexes"""
+    Base.metadata.create_all(bind=engine)
+    categories = ["Chocolate", "Gummy", "Sour", "Hard Candy", "Lollipop", "Jelly", "Chewy", "Toffee"]
+    rows = [
+        {
+            "name": f"Sweet {i:05d}",
+            "category": categories[i % len(categories)],
+            "price": round(0.5 + (i * 7919 % 1000) / 100, 2),
+            "quantity": i % 250,
+        }
+        for i in range(20000)
+    ]
+    db = TestingSessionLocal()
+    db.execute(insert(Sweet), rows)
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+def query_plan(db, query) -> str:
+    """Return the database's plan for an ORM query as text"""
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        return "\n".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    return "\n".join(row[0] for row in db.execute(text(f"EXPLAIN {sql}")))
+
+def assert_no_sort(plan: str):
+    """Assert rows come out of an index already ordered"""
+    assert "TEMP B-TREE" not in plan
+    assert "Sort" not in plan
+
+def test_category_price_range_sorted_by_price_uses_index(large_catalog):
+    """Test a filtered page sorted by price is an ordered index range scan"""
+    query = catalog_service.build_search_query(
+        large_catalog, category="gummy", min_price=2.0, max_price=6.0,
+        sort="price", order="desc", limit=20, offset=40
+    )
+    plan = query_plan(large_catalog, query)
+
+    assert "ix_sweets_lower_category_price_id" in plan
+    assert_no_sort(plan)
+
+    prices = [sweet.price for sweet in query.all()]
+    assert len(prices) == 20
+    assert prices == sorted(prices, reverse=True)
+    assert all(2.0 <= price <= 6.0 for price in prices)
+
+def test_category_sorted_by_name_uses_index(large_catalog):
+    """Test a category page sorted by name reads the category/name index"""
+    query = catalog_service.build_search_query(large_catalog, category="Toffee", sort="name", limit=50)
+    plan = query_plan(large_catalog, query)
+
+    assert "ix_sweets_lower_category_name_id" in plan
+    assert_no_sort(plan)
+
+def test_price_range_sorted_by_price_uses_index(large_catalog):
+    """Test an unscoped price band sorted by price reads the price index"""
+    query = catalog_service.build_search_query(
+        large_catalog, min_price=9.0, max_price=9.5, sort="price", limit=25
+    )
+    plan = query_plan(large_catalog, query)
+
+    assert "ix_sweets_price_id" in plan
+    assert_no_sort(plan)
+
+def test_low_stock_query_uses_partial_index(large_catalog):
+    """Test the low-stock listing reads only the partial index"""
+    query = large_catalog.query(Sweet).filter(
+        Sweet.quantity <= Sweet.reorder_threshold
+    ).order_by(Sweet.quantity, Sweet.id).limit(100)
+    plan = query_plan(large_catalog, query)
+
+    assert "ix_sweets_low_stock" in plan
+    assert_no_sort(plan)
+
+def test_sparse_fields_read_only_the_index(large_catalog):
+    """Test a sparse id/price page is answered from the index without touching rows"""
+    query = catalog_service.build_search_query(
+        large_catalog, min_price=2.0, max_price=6.0, sort="price", limit=20, fields=("id", "price")
+    )
+    plan = query_plan(large_catalog, query)
+
+    assert "ix_sweets_price_id" in plan
+    assert "COVERING INDEX" in plan or "Index Only Scan" in plan
+    assert_no_sort(plan)
+
+    rows = catalog_service.project_rows(large_catalog, query.all(), ("id", "price"))
+    assert len(rows) == 20
+    assert set(rows[0]) == {"id", "price"}
@@ -0,0 +1,174 @@
+"""
+Test cases for the columnar catalog read model.
+Tests that vectorized searches and facets match the SQL path and follow writes.
+"""
+import json
+import random
+import pytest
+from sqlalchemy import event, insert
+from conftest import engine, TestingSessionLocal
+from app.models.sweet import Sweet
+from app.services import catalog_service, stock_service
+from app.services.stock_stream import PostgresBridge, StockBroker
+
+pytest.importorskip("numpy")
+from app.services import columnar_catalog as columnar
+
+CATEGORIES = ["Chocolate", "Gummy", "Sour", "Hard Candy", "chocolate"]
+
+@pytest.fixture
+def catalog(client, monkeypatch):
+    """Fill the catalog with ties on price and name, and build a fresh columnar model over it"""
+    generator = random.Random(7)
+    rows = [
+        {
+            "name": f"{generator.choice(['Milk', 'Dark', 'Sour', 'Fizzy'])} Treat {i % 40:02d}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "price": generator.choice([0.5, 1.25, 2.0, 2.75, 3.5]),
+            "quantity": generator.randrange(0, 30),
+        }
+        for i in range(600)
+    ]
+    db = TestingSessionLocal()
+    db.execute(insert(Sweet), rows)
+    db.commit()
+
+    model = columnar.ColumnarCatalog()
+    monkeypatch.setattr(columnar, "columnar_catalog", model)
+    monkeypatch.setattr(catalog_service, "columnar_catalog", model)
+    model.rebuild(db)
+    db.close()
+    return model
+
+def sql_search(**params):
+    """The SQL path's answer for the same normalized search"""
+    params = dict(catalog_service._normalize_filters(
+        params.pop("name", None), params.pop("category", None),
+        params.pop("min_price", None), params.pop("max_price", None),
+    ), **params)
+    return catalog_service._load_sweets(engine, **params)
+
+def test_searches_match_sql(catalog):
+    """Test random filtered, sorted pages against the SQL path"""
+    generator = random.Random(11)
+    for _ in range(200):
+        params = {
+            "name": generator.choice([None, "treat 1", "dark", "FIZZY TREAT 3", "nothing"]),
+            "category": generator.choice([None, "chocolate", "Gummy", "none"]),
+            "min_price": generator.choice([None, 1.25, 2.0]),
+            "max_price": generator.choice([None, 2.75, 3.5]),
+            "sort": generator.choice(["id", "name", "price", "quantity"]),
+            "order": generator.choice(["asc", "desc"]),
+            "limit": generator.choice([None, 1, 10, 50]),
+            "offset": generator.choice([0, 3, 40]),
+            "fields": generator.choice([None, ("id", "price"), ("name", "quantity", "id")]),
+        }
+        expected = sql_search(**params)
+        normalized = catalog_service._normalize_filters(
+            params.pop("name"), params.pop("category"), params.pop("min_price"), params.pop("max_price")
+        )
+        assert catalog.search(**params, **normalized) == expected, params
+
+def test_facets_match_sql(catalog):
+    """Test vectorized facets against the grouped SQL aggregate"""
+    for filters in ({}, {"category": "chocolate"}, {"min_price": 2.0, "name": "milk"}):
+        normalized = catalog_service._normalize_filters(**filters)
+        assert catalog.facets(**normalized) == catalog_service._load_facets(engine, **normalized)
+
+@pytest.mark.asyncio
+async def test_search_sweets_served_from_memory(catalog):
+    """Test that catalog searches on the model's engine don't query the database"""
+    db = TestingSessionLocal()
+    queries = []
+
+    def record(*args):
+        queries.append(args)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        page = await catalog_service.search_sweets(db, category="sour", sort="price", limit=5)
+        facets = await catalog_service.get_facets(db, category="sour")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+        db.close()
+    assert queries == []
+    assert len(page) == 5
+    assert facets["total"] == 120
+
+def test_model_follows_writes(catalog, client, auth_headers, admin_headers):
+    """Test that creates, purchases, updates and deletes keep the model equal to SQL"""
+    response = client.post(
+        "/api/sweets",
+        json={"name": "Zesty Lime", "category": "Sour", "price": 0.75, "quantity": 12},
+        headers=admin_headers
+    )
+    created = response.json()["id"]
+    client.post(f"/api/sweets/{created}/purchase", json={"quantity": 2}, headers=auth_headers)
+    client.post("/api/sweets/1/restock", json={"quantity": 5}, headers=admin_headers)
+    client.put("/api/sweets/2", json={"name": "Aaa First", "price": 9.0}, headers=admin_headers)
+    client.delete("/api/sweets/3", headers=admin_headers)
+    client.put("/api/sweets/4/shards", json={"slots": 3}, headers=admin_headers)
+    client.post("/api/sweets/4/purchase", json={"quantity": 1}, headers=auth_headers)
+
+    # SQL sorts sharded sweets by their periodically reconciled row quantity
+    db = TestingSessionLocal()
+    stock_service.reconcile_totals(db)
+    db.close()
+    for sort in ("id", "name", "price", "quantity"):
+        assert catalog.search(**catalog_service._normalize_filters(), sort=sort) == sql_search(sort=sort)
+    response = client.get("/api/sweets/search?name=zesty", headers=auth_headers)
+    assert response.json()[0]["quantity"] == 10
+    assert response.json()[0]["version"] == 2
+    assert catalog.stats()["rows"] == 600
+
+def test_name_order_is_code_point_order(catalog):
+    """Test mixed-case and accented names sort as SQLite's default collation does"""
+    db = TestingSessionLocal()
+    db.execute(insert(Sweet), [
+        {"name": name, "category": "Gummy", "price": 1.0, "quantity": 1}
+        for name in ("apple drop", "Zebra Stripe", "éclair", "Éclair", "Apple Drop", "zebra stripe")
+    ])
+    db.commit()
+    catalog.rebuild(db)
+    db.close()
+    assert catalog.sorts_names
+    for order in ("asc", "desc"):
+        page = catalog.search(**catalog_service._normalize_filters(), sort="name", order=order)
+        assert page == sql_search(sort="name", order=order)
+    names = [row["name"] for row in page[::-1]]
+    assert names.index("Zebra Stripe") < names.index("apple drop") < names.index("Éclair")
+
+@pytest.mark.asyncio
+async def test_name_sorts_left_to_sql_under_a_locale_collation(catalog):
+    """Test that name sorts go to SQL when the database doesn't order names by code point"""
+    catalog.sorts_names = False
+    db = TestingSessionLocal()
+    queries = []
+
+    def record(*args):
+        queries.append(args)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        by_price = await catalog_service.search_sweets(db, sort="price", limit=5)
+        by_name = await catalog_service.search_sweets(db, sort="name", limit=5)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+        db.close()
+    assert len(by_price) == len(by_name) == 5
+    assert len(queries) == 1
+
+def test_model_follows_writes_of_other_workers(catalog):
+    """Test that deltas another worker sends through the bridge update the model"""
+    bridge = PostgresBridge(StockBroker(), engine=None)
+    def receive(delta):
+        bridge.receive(json.dumps(dict(delta, origin="peer")))
+
+    sweet = catalog.search(**catalog_service._normalize_filters(), limit=1)[0]
+    receive({"type": "sweet", "sweet_id": sweet["id"], "sweet": dict(sweet, name="Aaa Peer Edit"), "version": 1})
+    receive({"type": "stock", "sweet_id": sweet["id"], "quantity": 99, "previous_quantity": 0, "reason": "restock", "version": 2})
+    first = catalog.search(**catalog_service._normalize_filters(), sort="name", limit=1)[0]
+    assert (first["id"], first["name"], first["quantity"]) == (sweet["id"], "Aaa Peer Edit", 99)
+
+    receive({"type": "deleted", "sweet_id": sweet["id"], "version": 3})
+    assert catalog.stats()["rows"] == 599
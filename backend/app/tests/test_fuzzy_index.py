@@ -0,0 +1,122 @@
+"""
+Test cases for the in-memory fuzzy search index.
+Tests typo-tolerant ranking, incremental updates and rebuilding from the database.
+"""
+import pytest, json
+from conftest import engine, TestingSessionLocal
+from app.database.connection import Base
+from app.models.sweet import Sweet
+from app.services import fuzzy_index as fuzzy_module
+from app.services.fuzzy_index import FuzzyIndex, edit_distance, word_similarity
+from app.services.stock_stream import PostgresBridge, StockBroker, WORKER_ID
+
+@pytest.fixture
+def index():
+    """Index holding a small catalog"""
+    index = FuzzyIndex()
+    index.upsert(1, "Milk Chocolate Bar", "Chocolate")
+    index.upsert(2, "Dark Chocolate Truffle", "Chocolate")
+    index.upsert(3, "Gummy Bears", "Gummy")
+    index.upsert(4, "Sour Gummy Worms", "Gummy")
+    index.upsert(5, "Caramel Fudge", "Toffee")
+    return index
+
+def test_edit_distance():
+    """Test Levenshtein distance"""
+    assert edit_distance("chocolate", "chocolate") == 0
+    assert edit_distance("choclate", "chocolate") == 1
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == 3
+
+def test_word_similarity_rewards_prefixes():
+    """Test that a word still being typed matches the whole word"""
+    assert word_similarity("choc", "chocolate") == pytest.approx(0.9)
+    assert word_similarity("fudge", "fudge") == 1.0
+
+def test_misspelled_word_is_found(index):
+    """Test that a typo still finds the intended sweets"""
+    results = index.search("choclate")
+    assert {sweet_id for sweet_id, _ in results} == {1, 2}
+    assert all(score > 0.8 for _, score in results)
+
+def test_all_query_words_rank_first(index):
+    """Test that sweets matching every query word outrank partial matches"""
+    results = index.search("sour gumy")
+    assert results[0][0] == 4
+    assert 3 in [sweet_id for sweet_id, _ in results[1:]]
+
+def test_category_matches_rank_below_name_matches():
+    """Test that a category hit counts for less than the same word in a name"""
+    index = FuzzyIndex()
+    index.upsert(1, "Velvet Bites", "Fudge")
+    index.upsert(2, "Fudge Squares", "Baked")
+    assert [sweet_id for sweet_id, _ in index.search("fudg")] == [2, 1]
+
+def test_unrelated_query_finds_nothing(index):
+    """Test that dissimilar text doesn't match"""
+    assert index.search("xylophone") == []
+    assert index.search("  ") == []
+
+def test_updates_and_removals(index):
+    """Test that renamed and removed sweets are reflected immediately"""
+    index.upsert(5, "Salted Butterscotch", "Toffee")
+    assert index.search("caramel") == []
+    assert index.search("butterscoth")[0][0] == 5
+
+    index.remove(3)
+    assert [sweet_id for sweet_id, _ in index.search("gummy")] == [4]
+    index.remove(4)
+    assert index.search("gummy") == []
+    assert index.stats()["words"] == len({
+        "milk", "chocolate", "bar", "dark", "truffle", "salted", "butterscotch", "toffee"
+    })
+
+def test_stats_report_memory(index):
+    """Test that the index reports its size and footprint"""
+    stats = index.stats()
+    assert stats["documents"] == 5
+    assert stats["trigrams"] > 0
+    assert stats["cached_matches"] == 0
+    
+    index.search("choclate gumy")
+    cached = index.stats()
+    assert cached["cached_matches"] == 2
+    assert cached["memory_bytes"] > stats["memory_bytes"]
+
+def test_follows_writes_of_other_workers(monkeypatch):
+    """Test that sweet deltas another worker sends through the bridge update the index"""
+    index = FuzzyIndex()
+    monkeypatch.setattr(fuzzy_module, "fuzzy_index", index)
+    bridge = PostgresBridge(StockBroker(), engine=None)
+    sweet = {"id": 7, "name": "Rhubarb Custard", "category": "Boiled"}
+    
+    bridge.receive(json.dumps({"type": "sweet", "sweet_id": 7, "sweet": sweet, "version": 1, "origin": "peer"}))
+    assert index.search("rubarb")[0][0] == 7
+    
+    # This worker's own deltas were already applied from its local events
+    renamed = dict(sweet, name="Pear Drops")
+    bridge.receive(json.dumps({"type": "sweet", "sweet_id": 7, "sweet": renamed, "version": 2, "origin": WORKER_ID}))
+    assert index.search("rubarb")[0][0] == 7
+    
+    bridge.receive(json.dumps({"type": "deleted", "sweet_id": 7, "version": 3, "origin": "peer"}))
+    assert index.search("rubarb") == []
+
+def test_rebuild_from_database():
+    """Test loading the index from the sweets table"""
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        db.add_all([
+            Sweet(name="Peppermint Twist", category="Hard Candy", price=0.99, quantity=10),
+            Sweet(name="Lemon Drops", category="Hard Candy", price=1.49, quantity=5),
+        ])
+        db.commit()
+        index = FuzzyIndex()
+        index.upsert(999, "Stale Entry", "Gone")
+        assert index.rebuild(db) == 2
+        assert index.search("stale") == []
+        assert len(index.search("hard candi")) == 2
+        assert index.search("pepermint")[0][1] > 0.8
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,86 @@
+"""
+Test cases for liveness and readiness probes.
+Tests cached readiness signals and threshold failures.
+"""
+import asyncio
+import pytest
+from app.database.connection import engine as app_engine
+from app.middleware.access_log import AccessLogMiddleware
+from app.routers.health import db_pinger
+from app.services import health
+
+def test_liveness(client):
+    """Test that liveness always answers"""
+    response = client.get("/api/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+def test_readiness_reports_cached_checks(client):
+    """Test that readiness passes on a healthy worker and reads only cached signals"""
+    db_pinger.ping()
+    health.loop_lag.samples.clear()
+
+    response = client.get("/api/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert set(data["checks"]) == {"database", "pool", "event_loop", "in_flight"}
+    # The probe request itself is in flight
+    assert data["checks"]["in_flight"]["requests"] >= 1
+
+    # Evaluated directly, since background tasks may use the pool meanwhile
+    checkouts = []
+    from sqlalchemy import event
+    from sqlalchemy.pool import Pool
+    listener = lambda *args: checkouts.append(1)
+    event.listen(Pool, "checkout", listener)
+    try:
+        assert health.readiness(app_engine, db_pinger)["status"] == "ready"
+    finally:
+        event.remove(Pool, "checkout", listener)
+    assert checkouts == []
+
+def test_readiness_fails_past_thresholds(client, monkeypatch):
+    """Test that loop lag or a failed DB ping makes the worker unready"""
+    db_pinger.ping()
+    health.loop_lag.record(health.READINESS_MAX_LOOP_LAG_MS + 100)
+
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["event_loop"]["ok"] is False
+
+    health.loop_lag.samples.clear()
+    monkeypatch.setattr(db_pinger, "ok", False)
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"]["ok"] is False
+
+@pytest.mark.asyncio
+async def test_streaming_responses_leave_in_flight_count_once_started():
+    """Test that an open stream stops counting towards in-flight requests once its response starts"""
+    counts = {}
+    started = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def stream(scope, receive, send):
+        counts["before_start"] = health.in_flight.count
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        started.set()
+        await finish.wait()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    idle = health.in_flight.count
+    scope = {"type": "http", "method": "GET", "path": "/api/sweets/stream", "query_string": b""}
+    task = asyncio.create_task(AccessLogMiddleware(stream)(scope, receive, send))
+    await started.wait()
+    assert counts["before_start"] == idle + 1
+    assert health.in_flight.count == idle
+    finish.set()
+    await task
+    assert health.in_flight.count == idle
@@ -0,0 +1,124 @@
+"""
+Test cases for background jobs.
+Tests job endpoints, chunked progress and resuming interrupted jobs.
+"""
+import pytest,time
+from datetime import timedelta
+from conftest import engine, TestingSessionLocal
+from app.database.connection import Base
+
+@pytest.fixture
+def db():
+    """Clean database session without starting the app's background workers"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def wait_for_job(client, headers, job_id, timeout=10):
+    """Poll a job until it leaves the active statuses"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/sweets/jobs/{job_id}", headers=headers).json()
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_restock_job_runs_in_background(client, admin_headers):
+    """Test that a restock job is accepted, runs and reports progress"""
+    for name, category in [("Fudge", "Candy"), ("Toffee", "Candy"), ("Scone", "Bakery")]:
+        client.post(
+            "/api/sweets/",
+            json={"name": name, "category": category, "price": 2.0, "quantity": 5},
+            headers=admin_headers
+        )
+
+    response = client.post(
+        "/api/sweets/jobs/",
+        json={"kind": "restock", "params": {"quantity": 10, "category": "candy"}},
+        headers=admin_headers
+    )
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+
+    job = wait_for_job(client, admin_headers, response.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["processed"] == job["total"] == 2
+
+    quantities = {sweet["name"]: sweet["quantity"] for sweet in client.get("/api/sweets/", headers=admin_headers).json()}
+    assert quantities == {"Fudge": 15, "Toffee": 15, "Scone": 5}
+
+    listed = client.get("/api/sweets/jobs/", headers=admin_headers).json()
+    assert [entry["id"] for entry in listed] == [job["id"]]
+
+def test_invalid_job_is_rejected(client, admin_headers, auth_headers):
+    """Test validation errors and admin-only access"""
+    response = client.post(
+        "/api/sweets/jobs/",
+        json={"kind": "restock", "params": {"quantity": -1}},
+        headers=admin_headers
+    )
+    assert response.status_code == 400
+
+    response = client.post("/api/sweets/jobs/", json={"kind": "melt"}, headers=admin_headers)
+    assert response.status_code == 400
+    assert "Unknown job kind" in response.json()["detail"]
+
+    response = client.post(
+        "/api/sweets/jobs/",
+        json={"kind": "reprice", "params": {"percent": 10}},
+        headers=auth_headers
+    )
+    assert response.status_code == 403
+
+    assert client.get("/api/sweets/jobs/999", headers=admin_headers).status_code == 404
+
+def test_interrupted_job_resumes_after_last_chunk(db):
+    """Test that a job abandoned by a dead worker continues from its cursor"""
+    from app.models.job import Job
+    from app.models.purchase import utc_now
+    from app.models.sweet import Sweet
+    from app.services import job_service
+
+    sweets = [Sweet(name=f"Sweet {i}", category="Candy", price=10.0, quantity=1) for i in range(5)]
+    db.add_all(sweets)
+    db.commit()
+    job = job_service.create_job(db, "reprice", {"percent": 50})
+
+    runner = job_service.JobRunner(session_factory=TestingSessionLocal, chunk_size=2)
+    assert runner.run_chunk(job.id) is False
+
+    # Simulate the worker dying after its first chunk: another owner, stale heartbeat
+    job.owner = "crashed-worker"
+    job.heartbeat_at = utc_now() - timedelta(seconds=job_service.JOB_LEASE_SECONDS + 1)
+    db.commit()
+    assert job.id in runner.resumable_job_ids()
+
+    while not runner.run_chunk(job.id):
+        pass
+
+    db.expire_all()
+    job = db.get(Job, job.id)
+    assert job.status == "succeeded"
+    assert job.processed == job.total == 5
+    # Every sweet repriced exactly once
+    assert [sweet.price for sweet in db.query(Sweet).order_by(Sweet.id)] == [15.0] * 5
+
+def test_live_lease_is_respected(db):
+    """Test that a job held by another live worker isn't run twice"""
+    from app.models.purchase import utc_now
+    from app.services import job_service
+
+    job = job_service.create_job(db, "restock", {"quantity": 1})
+    job.owner = "other-worker"
+    job.heartbeat_at = utc_now()
+    db.commit()
+
+    runner = job_service.JobRunner(session_factory=TestingSessionLocal)
+    assert job.id not in runner.resumable_job_ids()
+    assert runner.run_chunk(job.id) is True
+    db.refresh(job)
+    assert job.status == "pending"
+    assert job.processed == 0
@@ -0,0 +1,48 @@
+"""
+Test cases for the low-stock notifier.
+Tests batching and deduplication of low-stock alerts.
+"""
+from app.services import events
+from app.services.low_stock_notifier import LowStockNotifier
+
+def test_alerts_are_batched_per_sweet():
+    """Test that queued alerts are delivered together, latest per sweet"""
+    notifier = LowStockNotifier()
+    batches = []
+    notifier.sinks = [batches.append]
+
+    notifier.handle(sweet_id=1, name="Fudge", quantity=9, reorder_threshold=10)
+    notifier.handle(sweet_id=2, name="Toffee", quantity=3, reorder_threshold=5)
+    notifier.handle(sweet_id=1, name="Fudge", quantity=4, reorder_threshold=10)
+
+    delivered = notifier.flush()
+    assert len(batches) == 1
+    assert delivered == batches[0]
+    assert {alert["sweet_id"]: alert["quantity"] for alert in delivered} == {1: 4, 2: 3}
+
+    # Nothing pending means no delivery
+    assert notifier.flush() == []
+    assert len(batches) == 1
+
+def test_failing_sink_does_not_block_others():
+    """Test that one broken sink doesn't stop delivery to the rest"""
+    notifier = LowStockNotifier()
+    delivered = []
+
+    def broken(alerts):
+        raise RuntimeError("pager down")
+
+    notifier.sinks = [broken, delivered.extend]
+    notifier.handle(sweet_id=7, name="Gum", quantity=0, reorder_threshold=10)
+    notifier.flush()
+
+    assert [alert["sweet_id"] for alert in delivered] == [7]
+
+def test_notifier_receives_published_events():
+    """Test that the shared notifier is subscribed to low-stock events"""
+    from app.services.low_stock_notifier import low_stock_notifier
+
+    low_stock_notifier.flush()
+    events.publish(events.LOW_STOCK, sweet_id=99, name="Mints", quantity=1, reorder_threshold=10)
+
+    assert [alert["sweet_id"] for alert in low_stock_notifier.flush()] == [99]
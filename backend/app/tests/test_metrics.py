@@ -0,0 +1,85 @@
+"""
+Test cases for connection metrics and early session release.
+Tests that request sessions give their connection back when the endpoint returns.
+"""
+from fastapi.testclient import TestClient
+from conftest import TestingSessionLocal
+
+def test_session_released_when_endpoint_returns():
+    """Test that a wrapped endpoint's session no longer holds a connection"""
+    from sqlalchemy import text
+    from app.database.connection import release_sessions_after
+    from app.services.metrics import connection_hold_ms
+
+    seen = {}
+
+    def endpoint(db):
+        db.execute(text("SELECT 1"))
+        seen["in_transaction"] = db.in_transaction()
+        return "done"
+
+    db = TestingSessionLocal()
+    before = connection_hold_ms.count
+    assert release_sessions_after(endpoint)(db=db) == "done"
+
+    assert seen["in_transaction"] is True
+    assert db.in_transaction() is False
+    assert connection_hold_ms.count == before + 1
+
+def test_sessions_of_sub_dependencies_released_before_response():
+    """Test that a session reaching the endpoint only through a sub-dependency is closed before serialization"""
+    from fastapi import APIRouter, Depends, FastAPI
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from app.database.connection import ReleasingRoute, engine as app_engine, get_db as real_get_db
+
+    checked_out = []
+
+    class ProbeResponse(JSONResponse):
+        def render(self, content):
+            checked_out.append(app_engine.pool.checkedout())
+            return super().render(content)
+
+    def current_name(db: Session = Depends(real_get_db)):
+        return db.execute(text("SELECT 'probe'")).scalar()
+
+    router = APIRouter(route_class=ReleasingRoute)
+
+    @router.get("/probe", response_class=ProbeResponse)
+    def probe(name: str = Depends(current_name)):
+        return {"name": name}
+
+    probe_app = FastAPI()
+    probe_app.include_router(router)
+    with TestClient(probe_app) as probe_client:
+        assert probe_client.get("/probe").json() == {"name": "probe"}
+    assert checked_out == [0]
+
+def test_histogram_quantiles():
+    """Test bucket counts and quantile estimates"""
+    from app.services.metrics import Histogram
+
+    histogram = Histogram([1, 10, 100])
+    for value in [0.5, 5, 5, 50, 500]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert [bucket["count"] for bucket in snapshot["buckets"]] == [1, 3, 4, 5]
+    assert snapshot["max_ms"] == 500
+    assert snapshot["p50_ms"] == 10
+    assert snapshot["p99_ms"] == 500
+
+def test_db_connection_metrics_endpoint(client, admin_headers, auth_headers):
+    """Test that request checkouts are recorded and exposed to admins"""
+    client.get("/api/sweets/", headers=auth_headers)
+
+    response = client.get("/api/metrics/db-connections", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["hold_time"]["count"] > 0
+    assert data["hold_time"]["buckets"][-1]["le"] == "+Inf"
+    assert "pool" in data["pool"]
+
+    response = client.get("/api/metrics/db-connections", headers=auth_headers)
+    assert response.status_code == 403
@@ -0,0 +1,108 @@
+"""
+Test cases for the transactional inventory outbox.
+Tests that events commit with their changes and that the relay delivers them in batches.
+"""
+import json
+import pytest
+from sqlalchemy import insert
+from conftest import TestingSessionLocal
+from app.models.outbox import OutboxEvent
+from app.services import outbox
+from app.services.outbox import outbox_relay
+
+@pytest.fixture
+def sink(client, monkeypatch):
+    """
+    Collect everything the app's relay delivers; its background loop
+    shares the relay's lock, so every event lands here exactly once.
+    """
+    sink = outbox.QueueSink()
+    monkeypatch.setattr(outbox_relay, "sinks", [sink])
+    return sink
+
+def delivered(sink):
+    """Drain the outbox and return every event delivered so far"""
+    outbox_relay.drain()
+    events = []
+    while not sink.queue.empty():
+        events.append(sink.queue.get())
+    return events
+
+def test_changes_commit_their_events(client, sink, auth_headers, admin_headers):
+    """Test that purchases, restocks and updates write events, and rejected purchases don't"""
+    response = client.post(
+        "/api/sweets",
+        json={"name": "Gummy Bears", "category": "Gummy", "price": 1.5, "quantity": 10},
+        headers=admin_headers
+    )
+    sweet_id = response.json()["id"]
+
+    client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 3}, headers=auth_headers)
+    response = client.post(f"/api/sweets/{sweet_id}/purchase", json={"quantity": 50}, headers=auth_headers)
+    assert response.status_code == 400
+    client.post(f"/api/sweets/{sweet_id}/restock", json={"quantity": 5}, headers=admin_headers)
+    client.put(f"/api/sweets/{sweet_id}", json={"price": 1.75, "quantity": 20}, headers=admin_headers)
+
+    events = delivered(sink)
+    assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+    assert [(event["type"], event["payload"].get("reason")) for event in events] == [
+        ("stock.changed", "purchase"),
+        ("stock.changed", "restock"),
+        ("sweet.updated", None),
+        ("stock.changed", "update"),
+    ]
+    purchase, restock, update, stock = (event["payload"] for event in events)
+    assert (purchase["previous_quantity"], purchase["quantity"], purchase["version"]) == (10, 7, 2)
+    assert (restock["previous_quantity"], restock["quantity"], restock["version"]) == (7, 12, 3)
+    assert (update["previous"]["price"], update["sweet"]["price"], update["sweet"]["version"]) == (1.5, 1.75, 4)
+    assert (stock["previous_quantity"], stock["quantity"]) == (12, 20)
+    assert all(event["sweet_id"] == sweet_id for event in events)
+
+    db = TestingSessionLocal()
+    assert db.query(OutboxEvent).count() == 0
+    db.close()
+
+def test_relay_delivers_in_batches_and_retries_failed_sinks(client, sink, monkeypatch, tmp_path):
+    """Test group-committed batches, the JSON lines sink and redelivery after a sink failure"""
+    db = TestingSessionLocal()
+    db.execute(insert(OutboxEvent), [
+        {"event_type": "stock.changed", "sweet_id": sweet_id, "payload": {"quantity": sweet_id}}
+        for sweet_id in range(1, 6)
+    ])
+    db.commit()
+
+    def broken(batch):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(outbox_relay, "sinks", [broken])
+    failures = outbox_relay.failures
+    assert outbox_relay.drain() == 0
+    assert outbox_relay.failures > failures
+    assert outbox_relay.backlog()["pending"] == 5
+
+    file_sink = outbox.JsonLinesSink(str(tmp_path / "events.jsonl"))
+    monkeypatch.setattr(outbox_relay, "sinks", [sink, file_sink])
+    monkeypatch.setattr(outbox_relay, "batch_size", 2)
+    batches = outbox_relay.batches
+    assert [event["payload"]["quantity"] for event in delivered(sink)] == [1, 2, 3, 4, 5]
+    assert outbox_relay.batches - batches == 3
+    lines = (tmp_path / "events.jsonl").read_text().splitlines()
+    assert [json.loads(line)["sweet_id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert outbox_relay.backlog() == {"pending": 0, "lag_seconds": 0.0}
+    db.close()
+
+def test_outbox_metrics(client, sink, auth_headers, admin_headers):
+    """Test the backlog and delivery lag report"""
+    response = client.post(
+        "/api/sweets",
+        json={"name": "Toffee", "category": "Chewy", "price": 0.8, "quantity": 4},
+        headers=admin_headers
+    )
+    client.post(f"/api/sweets/{response.json()['id']}/purchase", json={"quantity": 1}, headers=auth_headers)
+    delivered(sink)
+
+    assert client.get("/api/metrics/outbox", headers=auth_headers).status_code == 403
+    report = client.get("/api/metrics/outbox", headers=admin_headers).json()
+    assert report["backlog"]["pending"] == 0
+    assert report["delivered"] >= 1
+    assert report["delivery_lag"]["count"] == report["delivered"]
@@ -0,0 +1,91 @@
+"""
+Test cases for sweet price history.
+Tests the appended price changes, their hourly and daily rollups, and the history endpoint.
+"""
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from conftest import engine, TestingSessionLocal
+from app.models.price_history import PriceChange, PriceRollup
+from app.services import price_history
+
+def test_rollups_match_raw_changes(client):
+    """Test that incrementally merged rollups equal rollups recomputed from raw changes, in any write order"""
+    generator = random.Random(5)
+    origin = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    moments = [origin + timedelta(seconds=second) for second in generator.sample(range(5 * 86400), 300)]
+    db = TestingSessionLocal()
+    for moment in moments:
+        prices = [(sweet_id, generator.choice([0.5, 1.0, 1.25, 2.0])) for sweet_id in generator.sample([1, 2, 3], 2)]
+        price_history.record_prices(db, prices, changed_at=moment)
+    db.commit()
+
+    expected = defaultdict(list)
+    for change in db.query(PriceChange):
+        for resolution in price_history.ROLLUP_RESOLUTIONS:
+            key = (resolution, change.sweet_id, price_history.bucket_start(change.changed_at, resolution))
+            expected[key].append((price_history.as_utc(change.changed_at), change.price))
+    actual = {
+        (rollup.resolution, rollup.sweet_id, price_history.as_utc(rollup.bucket)): rollup
+        for rollup in db.query(PriceRollup)
+    }
+    assert set(actual) == set(expected)
+    for key, changes in expected.items():
+        rollup = actual[key]
+        prices = [price for _, price in changes]
+        assert (rollup.min_price, rollup.max_price, rollup.changes) == (min(prices), max(prices), len(prices))
+        assert rollup.last_price == max(changes)[1]
+    db.close()
+
+def test_price_history_picks_resolution_from_range(client, auth_headers, admin_headers):
+    """Test raw, hourly and daily history of edits and bulk price changes"""
+    response = client.post(
+        "/api/sweets",
+        json={"name": "Caramel Chew", "category": "Chewy", "price": 2.0, "quantity": 10},
+        headers=admin_headers
+    )
+    sweet_id = response.json()["id"]
+    client.put(f"/api/sweets/{sweet_id}", json={"price": 2.5}, headers=admin_headers)
+    client.put(f"/api/sweets/{sweet_id}", json={"quantity": 4}, headers=admin_headers)
+    client.post("/api/sweets/prices/adjust", json={"mode": "percent", "amount": 10}, headers=admin_headers)
+
+    url = f"/api/sweets/{sweet_id}/price-history"
+    now = datetime.now(timezone.utc)
+    response = client.get(url, params={"start": (now - timedelta(hours=1)).isoformat()}, headers=admin_headers)
+    assert response.json()["resolution"] == "raw"
+    assert [point["last_price"] for point in response.json()["points"]] == [2.0, 2.5, 2.75]
+
+    response = client.get(url, headers=admin_headers)
+    assert response.json()["resolution"] == "hour"
+    points = response.json()["points"]
+    assert len(points) in (1, 2)
+    assert (points[0]["min_price"], max(point["max_price"] for point in points)) == (2.0, 2.75)
+    assert points[-1]["last_price"] == 2.75
+    assert sum(point["changes"] for point in points) == 3
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(
+            url, params={"start": (now - timedelta(days=365)).isoformat()}, headers=admin_headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.json()["resolution"] == "day"
+    assert response.json()["points"][-1]["last_price"] == 2.75
+    assert not any("price_changes" in statement for statement in statements)
+
+def test_price_history_validation(client, auth_headers, admin_headers):
+    """Test access, forced resolutions and reversed ranges"""
+    url = "/api/sweets/1/price-history"
+    assert client.get(url, headers=auth_headers).status_code == 403
+    response = client.get(url, params={"resolution": "raw"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["points"] == []
+    assert client.get(url, params={"resolution": "minute"}, headers=admin_headers).status_code == 422
+    response = client.get(
+        url, params={"start": "2026-02-01T00:00:00Z", "end": "2026-01-01T00:00:00Z"}, headers=admin_headers
+    )
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+"""
+Test cases for on-demand request profiling.
+Tests the admin opt-in, SQL capture and profile downloads.
+"""
+
+def test_admin_can_profile_a_request(client, admin_headers):
+    """Test that a flagged admin request is profiled and downloadable"""
+    client.post(
+        "/api/sweets",
+        json={"name": "Fudge", "category": "Candy", "price": 2.0, "quantity": 5},
+        headers=admin_headers
+    )
+
+    response = client.get("/api/sweets/search?name=fud", headers=dict(admin_headers, **{"X-Profile": "1"}))
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    report = client.get(f"/api/profiles/{profile_id}", headers=admin_headers).json()
+    assert report["path"] == "/api/sweets/search"
+    assert report["status_code"] == 200
+    assert report["duration_ms"] > 0
+    assert any("FROM sweets" in entry["statement"] for entry in report["statements"])
+
+    listed = client.get("/api/profiles/", headers=admin_headers).json()
+    assert profile_id in [entry["id"] for entry in listed]
+
+    # SQL capture is only attached while a profile is running
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.services.profiling import _before_cursor_execute
+    assert not event.contains(Engine, "before_cursor_execute", _before_cursor_execute)
+
+    folded = client.get(f"/api/profiles/{profile_id}/folded", headers=admin_headers)
+    assert folded.status_code == 200
+    assert folded.headers["content-type"].startswith("text/plain")
+
+def test_query_flag_and_non_admins(client, admin_headers, auth_headers):
+    """Test the query flag, and that regular users can't profile or read profiles"""
+    response = client.get("/api/sweets/?profile=1", headers=admin_headers)
+    assert "X-Profile-Id" in response.headers
+
+    response = client.get("/api/sweets/?profile=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+    response = client.get("/api/sweets/", headers=admin_headers)
+    assert "X-Profile-Id" not in response.headers
+
+    assert client.get("/api/profiles/", headers=auth_headers).status_code == 403
+    assert client.get("/api/profiles/missing", headers=admin_headers).status_code == 404
+
+def test_profile_folds_sampled_stacks():
+    """Test folded stack output and the hottest-function ranking"""
+    from app.services.profiling import Profile
+
+    profile = Profile("GET", "/api/sweets/", user_id=1)
+    profile.stacks["main;handler;query"] += 3
+    profile.stacks["main;handler;serialize"] += 1
+
+    assert profile.folded() == "main;handler;query 3\nmain;handler;serialize 1\n"
+    assert profile.top_functions()[0] == {"function": "query", "samples": 3, "percent": 75.0}
@@ -0,0 +1,314 @@
+"""
+Test cases for sharding the catalog by store.
+Tests store routing, scatter-gather searches and the multi-SQLite stand-in.
+"""
+import pytest
+from sqlalchemy import event
+from conftest import engine, TestingSessionLocal
+from app.database import sharding
+from app.models.purchase import Purchase
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.sweet import Sweet
+from app.services import catalog_service
+
+@pytest.fixture
+def shards(client, tmp_path):
+    """Route stores 2 and 3 to their own SQLite databases; store 1 stays on the test database"""
+    previous = sharding.shard_router
+    router = sharding.local_shard_router(str(tmp_path), [2, 3], engine)
+    sharding.configure_shards(router)
+    try:
+        yield router
+    finally:
+        sharding.configure_shards(previous)
+        router.dispose()
+
+def create_sweets(client, admin_headers):
+    """Create two sweets in each of stores 1, 2 and 3"""
+    catalog = [
+        (1, "Milk Chocolate", 2.50), (1, "Sour Worms", 1.10),
+        (2, "Dark Chocolate", 3.20), (2, "Peppermints", 0.90),
+        (3, "Toffee Bar", 1.75), (3, "Truffle", 4.00),
+    ]
+    for store_id, name, price in catalog:
+        response = client.post(
+            "/api/sweets",
+            json={"name": name, "category": "Mixed", "price": price, "quantity": 10, "store_id": store_id},
+            headers=admin_headers
+        )
+        assert response.status_code == 201
+        assert response.json()["store_id"] == store_id
+
+def test_parse_shard_map():
+    """Test parsing the store to database URL mapping"""
+    assert sharding.parse_shard_map(None) == {}
+    assert sharding.parse_shard_map("2=sqlite:///a.db; 3=sqlite:///b.db;") == {
+        2: "sqlite:///a.db", 3: "sqlite:///b.db"
+    }
+    with pytest.raises(ValueError):
+        sharding.parse_shard_map("two=sqlite:///a.db")
+
+def test_stores_sharing_a_database_share_an_engine(tmp_path):
+    """Test that engines and pools are per database, not per store"""
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    router = sharding.ShardRouter(engine, {2: url, 3: url})
+    try:
+        assert router.engine_for(2) is router.engine_for(3)
+        assert router.engine_for(7) is engine
+        assert len(router.engines()) == 2
+        assert router.stores_on(router.engine_for(2)) == [2, 3]
+    finally:
+        router.dispose()
+
+def test_writes_and_single_store_reads_route_to_one_shard(client, shards, auth_headers, admin_headers):
+    """Test that a store's sweets live on, and are read from, its own shard"""
+    create_sweets(client, admin_headers)
+
+    store_two = shards.session_for(2)
+    assert sorted(sweet.name for sweet in store_two.query(Sweet)) == ["Dark Chocolate", "Peppermints"]
+    store_two.close()
+    default = TestingSessionLocal()
+    assert sorted(sweet.name for sweet in default.query(Sweet)) == ["Milk Chocolate", "Sour Worms"]
+    default.close()
+
+    response = client.get("/api/sweets/search?store_id=2&sort=price", headers=auth_headers)
+    assert [sweet["name"] for sweet in response.json()] == ["Peppermints", "Dark Chocolate"]
+
+    sweet_id = response.json()[0]["id"]
+    response = client.post(f"/api/sweets/{sweet_id}/purchase?store_id=2", json={"quantity": 4}, headers=auth_headers)
+    assert response.status_code == 200
+    assert client.get(f"/api/sweets/{sweet_id}?store_id=2", headers=auth_headers).json()["quantity"] == 6
+    # Another store's shard doesn't hold the sweet under any id
+    assert client.get(f"/api/sweets/{sweet_id}?store_id=3", headers=auth_headers).status_code == 404
+
+def test_sweet_ids_are_unique_across_shards(client, shards, auth_headers, admin_headers):
+    """Test that every shard allocates sweet ids from its own range"""
+    create_sweets(client, admin_headers)
+
+    sweets = client.get("/api/sweets", headers=auth_headers).json()
+    ids = {sweet["name"]: sweet["id"] for sweet in sweets}
+    assert len(set(ids.values())) == 6
+    assert ids["Dark Chocolate"] == 2 * sharding.SHARD_ID_SPAN
+    assert ids["Peppermints"] == 2 * sharding.SHARD_ID_SPAN + 1
+    assert ids["Toffee Bar"] == 3 * sharding.SHARD_ID_SPAN
+    assert ids["Milk Chocolate"] < sharding.SHARD_ID_SPAN
+    assert shards.id_range(shards.engine_for(3)) == (3 * sharding.SHARD_ID_SPAN, 4 * sharding.SHARD_ID_SPAN - 1)
+    assert shards.id_range(shards.engine_for(1)) is None
+
+    store_two = shards.session_for(2)
+    try:
+        with pytest.raises(sharding.IdRangeExhaustedError):
+            sharding.next_sweet_id(store_two, (ids["Dark Chocolate"], ids["Peppermints"]))
+    finally:
+        store_two.close()
+
+def test_concurrent_creates_on_a_shard_get_distinct_ids(client, shards, auth_headers, admin_headers, monkeypatch):
+    """Test that a create whose id was taken by another worker in the meantime retries with the next one"""
+    allocate = sharding.next_sweet_id
+    raced = []
+
+    def allocate_after_another_worker(db, id_range):
+        sweet_id = allocate(db, id_range)
+        if not raced:
+            # Another worker read the same highest id and commits its sweet first
+            raced.append(sweet_id)
+            other = shards.session_for(2)
+            other.add(Sweet(id=sweet_id, name="Rival Fudge", category="Fudge", price=1.0, quantity=1, store_id=2))
+            other.commit()
+            other.close()
+        return sweet_id
+
+    monkeypatch.setattr(sharding, "next_sweet_id", allocate_after_another_worker)
+    response = client.post(
+        "/api/sweets",
+        json={"name": "Dark Chocolate", "category": "Mixed", "price": 3.2, "quantity": 10, "store_id": 2},
+        headers=admin_headers
+    )
+    assert response.status_code == 201
+    assert raced == [2 * sharding.SHARD_ID_SPAN]
+    assert response.json()["id"] == 2 * sharding.SHARD_ID_SPAN + 1
+    store_two = shards.session_for(2)
+    assert sorted(name for name, in store_two.query(Sweet.name)) == ["Dark Chocolate", "Rival Fudge"]
+    store_two.close()
+
+def test_store_ids_must_leave_room_for_an_id_range(tmp_path):
+    """Test that a store too high for a 32-bit id range is rejected"""
+    with pytest.raises(ValueError):
+        sharding.ShardRouter(engine, {300: f"sqlite:///{tmp_path / 'far.db'}"})
+
+def test_cross_store_search_merges_sorted_pages(client, shards, auth_headers, admin_headers):
+    """Test that scatter-gather pages match sorting the whole catalog"""
+    create_sweets(client, admin_headers)
+
+    response = client.get("/api/sweets/search?sort=price&limit=3&offset=1", headers=auth_headers)
+    assert [sweet["name"] for sweet in response.json()] == ["Sour Worms", "Toffee Bar", "Milk Chocolate"]
+    assert [sweet["store_id"] for sweet in response.json()] == [1, 3, 1]
+
+    response = client.get("/api/sweets/search?sort=name&order=desc&limit=2", headers=auth_headers)
+    assert [sweet["name"] for sweet in response.json()] == ["Truffle", "Toffee Bar"]
+
+    response = client.get("/api/sweets/search?name=chocolate", headers=auth_headers)
+    assert sorted(sweet["name"] for sweet in response.json()) == ["Dark Chocolate", "Milk Chocolate"]
+    assert len(client.get("/api/sweets", headers=auth_headers).json()) == 6
+
+def test_cross_store_quantity_sort_merges_on_returned_stock(client, shards, auth_headers, admin_headers):
+    """Test that a sweet whose slot total fell below its snapshot is merged by the stock returned"""
+    create_sweets(client, admin_headers)
+    sweet = client.get("/api/sweets/search?store_id=2&name=peppermints", headers=auth_headers).json()[0]
+    client.put(f"/api/sweets/{sweet['id']}/shards?store_id=2", json={"slots": 4}, headers=admin_headers)
+    response = client.post(f"/api/sweets/{sweet['id']}/purchase?store_id=2", json={"quantity": 7}, headers=auth_headers)
+    assert response.status_code == 200
+
+    page = client.get("/api/sweets/search?sort=quantity&limit=2", headers=auth_headers).json()
+    assert [(row["name"], row["quantity"]) for row in page] == [("Peppermints", 3), ("Milk Chocolate", 10)]
+    page = client.get("/api/sweets/search?sort=quantity&order=desc&offset=4", headers=auth_headers).json()
+    assert [(row["name"], row["quantity"]) for row in page] == [("Milk Chocolate", 10), ("Peppermints", 3)]
+
+@pytest.mark.asyncio
+async def test_cross_store_name_sort_asks_shards_for_code_point_order(client, shards, admin_headers, monkeypatch):
+    """Test that shards whose names sort under a locale collation are asked for code-point order"""
+    create_sweets(client, admin_headers)
+    client.post(
+        "/api/sweets",
+        json={"name": "apple drops", "category": "Mixed", "price": 1.0, "quantity": 5, "store_id": 2},
+        headers=admin_headers
+    )
+    monkeypatch.setattr(catalog_service, "_name_collations", {})
+    monkeypatch.setattr(catalog_service, "sorts_by_code_point", lambda db: db.get_bind() is engine)
+    statements = []
+    shard = shards.engine_for(2)
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(shard, "before_cursor_execute", record)
+    try:
+        page = await catalog_service.search_shards(shards.engines(), sort="name", order="desc", limit=3)
+    finally:
+        event.remove(shard, "before_cursor_execute", record)
+
+    assert [row["name"] for row in page] == ["apple drops", "Truffle", "Toffee Bar"]
+    assert any("COLLATE" in statement and "ORDER BY" in statement for statement in statements)
+
+def test_batch_restock_reaches_every_shard(client, shards, auth_headers, admin_headers):
+    """Test that a batch restock applies to sweets on store shards, all or nothing"""
+    create_sweets(client, admin_headers)
+    ids = {sweet["name"]: sweet["id"] for sweet in client.get("/api/sweets", headers=auth_headers).json()}
+
+    response = client.post(
+        "/api/sweets/restock",
+        json={"items": [
+            {"sweet_id": ids["Truffle"], "quantity": 5},
+            {"sweet_id": ids["Sour Worms"], "quantity": 2},
+            {"sweet_id": ids["Peppermints"], "quantity": 1},
+            {"sweet_id": 2 * sharding.SHARD_ID_SPAN + 999, "quantity": 1},
+        ]},
+        headers=admin_headers
+    )
+    assert response.status_code == 404
+    assert str(2 * sharding.SHARD_ID_SPAN + 999) in response.json()["detail"]
+    assert all(sweet["quantity"] == 10 for sweet in client.get("/api/sweets", headers=auth_headers).json())
+
+    response = client.post(
+        "/api/sweets/restock",
+        json={"items": [
+            {"sweet_id": ids["Truffle"], "quantity": 5},
+            {"sweet_id": ids["Sour Worms"], "quantity": 2},
+            {"sweet_id": ids["Peppermints"], "quantity": 1},
+        ]},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert [(item["sweet_id"], item["new_quantity"]) for item in response.json()["items"]] == [
+        (ids["Sour Worms"], 12), (ids["Peppermints"], 11), (ids["Truffle"], 15)
+    ]
+    quantities = {sweet["name"]: sweet["quantity"] for sweet in client.get("/api/sweets", headers=auth_headers).json()}
+    assert (quantities["Truffle"], quantities["Sour Worms"], quantities["Peppermints"]) == (15, 12, 11)
+
+def test_bulk_price_adjustment_reprices_every_shard(client, shards, auth_headers, admin_headers):
+    """Test that the price rule and its preview cover sweets on every shard"""
+    create_sweets(client, admin_headers)
+
+    rule = {"mode": "absolute", "amount": 1, "min_price": 1.5}
+    preview = client.post("/api/sweets/prices/adjust", json=dict(rule, dry_run=True), headers=admin_headers).json()
+    assert (preview["matched"], preview["changed"]) == (4, 4)
+    assert (preview["min_before"], preview["max_before"], preview["avg_before"]) == (1.75, 4.0, 2.86)
+    assert (preview["min_after"], preview["max_after"], preview["avg_after"]) == (2.75, 5.0, 3.86)
+
+    response = client.post("/api/sweets/prices/adjust", json=rule, headers=admin_headers)
+    assert response.json() == {"dry_run": False, "changed": 4}
+    prices = {sweet["name"]: sweet["price"] for sweet in client.get("/api/sweets", headers=auth_headers).json()}
+    assert prices == {
+        "Milk Chocolate": 3.5, "Sour Worms": 1.1, "Dark Chocolate": 4.2,
+        "Peppermints": 0.9, "Toffee Bar": 2.75, "Truffle": 5.0,
+    }
+
+def test_sales_of_every_store_recorded_on_the_default_database(client, shards, auth_headers, admin_headers):
+    """Test that a purchase changes stock on its store's shard but lands in the default ledger"""
+    create_sweets(client, admin_headers)
+    sweet = client.get("/api/sweets/search?store_id=3&name=truffle", headers=auth_headers).json()[0]
+
+    response = client.post(f"/api/sweets/{sweet['id']}/purchase?store_id=3", json={"quantity": 2}, headers=auth_headers)
+    assert response.status_code == 200
+    assert client.get(f"/api/sweets/{sweet['id']}?store_id=3", headers=auth_headers).json()["quantity"] == 8
+
+    store_three = shards.session_for(3)
+    assert store_three.query(Purchase).count() == 0
+    assert store_three.query(SalesDailyRollup).count() == 0
+    store_three.close()
+    history = client.get("/api/auth/me/purchases", headers=auth_headers).json()["items"]
+    assert [(item["sweet_name"], item["quantity"]) for item in history] == [("Truffle", 2)]
+    top = client.get("/api/analytics/top-sellers", headers=admin_headers).json()
+    assert [(row["sweet_id"], row["units"]) for row in top] == [(sweet["id"], 2)]
+
+@pytest.mark.asyncio
+async def test_scatter_gather_drops_sort_column_outside_fieldset(client, shards, admin_headers):
+    """Test merging on a sort column the sparse fieldset doesn't include"""
+    create_sweets(client, admin_headers)
+
+    page = await catalog_service.search_shards(
+        shards.engines(), sort="price", order="desc", limit=2, fields=("id", "name")
+    )
+    assert [row["name"] for row in page] == ["Truffle", "Dark Chocolate"]
+    assert all(set(row) == {"id", "name"} for row in page)
+
+def test_fuzzy_search_loads_matches_from_their_shards(client, shards, auth_headers, admin_headers):
+    """Test that fuzzy matches on store shards are returned, not dropped"""
+    create_sweets(client, admin_headers)
+
+    response = client.get("/api/sweets/fuzzy?q=chocolat", headers=auth_headers)
+    assert response.status_code == 200
+    assert sorted(match["sweet"]["name"] for match in response.json()) == ["Dark Chocolate", "Milk Chocolate"]
+    assert shards.shard_for_sweet(3 * sharding.SHARD_ID_SPAN + 1) is shards.engine_for(3)
+    assert shards.shard_for_sweet(5) is engine
+
+def test_search_indexes_rebuild_from_every_shard(client, shards, auth_headers, admin_headers):
+    """Test that a rebuild loads the sweets of store shards as well"""
+    from app.main import rebuild_search_indexes
+    from app.services.autocomplete import autocomplete_index
+    from app.services.fuzzy_index import fuzzy_index
+    create_sweets(client, admin_headers)
+
+    rebuild_search_indexes()
+    assert len(fuzzy_index) == 6
+    assert [row["name"] for row in autocomplete_index.suggest("truf", 5)] == ["Truffle"]
+
+def test_facets_and_low_stock_cover_every_shard(client, shards, auth_headers, admin_headers):
+    """Test that facets and the low-stock listing gather from every shard"""
+    create_sweets(client, admin_headers)
+    for store_id, name, quantity in [(3, "truffle", 10), (2, "peppermints", 4), (1, "worms", 7)]:
+        sweet = client.get(f"/api/sweets/search?store_id={store_id}&name={name}", headers=auth_headers).json()[0]
+        client.post(f"/api/sweets/{sweet['id']}/purchase?store_id={store_id}", json={"quantity": quantity}, headers=auth_headers)
+
+    facets = client.get("/api/sweets/facets", headers=auth_headers).json()
+    assert (facets["total"], facets["in_stock"]) == (6, 5)
+    assert facets["categories"] == [
+        {"category": "Mixed", "count": 6, "in_stock": 5, "min_price": 0.90, "max_price": 4.00}
+    ]
+    facets = client.get("/api/sweets/facets?max_price=2", headers=auth_headers).json()
+    assert (facets["total"], facets["in_stock"], facets["max_price"]) == (3, 3, 1.75)
+
+    response = client.get("/api/sweets/low-stock?limit=3", headers=admin_headers)
+    assert [(sweet["name"], sweet["quantity"]) for sweet in response.json()] == [
+        ("Truffle", 0), ("Sour Worms", 3), ("Peppermints", 6)
+    ]
@@ -0,0 +1,91 @@
+"""
+Test cases for the live stock stream.
+Tests delta fan-out, slow consumer handling and resuming by version.
+"""
+import asyncio
+import json
+import pytest
+from app.services import events, stock_stream
+from app.services.stock_stream import StockBroker, LocalBridge
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Route published events into a fresh broker"""
+    broker = StockBroker(resume_window=5)
+    monkeypatch.setattr(stock_stream, "bridge", LocalBridge(broker))
+    return broker
+
+def publish_stock(sweet_id: int, quantity: int):
+    """Publish a purchase of one unit"""
+    events.publish(
+        events.STOCK_CHANGED,
+        sweet_id=sweet_id, previous_quantity=quantity + 1, quantity=quantity, reason="purchase"
+    )
+
+async def next_frame(stream):
+    """Read one SSE frame and decode it"""
+    frame = await asyncio.wait_for(stream.__anext__(), timeout=1)
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+@pytest.mark.asyncio
+async def test_deltas_fan_out_to_every_subscriber(broker):
+    """Test that each subscriber receives versioned deltas in order"""
+    first, second = broker.subscribe(), broker.subscribe()
+    publish_stock(1, 9)
+    publish_stock(1, 8)
+    events.publish(events.SWEET_DELETED, sweet={"id": 2})
+    await asyncio.sleep(0)
+
+    for subscription in (first, second):
+        stream = stock_stream.stream_events(subscription, broker)
+        assert await next_frame(stream) == ("stock", {
+            "type": "stock", "sweet_id": 1, "quantity": 9, "previous_quantity": 10,
+            "reason": "purchase", "version": 1
+        })
+        assert (await next_frame(stream))[1]["version"] == 2
+        assert await next_frame(stream) == ("deleted", {"type": "deleted", "sweet_id": 2, "version": 3})
+        await stream.aclose()
+
+    assert broker.subscriber_count() == 0
+
+@pytest.mark.asyncio
+async def test_slow_consumer_gets_reset(broker, monkeypatch):
+    """Test that overflowing a subscriber's queue drops it to a single reset"""
+    monkeypatch.setattr(stock_stream, "SUBSCRIBER_QUEUE_SIZE", 2)
+    subscription = broker.subscribe()
+    for quantity in range(5):
+        publish_stock(3, quantity)
+    await asyncio.sleep(0)
+
+    stream = stock_stream.stream_events(subscription, broker)
+    assert await next_frame(stream) == ("reset", {"version": 5})
+
+    # After the reset the subscriber is live again
+    publish_stock(3, 0)
+    await asyncio.sleep(0)
+    assert (await next_frame(stream))[1]["version"] == 6
+    await stream.aclose()
+
+@pytest.mark.asyncio
+async def test_resume_from_version(broker):
+    """Test replay after a known version and reset once it left the window"""
+    for quantity in range(8):
+        publish_stock(4, quantity)
+
+    stream = stock_stream.stream_events(broker.subscribe(since=6), broker)
+    assert (await next_frame(stream))[1]["version"] == 7
+    assert (await next_frame(stream))[1]["version"] == 8
+    await stream.aclose()
+
+    # Versions 1-3 have been evicted from the five-delta window
+    stream = stock_stream.stream_events(broker.subscribe(since=1), broker)
+    assert await next_frame(stream) == ("reset", {"version": 8})
+    await stream.aclose()
+
+@pytest.mark.asyncio
+async def test_idle_stream_sends_keepalive(broker):
+    """Test that a quiet stream emits keep-alive comments"""
+    stream = stock_stream.stream_events(broker.subscribe(), broker, keepalive=0.01)
+    assert await asyncio.wait_for(stream.__anext__(), timeout=1) == ": keep-alive\n\n"
+    await stream.aclose()
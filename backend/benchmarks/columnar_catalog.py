@@ -0,0 +1,111 @@
+"""
+Benchmark of catalog searches: the SQL path against the columnar read model.
+
+Fills a scratch database with a synthetic catalog, builds the columnar
+model over it and times the same searches and facet queries both ways.
+
+Usage, from the backend directory:
+    python benchmarks/columnar_catalog.py [--rows 1000000] [--repeat 15]
+
+BENCH_DB_URL picks the database (a temporary SQLite file by default);
+its sweets table is dropped and recreated.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+SCRATCH = os.path.join(tempfile.gettempdir(), "sweet_shop_bench.db")
+os.environ.setdefault("DATABASE_URL", os.getenv("BENCH_DB_URL", f"sqlite:///{SCRATCH}"))
+
+from sqlalchemy import insert, text
+from app.database.connection import Base, SessionLocal, engine
+from app.models.sweet import Sweet
+from app.services import catalog_service
+from app.services.columnar_catalog import columnar_catalog
+
+CATEGORIES = ["Chocolate", "Gummy", "Sour", "Hard Candy", "Lollipop", "Jelly", "Chewy", "Toffee"]
+WORDS = ["Milk", "Dark", "Sour", "Fizzy", "Crunchy", "Salted", "Honey", "Minty", "Berry", "Lemon"]
+
+SEARCHES = {
+    "category + price range by price": dict(category="gummy", min_price=2.0, max_price=6.0, sort="price", limit=20),
+    "price range by price, deep page": dict(min_price=1.0, max_price=9.0, sort="price", limit=50, offset=5000),
+    "name substring": dict(name="honey toffee", limit=20),
+    "by quantity desc": dict(sort="quantity", order="desc", limit=20),
+    "category by name": dict(category="toffee", sort="name", limit=20),
+    "sparse id,price by price": dict(sort="price", limit=100, fields=("id", "price")),
+}
+FACETS = {
+    "facets, whole catalog": dict(),
+    "facets, price band": dict(min_price=3.0, max_price=4.0),
+}
+
+def fill(rows: int) -> None:
+    """Recreate the sweets table with a synthetic catalog"""
+    Sweet.__table__.drop(engine, checkfirst=True)
+    Base.metadata.create_all(bind=engine, tables=[Sweet.__table__])
+    generator = random.Random(42)
+    with engine.begin() as connection:
+        for start in range(0, rows, 50000):
+            connection.execute(insert(Sweet), [
+                {
+                    "name": f"{generator.choice(WORDS)} {generator.choice(WORDS)} {CATEGORIES[i % 8]} {i}",
+                    "category": CATEGORIES[i % 8],
+                    "price": round(generator.uniform(0.5, 10.5), 2),
+                    "quantity": generator.randrange(0, 500),
+                }
+                for i in range(start, min(start + 50000, rows))
+            ])
+        connection.execute(text("ANALYZE"))
+
+def median_ms(call, repeat: int) -> float:
+    """Median wall time of a call in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+    if columnar_catalog is None:
+        sys.exit("NumPy is required: pip install numpy")
+
+    started = time.perf_counter()
+    fill(args.rows)
+    print(f"filled {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    columnar_catalog.rebuild(db)
+    db.close()
+    stats = columnar_catalog.stats()
+    print(f"columnar build {time.perf_counter() - started:.1f}s, {stats['memory_bytes'] / 2**20:.0f} MiB")
+
+    print(f"\n{'query':<34}{'sql ms':>10}{'columnar ms':>14}{'speedup':>10}")
+    for label, params in SEARCHES.items():
+        normalized = dict(catalog_service._normalize_filters(
+            params.get("name"), params.get("category"), params.get("min_price"), params.get("max_price")
+        ))
+        options = {key: params[key] for key in ("sort", "order", "limit", "offset", "fields") if key in params}
+        options.setdefault("sort", "id")
+        sql = median_ms(lambda: catalog_service._load_sweets(engine, **normalized, **options), args.repeat)
+        columnar = median_ms(lambda: columnar_catalog.search(**normalized, **options), args.repeat)
+        assert catalog_service._load_sweets(engine, **normalized, **options) == columnar_catalog.search(**normalized, **options)
+        print(f"{label:<34}{sql:>10.2f}{columnar:>14.2f}{sql / columnar:>9.1f}x")
+    for label, params in FACETS.items():
+        normalized = catalog_service._normalize_filters(**params)
+        sql = median_ms(lambda: catalog_service._load_facets(engine, **normalized), args.repeat)
+        columnar = median_ms(lambda: columnar_catalog.facets(**normalized), args.repeat)
+        print(f"{label:<34}{sql:>10.2f}{columnar:>14.2f}{sql / columnar:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,19 @@
 Development server runner with database seeding.
 Ensures database is populated with sample data on startup.
 """
+import logging
 import uvicorn
 from app.database.seed_data import create_sample_data
 
+logger = logging.getLogger("run_server")
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
     # Seed database with initial data
-    print("Seeding database with initial data...")
+    logger.info("Seeding database with initial data...")
     create_sample_data()
     
     # Start the server
-    print("Starting Sweet Shop API server...")
+    logger.info("Starting Sweet Shop API server...")
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
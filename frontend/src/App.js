@@ -54,6 +54,7 @@ import React from 'react';
 import './App.css';
 import { AuthProvider } from './contexts/AuthContext';
 import { Toast } from './components/Toast';
+import SweetSearch from './components/SweetSearch';
 import LoginPage from './pages/LoginPage';
 
 function App() {
@@ -63,6 +64,9 @@ function App() {
         {/* Toast notifications */}
         <Toast />
         
+        {/* Name suggestions once signed in */}
+        <SweetSearch />
+        
         {/* For now, just show login page */}
         <LoginPage />
       </div>
@@ -0,0 +1,109 @@
+/**
+ * Sweet Search Component
+ * Search input suggesting sweet names as the user types
+ */
+import React, { useState, useEffect, useRef } from 'react';
+import { useAuth } from '../contexts/AuthContext';
+import apiService from '../services/api';
+
+// Milliseconds to wait after the last keystroke before asking for suggestions
+const SUGGEST_DELAY = 150;
+// Suggestions shown under the input
+const SUGGESTION_LIMIT = 8;
+
+const SweetSearch = ({ onSelect }) => {
+  const { isAuthenticated } = useAuth();
+  const [query, setQuery] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+  const [highlighted, setHighlighted] = useState(-1);
+  // Only the latest keystroke's answer may replace the list
+  const latestRequest = useRef(0);
+
+  useEffect(() => {
+    const prefix = query.trim();
+    if (!isAuthenticated || !prefix) {
+      setSuggestions([]);
+      return undefined;
+    }
+
+    const request = ++latestRequest.current;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await apiService.autocompleteSweets(prefix, SUGGESTION_LIMIT);
+        if (request === latestRequest.current) {
+          setSuggestions(results);
+          setHighlighted(-1);
+        }
+      } catch (error) {
+        // Suggestions are a convenience; a failed lookup just shows none
+        if (request === latestRequest.current) setSuggestions([]);
+      }
+    }, SUGGEST_DELAY);
+    return () => clearTimeout(timer);
+  }, [query, isAuthenticated]);
+
+  /**
+   * Pick a suggestion and close the list
+   * @param {Object} suggestion - {id, name, category, quantity, popularity}
+   */
+  const choose = (suggestion) => {
+    setQuery(suggestion.name);
+    setSuggestions([]);
+    latestRequest.current++;
+    if (onSelect) onSelect(suggestion);
+  };
+
+  /**
+   * Move through the suggestions with the arrow keys, pick with Enter
+   * @param {KeyboardEvent} e - Key event from the input
+   */
+  const handleKeyDown = (e) => {
+    if (!suggestions.length) return;
+    if (e.key === 'ArrowDown') {
+      e.preventDefault();
+      setHighlighted((highlighted + 1) % suggestions.length);
+    } else if (e.key === 'ArrowUp') {
+      e.preventDefault();
+      setHighlighted((highlighted - 1 + suggestions.length) % suggestions.length);
+    } else if (e.key === 'Enter' && highlighted >= 0) {
+      e.preventDefault();
+      choose(suggestions[highlighted]);
+    } else if (e.key === 'Escape') {
+      setSuggestions([]);
+    }
+  };
+
+  if (!isAuthenticated) return null;
+
+  return (
+    <div className="sweet-search">
+      <input
+        type="search"
+        placeholder="Search sweets..."
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+        onKeyDown={handleKeyDown}
+        aria-autocomplete="list"
+        aria-expanded={suggestions.length > 0}
+      />
+      {suggestions.length > 0 && (
+        <ul className="sweet-search-suggestions" role="listbox">
+          {suggestions.map((suggestion, index) => (
+            <li
+              key={suggestion.id}
+              role="option"
+              aria-selected={index === highlighted}
+              className={index === highlighted ? 'highlighted' : ''}
+              onMouseDown={() => choose(suggestion)}
+            >
+              <span>{suggestion.name}</span>
+              <small>{suggestion.category}</small>
+            </li>
+          ))}
+        </ul>
+      )}
+    </div>
+  );
+};
+
+export default SweetSearch;
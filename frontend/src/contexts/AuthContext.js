@@ -224,6 +224,8 @@ export const AuthProvider = ({ children }) => {
    * Logout user
    */
   const logout = () => {
+    // Revoke the token server-side; local logout doesn't wait for it
+    apiService.logout().catch(() => {});
     setUser(null);
     localStorage.removeItem("user");
     localStorage.removeItem("token");
@@ -87,6 +87,18 @@ class ApiService {
     return await this.handleResponse(response);
   }
 
+  /**
+   * Revoke the current access token on the server
+   * @returns {Promise} Logout confirmation
+   */
+  async logout() {
+    const response = await fetch(`${this.baseURL}/api/auth/logout`, {
+      method: 'POST',
+      headers: this.getAuthHeaders(),
+    });
+    return await this.handleResponse(response);
+  }
+
   /**
    * Get current authenticated user information
    * @returns {Promise} User data
@@ -132,6 +144,34 @@ class ApiService {
     return await this.handleResponse(response);
   }
 
+  /**
+   * Run several sweets/auth API calls in one round trip
+   * @param {Array} requests - [{id, method, path, body}] sub-requests
+   * @returns {Promise} Object with results: [{id, status, body}] in request order
+   */
+  async batch(requests) {
+    const response = await fetch(`${this.baseURL}/api/batch`, {
+      method: 'POST',
+      headers: this.getAuthHeaders(),
+      body: JSON.stringify({ requests }),
+    });
+    return await this.handleResponse(response);
+  }
+
+  /**
+   * Suggest sweets for a partially typed name, cheap enough to call per keystroke
+   * @param {string} prefix - Text typed so far
+   * @param {number} limit - Maximum number of suggestions
+   * @returns {Promise} Array of {id, name, category, quantity, popularity}
+   */
+  async autocompleteSweets(prefix, limit = 10) {
+    const queryString = new URLSearchParams({ q: prefix, limit });
+    const response = await fetch(`${this.baseURL}/api/sweets/autocomplete?${queryString}`, {
+      headers: this.getAuthHeaders(),
+    });
+    return await this.handleResponse(response);
+  }
+
   /**
    * Create a new sweet (Admin only)
    * @param {Object} sweetData - Sweet product data
@@ -150,12 +190,13 @@ class ApiService {
    * Update an existing sweet (Admin only)
    * @param {number} id - Sweet ID
    * @param {Object} sweetData - Updated sweet data
+   * @param {string} etag - Optional ETag of the version being edited; stale edits fail with 412
    * @returns {Promise} Updated sweet object
    */
-  async updateSweet(id, sweetData) {
+  async updateSweet(id, sweetData, etag) {
     const response = await fetch(`${this.baseURL}/api/sweets/${id}`, {
       method: 'PUT',
-      headers: this.getAuthHeaders(),
+      headers: { ...this.getAuthHeaders(), ...(etag && { 'If-Match': etag }) },
       body: JSON.stringify(sweetData),
     });
     return await this.handleResponse(response);
@@ -206,6 +247,25 @@ class ApiService {
     return await this.handleResponse(response);
   }
 
+  // ==================== LIVE UPDATES ====================
+
+  /**
+   * Subscribe to live stock changes instead of polling the sweets list
+   * @param {Function} onEvent - Called with (eventType, data) for each change
+   * @returns {EventSource} Open stream; call close() to unsubscribe
+   */
+  openStockStream(onEvent) {
+    const token = localStorage.getItem('access_token');
+    const url = `${this.baseURL}/api/sweets/stream?access_token=${encodeURIComponent(token || '')}`;
+    const source = new EventSource(url);
+
+    // stock/sweet/deleted carry deltas; reset means refetch the full list
+    ['stock', 'sweet', 'deleted', 'reset'].forEach(eventType => {
+      source.addEventListener(eventType, event => onEvent(eventType, JSON.parse(event.data)));
+    });
+    return source;
+  }
+
   // ==================== UTILITY METHODS ====================
 
   /**